@@ -0,0 +1,571 @@
+"""
+Замеры производительности редактора протокола.
+
+Запуск: python benchmarks.py
+Без дисплея используется offscreen-платформа Qt.
+"""
+import os
+import re
+import sys
+import statistics
+import time
+from functools import partial
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QEvent
+from PyQt6.QtGui import QKeyEvent, QTextDocument
+
+from paperspace import A4Editor
+from paperfragments import RichText
+
+# Прежний экспорт DOCX (legacy_save_to_docx) разбирал HTML через beautifulsoup4; приложению он
+# больше не нужен (нет в requirements.txt), поэтому без него сравнение с прежним путем пропускается
+try:
+    from bs4 import BeautifulSoup, NavigableString, Tag
+except ImportError:
+    BeautifulSoup = None
+
+
+def make_recommendations(items):
+    lis = "".join(f"<li>Рекомендация {i}: полоскание, капли в нос, контроль через 7 дней</li>" for i in range(items))
+    return f"<ul>{lis}</ul>"
+
+
+def make_protocol(pages, sectioned):
+    """Редактор с протоколом примерно на pages страниц."""
+    editor = A4Editor()
+    editor.set_sectioned_layout(sectioned)
+    editor.show()
+    items = 10
+    while True:
+        editor.update_recommendations_from_ui(make_recommendations(items), True)
+        editor.flush_pagination()
+        if editor.pages.page_count() >= pages:
+            return editor
+        items = int(items * 1.5) + 10
+
+
+def type_char(widget, char):
+    """Нажатие клавиши с произвольным (в т.ч. кириллическим) символом."""
+    for event_type in (QEvent.Type.KeyPress, QEvent.Type.KeyRelease):
+        QApplication.sendEvent(widget, QKeyEvent(event_type, Qt.Key.Key_A, Qt.KeyboardModifier.NoModifier, char))
+
+
+def keystroke_to_layout(editor, keystrokes=40):
+    """Время от нажатия клавиши в ячейке диагноза до готовой раскладки и пагинации (мс)."""
+    cell = editor.get_cell('diagnosis', 0, 0)
+    editor.setTextCursor(cell.lastCursorPosition())
+    editor.setFocus()
+    layout = editor.document().documentLayout()
+
+    samples = []
+    for _ in range(keystrokes):
+        started = time.perf_counter()
+        type_char(editor, 'а')
+        layout.documentSize()
+        editor.flush_pagination()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def bench_layouts(page_counts=(1, 3, 10)):
+    print("Нажатие -> раскладка: одна таблица vs таблица на секцию")
+    print(f"{'разметка':<12}{'страниц':>8}{'медиана, мс':>14}{'p95, мс':>10}")
+    for pages in page_counts:
+        for sectioned in (False, True):
+            editor = make_protocol(pages, sectioned)
+            median, p95 = keystroke_to_layout(editor)
+            name = "секции" if sectioned else "таблица"
+            print(f"{name:<12}{editor.pages.page_count():>8}{median:>14.2f}{p95:>10.2f}")
+            editor.deleteLater()
+
+
+def rebuild_time(editor, repeats=10, warm=True):
+    """Среднее время rebuild_document (мс); warm=False — с пустым кэшем фрагментов."""
+    samples = []
+    for _ in range(repeats):
+        if not warm:
+            editor._fragment_cache.clear()
+        started = time.perf_counter()
+        editor.rebuild_document()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(samples)
+
+
+def bench_rebuild(page_counts=(1, 3, 10)):
+    print("Перестройка документа: без кэша фрагментов vs с кэшем")
+    print(f"{'страниц':>8}{'без кэша, мс':>16}{'с кэшем, мс':>14}")
+    for pages in page_counts:
+        editor = make_protocol(pages, False)
+        cold = rebuild_time(editor, warm=False)
+        warm = rebuild_time(editor)
+        print(f"{editor.pages.page_count():>8}{cold:>16.2f}{warm:>14.2f}")
+        editor.deleteLater()
+
+
+def mean_time(action, repeats=10):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(samples)
+
+
+def bench_rich_text(item_counts=(10, 100, 300)):
+    print("Перенос рекомендаций поле ввода -> протокол: HTML vs фрагмент документа")
+    print(f"{'пунктов':>8}{'HTML, мс':>12}{'фрагмент, мс':>15}{'обратно HTML, мс':>19}{'обратно фрагмент, мс':>23}")
+    for items in item_counts:
+        source = QTextDocument()
+        source.setHtml(make_recommendations(items))
+        editor = A4Editor()
+
+        def transfer_html():
+            # Как раньше: сериализация поля на каждое нажатие и разбор HTML в редакторе
+            editor.update_recommendations_from_ui(source.toHtml(), True)
+            editor.invalidate_render()
+            editor._fragment_cache.clear()
+
+        def transfer_fragment():
+            editor.update_recommendations_from_ui(RichText.from_document(source), True)
+
+        html = mean_time(transfer_html)
+        fragment = mean_time(transfer_fragment)
+
+        cell = editor.get_cell('recommendations', 0, 1)
+
+        def reverse_html():
+            cursor = cell.firstCursorPosition()
+            cursor.setPosition(cell.lastCursorPosition().position(), cursor.MoveMode.KeepAnchor)
+            cursor.selection().toHtml()
+
+        reverse_fragment = mean_time(lambda: editor._rich_text_field(cell))
+        print(f"{items:>8}{html:>12.2f}{fragment:>15.2f}{mean_time(reverse_html):>19.2f}{reverse_fragment:>23.2f}")
+        editor.deleteLater()
+
+
+def bench_rich_text_typing(item_counts=(10, 100, 300), keystrokes=40):
+    """Набор в поле рекомендаций: цена сигнала на нажатие и одного прохода обновления редактора."""
+    from PyQt6.QtWidgets import QTextEdit
+
+    print("Набор в поле рекомендаций: HTML на нажатие vs снимок на нажатие vs уведомление с ревизией")
+    print(f"{'пунктов':>8}{'HTML, мс':>12}{'HTML, КБ':>12}{'снимок, мс':>13}{'уведомление, мс':>18}")
+    for items in item_counts:
+        field = QTextEdit()
+        field.setHtml(make_recommendations(items))
+        field.moveCursor(field.textCursor().MoveOperation.End)
+        field.show()
+        field.setFocus()
+        editor = A4Editor()
+
+        results = []
+        for emit in (lambda: field.toHtml(), lambda: RichText.from_document(field.document()), lambda: RichText.lazy(field.document())):
+            payloads = []
+            connection = field.textChanged.connect(lambda: payloads.append(emit()))
+            started = time.perf_counter()
+            for _ in range(keystrokes):
+                type_char(field, 'а')
+            # Один проход обновления редактора: используется только последнее значение
+            editor.update_recommendations_from_ui(payloads[-1], True)
+            results.append(((time.perf_counter() - started) * 1000 / keystrokes, payloads))
+            field.textChanged.disconnect(connection)
+
+        html_kb = sum(len(p) for p in results[0][1]) * 2 / 1024
+        print(f"{items:>8}{results[0][0]:>12.2f}{html_kb:>12.0f}{results[1][0]:>13.2f}{results[2][0]:>18.2f}")
+        editor.deleteLater()
+        field.deleteLater()
+
+
+def bench_form_dispatch(turns=2000, burst_sizes=(1, 10, 30)):
+    """Доставка изменений полей формы до сеттеров EditorPanel: проброс сигналов vs канал состояния."""
+    from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+    from formstate import FormStateChannel
+
+    class Field(QObject):
+        changed = pyqtSignal(str)
+
+    class Panel:
+        """Сеттеры как в EditorPanel: запомнить значение и пометить секцию (без отрисовки)."""
+        def __init__(self, paths):
+            self.values = {}
+            self.dirty = set()
+            self.timer = QTimer()
+            self.timer.setSingleShot(True)
+            self.timer.setInterval(0)
+            self.timer.timeout.connect(self.dirty.clear)
+            self.setters = {path: partial(self.set, path) for path in paths}
+
+        def set(self, path, value):
+            self.values[path] = value
+            self.dirty.add(path)
+            if not self.timer.isActive():
+                self.timer.start()
+
+        def apply(self, diff):
+            for path, value in diff.items():
+                self.setters[path](value)
+
+    paths = ['date', 'time', 'specialty', 'ad', 'temp', 'weight', 'complaints', 'anamnesis', 'signature']
+    app = QApplication.instance()
+
+    def forwarded():
+        # Было: сигнал ExaminationPanel -> сигнал WorkingSpacePanel -> сеттер, на каждое изменение
+        panel = Panel(paths)
+        fields = [Field() for _ in paths]
+        forwards = [Field() for _ in paths]
+        for field, forward, path in zip(fields, forwards, paths):
+            field.changed.connect(forward.changed)
+            forward.changed.connect(panel.setters[path])
+        return fields, (panel, forwards)
+
+    def channel():
+        # Стало: сигнал ExaminationPanel -> канал; панели — один дифф за итерацию
+        panel = Panel(paths)
+        state = FormStateChannel()
+        fields = [Field() for _ in paths]
+        for field, path in zip(fields, paths):
+            state.bind(field.changed, path)
+        state.subscribe(panel.apply)
+        return fields, (panel, state)
+
+    print("Доставка изменений формы в EditorPanel: мкс на изменение (изменений за итерацию цикла)")
+    print(f"{'за итерацию':>12}{'проброс, мкс':>15}{'канал, мкс':>13}")
+    for burst in burst_sizes:
+        row = []
+        for setup in (forwarded, channel):
+            fields, keep_alive = setup()
+            started = time.perf_counter()
+            for turn in range(turns):
+                for i in range(burst):
+                    fields[i % len(paths)].changed.emit(f"{turn}-{i}")
+                app.processEvents()
+            row.append((time.perf_counter() - started) * 1e6 / (turns * burst))
+        print(f"{burst:>12}{row[0]:>15.2f}{row[1]:>13.2f}")
+
+
+def legacy_save_to_docx(editor, filename):
+    """Прежний экспорт DOCX через toHtml() и разбор HTML (BeautifulSoup) — для сравнения."""
+    if BeautifulSoup is None:
+        raise ImportError("Прежний экспорт DOCX требует beautifulsoup4")
+    from docx import Document
+    from docx.shared import Pt, Mm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    editor.flush_pagination()
+
+    doc = Document()
+    
+    # Настройка полей страницы (A4)
+    section = doc.sections[0]
+    section.page_width = Mm(210)
+    section.page_height = Mm(297)
+    section.left_margin = Mm(25)
+    section.right_margin = Mm(12.7)
+    section.top_margin = Mm(12.7)
+    section.bottom_margin = Mm(12.7)
+    
+    # Установка шрифта по умолчанию
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Times New Roman'
+    font.size = Pt(10)
+    
+    html_content = editor.toHtml()
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    def add_run_recursive(parent_element, doc_paragraph, current_styles):
+        for child in parent_element.children:
+            if child.name == 'br':
+                doc_paragraph.add_run('\n')
+                continue
+                
+            # Clone styles for this child
+            child_styles = current_styles.copy()
+            
+            if isinstance(child, Tag):
+                # Update styles based on tag/attributes
+                style_str = child.get('style', '').lower()
+                css = {}
+                for item in style_str.split(';'):
+                    if ':' in item:
+                        k, v = item.split(':', 1)
+                        css[k.strip()] = v.strip()
+                
+                if child.name in ['b', 'strong'] or \
+                   css.get('font-weight') in ['bold', 'bolder'] or \
+                   (css.get('font-weight', '').isdigit() and int(css['font-weight']) >= 600):
+                    child_styles['bold'] = True
+                    
+                if child.name in ['i', 'em'] or css.get('font-style') == 'italic':
+                    child_styles['italic'] = True
+                    
+                if child.name == 'u' or 'underline' in css.get('text-decoration', ''):
+                    child_styles['underline'] = True
+                    
+                # Обработка размера шрифта
+                if 'font-size' in css:
+                    size_str = css['font-size']
+                    # Пытаемся извлечь числовое значение
+                    match = re.match(r'([\d\.]+)(pt|px|em)?', size_str)
+                    if match:
+                        val = float(match.group(1))
+                        unit = match.group(2)
+                        
+                        # Конвертация в Pt (примерная)
+                        # В HTML Qt font-size часто в pt
+                        if unit == 'px':
+                            # 96dpi: 1px = 0.75pt
+                            val = val * 0.75
+                        
+                        child_styles['font_size'] = val
+                    
+                # Recurse
+                add_run_recursive(child, doc_paragraph, child_styles)
+                
+            elif isinstance(child, NavigableString):
+                text = str(child)
+                if text:
+                    run = doc_paragraph.add_run(text)
+                    if child_styles.get('bold'): run.bold = True
+                    if child_styles.get('italic'): run.italic = True
+                    if child_styles.get('underline'): run.underline = True
+                    
+                    if 'font_size' in child_styles:
+                        run.font.size = Pt(child_styles['font_size'])
+
+    def process_paragraph_content(p_tag, doc_paragraph):
+        doc_paragraph.paragraph_format.space_after = Pt(3) # Добавлен небольшой отступ
+        doc_paragraph.paragraph_format.line_spacing = 1
+        
+        align = p_tag.get('align')
+        style = p_tag.get('style', '')
+        if 'text-align:center' in style or align == 'center':
+            doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        elif 'text-align:right' in style or align == 'right':
+            doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        elif 'text-align:justify' in style or align == 'justify':
+            doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+        else:
+            doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+        # Start recursion with empty styles
+        add_run_recursive(p_tag, doc_paragraph, {})
+
+    def process_container(soup_container, docx_container):
+        for element in soup_container.children:
+            if isinstance(element, NavigableString):
+                text = str(element).strip()
+                if text:
+                    p = docx_container.add_paragraph()
+                    p.add_run(text)
+                continue
+            
+            if element.name == 'table':
+                rows = element.find_all('tr', recursive=False)
+                if not rows: continue
+                
+                max_cols = 0
+                for row in rows:
+                    cols = row.find_all(['td', 'th'], recursive=False)
+                    current_cols = 0
+                    for col in cols:
+                        current_cols += int(col.get('colspan', 1))
+                    max_cols = max(max_cols, current_cols)
+                
+                table = docx_container.add_table(rows=len(rows), cols=max_cols)
+                # table.style = 'Table Grid' # Removed to hide borders
+                table.autofit = False
+                table.allow_autofit = False
+                
+                if max_cols == 2:
+                    for col_idx, width in enumerate([Mm(40), Mm(132)]):
+                        if col_idx < len(table.columns):
+                            table.columns[col_idx].width = width
+                            for cell in table.columns[col_idx].cells:
+                                cell.width = width
+
+                grid = [[False for _ in range(max_cols)] for _ in range(len(rows))]
+                
+                for r_idx, row in enumerate(rows):
+                    cols = row.find_all(['td', 'th'], recursive=False)
+                    c_idx = 0
+                    for col in cols:
+                        while c_idx < max_cols and grid[r_idx][c_idx]:
+                            c_idx += 1
+                        if c_idx >= max_cols: break
+                        
+                        rowspan = int(col.get('rowspan', 1))
+                        colspan = int(col.get('colspan', 1))
+                        
+                        for r in range(rowspan):
+                            for c in range(colspan):
+                                if r_idx + r < len(rows) and c_idx + c < max_cols:
+                                    grid[r_idx + r][c_idx + c] = True
+                        
+                        cell = table.cell(r_idx, c_idx)
+                        if rowspan > 1 or colspan > 1:
+                            end_r = min(r_idx + rowspan - 1, len(rows) - 1)
+                            end_c = min(c_idx + colspan - 1, max_cols - 1)
+                            cell.merge(table.cell(end_r, end_c))
+                        
+                        # Clear default paragraph
+                        cell._element.clear_content()
+                        
+                        process_container(col, cell)
+                        
+                        # Ensure cell is valid (must end with a paragraph)
+                        if len(cell._element) == 0 or not cell._element[-1].tag.endswith('p'):
+                            cell.add_paragraph()
+                        
+                        c_idx += colspan
+
+            elif element.name in ['p', 'h1', 'h2', 'h3', 'div']:
+                p = docx_container.add_paragraph()
+                process_paragraph_content(element, p)
+            
+            elif element.name == 'ul':
+                for li in element.find_all('li', recursive=False):
+                    p = docx_container.add_paragraph(style='List Bullet')
+                    process_paragraph_content(li, p)
+            
+            elif element.name == 'ol':
+                for li in element.find_all('li', recursive=False):
+                    p = docx_container.add_paragraph(style='List Number')
+                    process_paragraph_content(li, p)
+
+    body = soup.body
+    if body:
+        # --- ЛОГИКА РАЗВОРАЧИВАНИЯ (UNWRAPPING) ---
+        # Проверяем, является ли body "оберткой" из одной таблицы 1x1
+        children = [c for c in body.children if not (isinstance(c, NavigableString) and not str(c).strip())]
+        
+        if len(children) == 1 and children[0].name == 'table':
+            outer_table = children[0]
+            rows = outer_table.find_all('tr', recursive=False)
+            if len(rows) == 1:
+                cols = rows[0].find_all(['td', 'th'], recursive=False)
+                if len(cols) == 1:
+                    # Это таблица-обертка 1x1. Берем содержимое ячейки как новое тело.
+                    body = cols[0]
+
+        process_container(body, doc)
+    
+    doc.save(filename)
+
+
+def bench_docx(page_counts=(1, 5, 20), repeats=3):
+    """Экспорт DOCX: toHtml() + BeautifulSoup vs обход документа (paperdocx)."""
+    import tempfile
+    from paperdocx import write_docx
+    if BeautifulSoup is None:
+        print("Экспорт DOCX: для сравнения с прежним путем нужен beautifulsoup4")
+        return
+
+    print("Экспорт DOCX: через HTML vs обход документа")
+    print(f"{'страниц':>8}{'HTML, мс':>12}{'обход, мс':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "protocol.docx")
+        for pages in page_counts:
+            editor = make_protocol(pages, False)
+            html = mean_time(lambda: legacy_save_to_docx(editor, filename), repeats)
+            native = mean_time(lambda: write_docx(editor.document(), filename), repeats)
+            print(f"{editor.pages.page_count():>8}{html:>12.1f}{native:>12.1f}")
+            editor.deleteLater()
+
+
+def bench_docx_batch(count=200):
+    """Пакетный экспорт: count одностраничных протоколов подряд (статические части пакета — из кэша)."""
+    import tempfile
+    from paperdocx import write_docx
+
+    editor = make_protocol(1, False)
+    document = editor.document()
+    with tempfile.TemporaryDirectory() as folder:
+        write_docx(document, os.path.join(folder, "warmup.docx"))
+        start = time.perf_counter()
+        for i in range(count):
+            write_docx(document, os.path.join(folder, f"protocol_{i}.docx"))
+        elapsed = time.perf_counter() - start
+    editor.deleteLater()
+    print(f"Пакетный экспорт DOCX: {count} файлов за {elapsed:.2f} с ({elapsed * 1000 / count:.1f} мс/файл)")
+
+
+def bench_export_cache(page_counts=(1, 5, 20), repeats=3):
+    """Копирование, печать в PDF и сохранение DOCX одной ревизии: каждый раз заново vs из кэша ревизии."""
+    import tempfile
+    from PyQt6.QtCore import QThreadPool
+    from PyQt6.QtPrintSupport import QPrinter
+
+    print("Копирование + печать + DOCX одной ревизии: без кэша vs с кэшем")
+    print(f"{'страниц':>8}{'без кэша, мс':>15}{'с кэшем, мс':>14}")
+    with tempfile.TemporaryDirectory() as folder:
+        def cycle(editor, clear):
+            if clear:
+                editor.export_cache.clear()
+            editor.copy_content()
+            printer = QPrinter(QPrinter.PrinterMode.ScreenResolution)
+            printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
+            printer.setOutputFileName(os.path.join(folder, "protocol.pdf"))
+            editor.print_to_printer(printer)
+            # Сохранение тем же путем, что и в приложении (SaveTask), до записи файла
+            editor.export_bundle({'docx': os.path.join(folder, "protocol.docx")})
+            QThreadPool.globalInstance().waitForDone()
+            QApplication.processEvents()
+
+        for pages in page_counts:
+            editor = make_protocol(pages, False)
+            cold = mean_time(lambda: cycle(editor, True), repeats)
+            warm = mean_time(lambda: cycle(editor, False), repeats)
+            print(f"{editor.pages.page_count():>8}{cold:>15.1f}{warm:>14.1f}")
+            editor.deleteLater()
+
+
+def bench_export_bundle(page_counts=(1, 5, 20), formats=('docx', 'pdf', 'odt', 'html', 'txt'), repeats=3):
+    """Комплект файлов одной ревизии: поочередно в GUI-потоке vs снимки + параллельная запись в QThreadPool."""
+    import tempfile
+    from PyQt6.QtCore import QThreadPool
+    from paperexport import serialize, bundle_file_names
+
+    pool = QThreadPool.globalInstance()
+    print(f"Комплект {'+'.join(formats)}: поочередно vs параллельно (блокировка GUI / до готовности)")
+    print(f"{'страниц':>8}{'поочередно, мс':>17}{'GUI, мс':>10}{'всего, мс':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for pages in page_counts:
+            editor = make_protocol(pages, False)
+            document = editor.document()
+
+            def sequential():
+                for fmt, name in bundle_file_names(folder, "sequential", formats).items():
+                    with open(name, 'wb') as file:
+                        file.write(serialize(document, fmt))
+
+            blocking = []
+
+            def parallel():
+                editor.export_cache.clear()
+                started = time.perf_counter()
+                editor.export_bundle(bundle_file_names(folder, "parallel", formats))
+                blocking.append((time.perf_counter() - started) * 1000)
+                pool.waitForDone()
+                QApplication.processEvents()
+
+            serial = mean_time(sequential, repeats)
+            total = mean_time(parallel, repeats)
+            print(f"{editor.pages.page_count():>8}{serial:>17.1f}{statistics.mean(blocking):>10.1f}{total:>12.1f}")
+            editor.deleteLater()
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    bench_layouts()
+    bench_rebuild()
+    bench_rich_text()
+    bench_rich_text_typing()
+    bench_form_dispatch()
+    bench_docx()
+    bench_docx_batch()
+    bench_export_cache()
+    bench_export_bundle()
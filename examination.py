@@ -15,6 +15,7 @@ import re
 from examinationextra import SurdologyBlock, SickLeaveBlock, AdditionalBlock, DateInput, TimeInput, SymbolComboBox, EditableButton, NormButton, AutoResizingTextEdit, TemplateManagerDialog
 from operation import OperationBlock
 from commands import TextChangeCommand, CheckBoxCommand
+from paperfragments import RichText
 
 # --- Вспомогательные функции путей ---
 def get_resource_path(relative_path):
@@ -53,12 +54,13 @@ class ExaminationPanel(QFrame):
     consentChanged = pyqtSignal(bool)
     
     objectiveChanged = pyqtSignal(dict)
+    objectiveFieldChanged = pyqtSignal(str, str) # ключ поля, текст
     
-    diagnosisChanged = pyqtSignal(str)
+    diagnosisChanged = pyqtSignal(object) # RichText
     showDiagnosisLabelChanged = pyqtSignal(bool)
     noAcutePathologyChanged = pyqtSignal(bool)
     
-    recommendationsChanged = pyqtSignal(str)
+    recommendationsChanged = pyqtSignal(object) # RichText
     showRecommendationsLabelChanged = pyqtSignal(bool)
     repeatChanged = pyqtSignal(bool, str, str) # enabled, date, time
     
@@ -79,6 +81,9 @@ class ExaminationPanel(QFrame):
     # Сигнал видимости подписи
     signatureVisibleChanged = pyqtSignal(bool)
 
+    # Запрос на перенос в форму отложенных правок документа (перед чтением данных формы)
+    syncRequested = pyqtSignal()
+
     def __init__(self, undo_stack=None):
         super().__init__()
         self.undo_stack = undo_stack
@@ -864,30 +869,21 @@ class ExaminationPanel(QFrame):
         )
         objective_layout.addWidget(self.row_other)
         
-        # Подключаем сигналы изменения текста и чекбоксов
-        self.ad_ear_input.textChanged.connect(self.emit_objective_changed)
-        self.ad_ear_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.as_ear_input.textChanged.connect(self.emit_objective_changed)
-        self.as_ear_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.ad_as_combined_input.textChanged.connect(self.emit_objective_changed)
-        self.ad_as_combined_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.nasi_input.textChanged.connect(self.emit_objective_changed)
-        self.nasi_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.pharynx_input.textChanged.connect(self.emit_objective_changed)
-        self.pharynx_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.nasi_pharynx_combined_input.textChanged.connect(self.emit_objective_changed)
-        self.nasi_pharynx_combined_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.larynx_input.textChanged.connect(self.emit_objective_changed)
-        self.larynx_chk.stateChanged.connect(self.emit_objective_changed)
-        
-        self.other_input.textChanged.connect(self.emit_objective_changed)
-        self.other_chk.stateChanged.connect(self.emit_objective_changed)
+        # Текст поля уходит дельтой (ключ, текст): при наборе остальные поля не сериализуются.
+        # Чекбоксы меняют состав блока и отправляют осмотр целиком
+        objective_fields = (
+            ("ad_ear", self.ad_ear_input, self.ad_ear_chk),
+            ("as_ear", self.as_ear_input, self.as_ear_chk),
+            ("ad_as_comb", self.ad_as_combined_input, self.ad_as_combined_chk),
+            ("nasi", self.nasi_input, self.nasi_chk),
+            ("pharynx", self.pharynx_input, self.pharynx_chk),
+            ("nasi_pharynx_comb", self.nasi_pharynx_combined_input, self.nasi_pharynx_combined_chk),
+            ("larynx", self.larynx_input, self.larynx_chk),
+            ("other", self.other_input, self.other_chk),
+        )
+        for key, field, chk in objective_fields:
+            field.textChanged.connect(lambda key=key, field=field: self.objectiveFieldChanged.emit(key, field.toPlainText()))
+            chk.stateChanged.connect(self.emit_objective_changed)
         
         self.chk_merge_ears.stateChanged.connect(self.emit_objective_changed)
         self.chk_merge_nose_throat.stateChanged.connect(self.emit_objective_changed)
@@ -949,7 +945,8 @@ class ExaminationPanel(QFrame):
                 color: #e0e0e0;
             }
         """)
-        self.diagnosis_input.textChanged.connect(lambda: self.diagnosisChanged.emit(self.diagnosis_input.toHtml()))
+        # Текст передается в редактор фрагментом документа, без сериализации в HTML
+        self.diagnosis_input.textChanged.connect(lambda: self.diagnosisChanged.emit(RichText.lazy(self.diagnosis_input.document())))
         diagnosis_layout.addWidget(self.diagnosis_input)
         
         # Подключаем кнопку очистки
@@ -1130,7 +1127,8 @@ class ExaminationPanel(QFrame):
                 color: #e0e0e0;
             }
         """)
-        self.rec_input.textChanged.connect(lambda: self.recommendationsChanged.emit(self.rec_input.toHtml()))
+        # Текст передается в редактор фрагментом документа, без сериализации в HTML
+        self.rec_input.textChanged.connect(lambda: self.recommendationsChanged.emit(RichText.lazy(self.rec_input.document())))
         rec_layout.addWidget(self.rec_input)
         
         # Подключаем кнопку очистки
@@ -1436,6 +1434,7 @@ class ExaminationPanel(QFrame):
                 template_data = {"template_name": name, "data": {}}
             
             side_key = self.get_current_side_key()
+            self.syncRequested.emit()
             template_data["data"][side_key] = self.collect_current_data()
             
             try:
@@ -1484,6 +1483,7 @@ class ExaminationPanel(QFrame):
                     template_data = json.load(f)
                 
                 side_key = self.get_current_side_key()
+                self.syncRequested.emit()
                 template_data["data"][side_key] = self.collect_current_data()
                 
                 with open(filepath, 'w', encoding='utf-8') as f:
@@ -4,12 +4,50 @@ from PyQt6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QLabel,
                              QStylePainter, QStyleOptionComboBox, QStyle, QComboBox,
                              QMenu, QWidgetAction, QCalendarWidget, QTextEdit, QDialog,
                              QListWidget, QListWidgetItem, QToolButton, QMessageBox, QInputDialog,
-                             QTextBrowser, QScrollArea)
+                             QTextBrowser, QScrollArea, QAbstractButton)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QPoint, QSize, QUrl
 from PyQt6.QtGui import QPalette, QColor, QIcon, QAction, QPixmap
+from PyQt6 import sip
+from functools import partial
 import os
 import json
 
+from paperfragments import RichText
+
+
+def apply_widget_values(*updates, drop_family=None):
+    """
+    Выставляет значения в виджеты формы: пары (виджет, значение). Трогает только виджеты,
+    которые показывают другое значение (без сброса истории отмены, курсора и перерасчета
+    высоты у остальных); сигналы измененных виджетов блокируются на все обновление разом.
+    RichText переносится в документ поля (drop_family — см. RichText.replace_contents).
+    Возвращает список измененных виджетов.
+    """
+    changes = []
+    for widget, value in updates:
+        if isinstance(value, RichText):
+            if not value.matches(widget.document(), drop_family):
+                changes.append((widget, partial(value.replace_contents, widget.document(), drop_family)))
+            continue
+        if isinstance(widget, QAbstractButton):
+            current, setter = widget.isChecked(), widget.setChecked
+        elif isinstance(widget, QTextEdit):
+            current, setter = widget.toPlainText(), widget.setPlainText
+        else:
+            current, setter = widget.text(), widget.setText
+        if current != value:
+            changes.append((widget, partial(setter, value)))
+
+    blocked = [widget.blockSignals(True) for widget, _ in changes]
+    try:
+        for _, apply in changes:
+            apply()
+    finally:
+        for (widget, _), was_blocked in zip(changes, blocked):
+            widget.blockSignals(was_blocked)
+    return [widget for widget, _ in changes]
+
+
 class SymbolComboBox(QComboBox):
     def paintEvent(self, event):
         painter = QStylePainter(self)
@@ -45,6 +83,11 @@ class TimeInput(QLineEdit):
         QTimer.singleShot(0, lambda: self.setCursorPosition(0))
 
 class AutoResizingTextEdit(QTextEdit):
+    # Поля, у которых изменился размер документа. Высота пересчитывается для всех разом
+    # после текущих событий: шаблон, заполняющий десяток полей, дает один проход
+    # раскладки левой панели, а не цепочку setFixedHeight на каждое изменение текста
+    _pending_resize = []
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -59,10 +102,26 @@ class AutoResizingTextEdit(QTextEdit):
                 color: #e0e0e0;
             }
         """)
-        self.document().documentLayout().documentSizeChanged.connect(self.resize_height)
+        self.document().documentLayout().documentSizeChanged.connect(self.schedule_resize)
         self.setFixedHeight(30)
         self._resizing = False
 
+    def schedule_resize(self):
+        pending = AutoResizingTextEdit._pending_resize
+        if not pending:
+            QTimer.singleShot(0, AutoResizingTextEdit.flush_resizes)
+        if self not in pending:
+            pending.append(self)
+
+    @staticmethod
+    def flush_resizes():
+        """Пересчитывает высоту всех полей, ожидающих пересчета."""
+        pending = AutoResizingTextEdit._pending_resize[:]
+        AutoResizingTextEdit._pending_resize.clear()
+        for edit in pending:
+            if not sip.isdeleted(edit):
+                edit.resize_height()
+
     def resize_height(self):
         if self._resizing:
             return
@@ -1390,6 +1449,30 @@ class SickLeaveBlock(QFrame):
         
         self.toggle_fields()
 
+    def apply_data(self, data):
+        """
+        Как set_data, но без сигналов и только для полей с другим значением
+        (значения, пришедшие из редактора протокола).
+        """
+        changed = apply_widget_values(
+            (self.chk_sl_issued, data.get("issued", False)),
+            (self.chk_sl_continued, data.get("continued", False)),
+            (self.chk_sl_parent, data.get("parent", False)),
+            (self.sl_number_input, data.get("number", "")),
+            (self.sl_date_from_input, data.get("date_from", "")),
+            (self.sl_date_to_input, data.get("date_to", "")),
+            (self.sl_prev_number_input, data.get("prev_number", "")),
+            (self.sl_parent_fio_input, data.get("parent_fio", "")),
+            (self.sl_parent_dob_input, data.get("parent_dob", "")),
+            (self.sl_address_input, data.get("address", "")),
+            (self.sl_job_input, data.get("job", "")),
+        )
+        # Видимость полей зависит от чекбоксов, а их сигналы были заблокированы
+        if any(isinstance(widget, QCheckBox) for widget in changed):
+            blocked = self.blockSignals(True)
+            self.toggle_fields()
+            self.blockSignals(blocked)
+
     def clear(self):
         self.chk_sl_issued.setChecked(False)
         self.chk_sl_continued.setChecked(False)
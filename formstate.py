@@ -0,0 +1,100 @@
+from PyQt6.QtCore import QObject, QTimer
+from functools import partial
+
+from paperfragments import RichText
+
+# Поля состояния формы: путь -> тип значения.
+# Путь "секция.поле" — поле внутри секции (например, одно поле объективного осмотра)
+OBJECTIVE_FIELDS = ('ad_ear', 'as_ear', 'ad_as_comb', 'nasi', 'pharynx', 'nasi_pharynx_comb', 'larynx', 'other')
+
+FIELDS = {
+    'date': str, 'time': str, 'time_enabled': bool,
+    'specialty': str, 'cito': bool, 'no_card': bool,
+    'ad': str, 'temp': str, 'weight': str, 'paid_service': bool,
+    'complaints': str, 'anamnesis': str, 'no_complaints': bool, 'show_anamnesis_label': bool,
+    'consent': bool,
+    'objective': dict,
+    **{f'objective.{key}': str for key in OBJECTIVE_FIELDS},
+    'surdology': dict,
+    'diagnosis': (RichText, str), 'diagnosis.show_label': bool, 'diagnosis.no_acute_pathology': bool,
+    'recommendations': (RichText, str), 'recommendations.show_label': bool,
+    'repeat': tuple,        # (enabled, date, time)
+    'sick_leave': dict,
+    'signature': str,
+    'signature_visible': bool,
+    'operation_mode': bool,
+    'operation': dict,
+    'op_staff': tuple,      # (operator, nurse)
+}
+
+
+class FormStateChannel(QObject):
+    """
+    Канал состояния формы. Поля формы публикуют значения по пути (см. FIELDS);
+    изменения копятся диффом {путь: значение} и раз за итерацию цикла событий уходят
+    подписчикам одним пакетом. Повторные изменения поля за итерацию схлопываются в последнее.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pending = {}
+        self._subscribers = []   # (префиксы путей или None, callback)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+        self._scheduled = False
+
+    # --- Публикация ---
+
+    def publish(self, path, value):
+        # Вызывается из слотов Qt: исключение здесь не дойдет до отправителя, значение отбрасывается
+        expected = FIELDS[path]
+        if not isinstance(value, expected):
+            print(f"Error publishing form state {path}: expected {expected}, got {type(value).__name__}")
+            return
+        # Порядок диффа — порядок последних изменений: поле секции, измененное после
+        # всей секции (или наоборот), применяется поверх нее
+        pending = self._pending
+        if path in pending:
+            del pending[path]
+        pending[path] = value
+        if not self._scheduled:
+            self._scheduled = True
+            self._timer.start()
+
+    def bind(self, signal, path):
+        """Публикует значения сигнала в path; сигнал с несколькими аргументами дает кортеж."""
+        if FIELDS[path] is tuple:
+            signal.connect(lambda *values: self.publish(path, values))
+        else:
+            signal.connect(partial(self.publish, path))
+
+    # --- Подписка ---
+
+    def subscribe(self, callback, prefixes=None):
+        """
+        callback(дифф) вызывается раз за итерацию с изменившимися полями.
+        prefixes — только пути, начинающиеся с этих секций (например, ('objective',)).
+        """
+        self._subscribers.append((tuple(prefixes) if prefixes else None, callback))
+        return callback
+
+    def flush(self):
+        """Синхронно доставляет накопленный дифф (перед печатью, сохранением и т.п.)."""
+        self._timer.stop()
+        self._scheduled = False
+        if not self._pending:
+            return
+        # Повторы здесь не отсеиваются: правки из редактора попадают в поля формы
+        # с заблокированными сигналами, мимо канала, и канал о них не знает.
+        # Эхо и повторы отбрасывает журнал изменений редактора (papersync.ChangeLedger)
+        diff, self._pending = self._pending, {}
+        for prefixes, callback in list(self._subscribers):
+            if prefixes is None:
+                callback(diff)
+                continue
+            part = {path: value for path, value in diff.items() if path.split('.', 1)[0] in prefixes}
+            if part:
+                callback(part)
@@ -4,7 +4,7 @@ import configparser
 import faulthandler
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout, QSplitter, 
                              QFrame, QLineEdit, QTextEdit, QDialog, QVBoxLayout, 
-                             QTextBrowser, QPushButton)
+                             QTextBrowser, QPushButton, QFileDialog)
 from PyQt6.QtCore import Qt, QEvent, QUrl
 from PyQt6.QtGui import QAction, QIcon, QUndoStack, QKeySequence, QKeyEvent
 
@@ -15,6 +15,8 @@ if sys.stderr is not None:
 # Импортируем наши новые модули
 from paperspace import EditorPanel, A4Editor
 from workingspace import WorkingSpacePanel
+from examinationextra import apply_widget_values
+from paperexport import SaveProgressIndicator, FORMAT_EXTENSIONS, DEFAULT_BUNDLE_FORMATS, DEFAULT_NAME_PATTERN
 
 # --- Вспомогательные функции путей ---
 def get_resource_path(relative_path):
@@ -123,51 +125,19 @@ class MainWindow(QMainWindow):
         self.editor_panel = EditorPanel()
         self.splitter.addWidget(self.editor_panel)
         
-        # Связываем сигналы (UI -> Editor)
-        self.work_area.dateChanged.connect(self.editor_panel.set_date)
-        self.work_area.timeChanged.connect(self.editor_panel.set_time)
-        self.work_area.timeEnabledChanged.connect(self.editor_panel.set_time_enabled)
-        self.work_area.specialtyChanged.connect(self.editor_panel.set_specialty)
-        
-        self.work_area.adChanged.connect(self.editor_panel.set_ad)
-        self.work_area.tempChanged.connect(self.editor_panel.set_temp)
-        self.work_area.weightChanged.connect(self.editor_panel.set_weight)
-        self.work_area.complaintsChanged.connect(self.editor_panel.set_complaints)
-        self.work_area.anamnesisChanged.connect(self.editor_panel.set_anamnesis)
-        
-        self.work_area.noComplaintsChanged.connect(self.editor_panel.set_no_complaints)
-        self.work_area.showAnamnesisLabelChanged.connect(self.editor_panel.set_show_anamnesis_label)
-        
-        self.work_area.paidServiceChanged.connect(self.editor_panel.set_paid_service)
-        self.work_area.consentChanged.connect(self.editor_panel.set_consent)
-        
-        self.work_area.citoChanged.connect(self.editor_panel.set_cito)
-        self.work_area.noCardChanged.connect(self.editor_panel.set_no_card)
-        
-        self.work_area.objectiveChanged.connect(self.editor_panel.set_objective)
-        self.work_area.surdologyChanged.connect(self.editor_panel.set_surdology)
-        self.work_area.diagnosisChanged.connect(self.editor_panel.set_diagnosis)
-        self.work_area.showDiagnosisLabelChanged.connect(self.editor_panel.set_show_diagnosis_label)
-        self.work_area.noAcutePathologyChanged.connect(self.editor_panel.set_no_acute_pathology)
-        self.work_area.recommendationsChanged.connect(self.editor_panel.set_recommendations)
-        self.work_area.showRecommendationsLabelChanged.connect(self.editor_panel.set_show_recommendations_label)
-        self.work_area.repeatChanged.connect(self.editor_panel.set_repeat)
-        self.work_area.sickLeaveChanged.connect(self.editor_panel.set_sick_leave)
-        self.work_area.signatureChanged.connect(self.editor_panel.set_signature)
-        
-        self.work_area.operationModeChanged.connect(self.editor_panel.set_operation_mode)
-        self.work_area.operationDataChanged.connect(self.editor_panel.set_operation_data)
-        
-        # Связываем новый сигнал для персонала операции
-        self.work_area.operationStaffChanged.connect(self.editor_panel.set_operation_staff)
-        
-        # Связываем сигнал видимости подписи
-        self.work_area.signatureVisibleChanged.connect(self.editor_panel.set_signature_visible)
+        # Связываем форму с редактором (UI -> Editor): пакеты изменений канала состояния формы
+        self.editor_panel.attach_form_state(self.work_area.form_state)
         
         # Связываем сигналы для нижней панели
         self.work_area.saveRequested.connect(self.editor_panel.save_to_file)
         self.work_area.copyRequested.connect(self.editor_panel.copy_content)
         self.work_area.printRequested.connect(self.editor_panel.print_preview)
+        self.work_area.syncRequested.connect(self.editor_panel.flush_updates)
+
+        # Ход фонового сохранения — в строке состояния
+        self.save_indicator = SaveProgressIndicator()
+        self.statusBar().addPermanentWidget(self.save_indicator)
+        self.editor_panel.saveStarted.connect(self.save_indicator.track)
         
         # Связываем сигналы (Editor -> UI)
         self.editor_panel.dateChangedFromEditor.connect(self.update_date_ui)
@@ -274,147 +244,67 @@ class MainWindow(QMainWindow):
             return True
         return False
 
+    # --- Правки из редактора -> форма ---
+    # Редактор отправляет только изменившиеся секции (эхо отбрасывается его журналом sync),
+    # а apply_widget_values трогает только поля, которые показывают другое значение
+
+    def _apply_from_editor(self, *updates):
+        """Выставляет в виджеты формы значения из редактора: пары (виджет, значение)."""
+        # Форматированный текст приходит из документа редактора; шрифт протокола в поле ввода не нужен
+        return apply_widget_values(*updates, drop_family="Times New Roman")
+
     def update_date_ui(self, date):
-        self.work_area.date_input.blockSignals(True)
-        self.work_area.date_input.setText(date)
-        self.work_area.date_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.date_input, date))
 
     def update_signature_ui(self, text):
-        self.work_area.doctor_name_input.blockSignals(True)
-        self.work_area.doctor_name_input.setText(text)
-        self.work_area.doctor_name_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.doctor_name_input, text))
 
     def update_indicators_ui(self, ad, temp, weight):
-        # Блокируем сигналы, чтобы не вызвать зацикливание
-        self.work_area.ad_input.blockSignals(True)
-        self.work_area.temp_input.blockSignals(True)
-        self.work_area.weight_input.blockSignals(True)
-        
-        self.work_area.ad_input.setText(ad)
-        self.work_area.temp_input.setText(temp)
-        self.work_area.weight_input.setText(weight)
-        
-        self.work_area.ad_input.blockSignals(False)
-        self.work_area.temp_input.blockSignals(False)
-        self.work_area.weight_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.ad_input, ad),
+                                (self.work_area.temp_input, temp),
+                                (self.work_area.weight_input, weight))
 
     def update_complaints_anamnesis_ui(self, complaints, anamnesis):
-        self.work_area.complaints_input.blockSignals(True)
-        self.work_area.anamnesis_input.blockSignals(True)
-        
-        self.work_area.complaints_input.setText(complaints)
-        self.work_area.anamnesis_input.setText(anamnesis)
-        
-        self.work_area.complaints_input.blockSignals(False)
-        self.work_area.anamnesis_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.complaints_input, complaints),
+                                (self.work_area.anamnesis_input, anamnesis))
         
     def update_objective_ui(self, data):
-        # Блокируем сигналы текстовых полей
-        self.work_area.ad_ear_input.blockSignals(True)
-        self.work_area.as_ear_input.blockSignals(True)
-        self.work_area.ad_as_combined_input.blockSignals(True)
-        self.work_area.nasi_input.blockSignals(True)
-        self.work_area.pharynx_input.blockSignals(True)
-        self.work_area.nasi_pharynx_combined_input.blockSignals(True)
-        self.work_area.larynx_input.blockSignals(True)
-        self.work_area.other_input.blockSignals(True)
-        
-        # Блокируем сигналы чекбоксов
-        self.work_area.ad_ear_chk.blockSignals(True)
-        self.work_area.as_ear_chk.blockSignals(True)
-        self.work_area.ad_as_combined_chk.blockSignals(True)
-        self.work_area.chk_merge_ears.blockSignals(True)
-        
-        self.work_area.nasi_chk.blockSignals(True)
-        self.work_area.pharynx_chk.blockSignals(True)
-        self.work_area.nasi_pharynx_combined_chk.blockSignals(True)
-        self.work_area.chk_merge_nose_throat.blockSignals(True)
-        
-        self.work_area.larynx_chk.blockSignals(True)
-        self.work_area.other_chk.blockSignals(True)
-        
-        # Обновляем текст
-        self.work_area.ad_ear_input.setPlainText(data.get("ad_ear", ""))
-        self.work_area.as_ear_input.setPlainText(data.get("as_ear", ""))
-        self.work_area.ad_as_combined_input.setPlainText(data.get("ad_as_comb", ""))
-        self.work_area.nasi_input.setPlainText(data.get("nasi", ""))
-        self.work_area.pharynx_input.setPlainText(data.get("pharynx", ""))
-        self.work_area.nasi_pharynx_combined_input.setPlainText(data.get("nasi_pharynx_comb", ""))
-        self.work_area.larynx_input.setPlainText(data.get("larynx", ""))
-        self.work_area.other_input.setPlainText(data.get("other", ""))
-        
-        # Обновляем чекбоксы
-        self.work_area.ad_ear_chk.setChecked(data.get("ad_vis", False))
-        self.work_area.as_ear_chk.setChecked(data.get("as_vis", False))
-        self.work_area.ad_as_combined_chk.setChecked(data.get("ad_as_vis", False))
-        self.work_area.chk_merge_ears.setChecked(data.get("merge_ears", False))
-        
-        self.work_area.nasi_chk.setChecked(data.get("nasi_vis", False))
-        self.work_area.pharynx_chk.setChecked(data.get("pharynx_vis", False))
-        self.work_area.nasi_pharynx_combined_chk.setChecked(data.get("nasi_pharynx_vis", False))
-        self.work_area.chk_merge_nose_throat.setChecked(data.get("merge_nose_throat", False))
-        
-        self.work_area.larynx_chk.setChecked(data.get("larynx_vis", False))
-        self.work_area.other_chk.setChecked(data.get("other_vis", False))
-        
-        # Разблокируем сигналы
-        self.work_area.ad_ear_input.blockSignals(False)
-        self.work_area.as_ear_input.blockSignals(False)
-        self.work_area.ad_as_combined_input.blockSignals(False)
-        self.work_area.nasi_input.blockSignals(False)
-        self.work_area.pharynx_input.blockSignals(False)
-        self.work_area.nasi_pharynx_combined_input.blockSignals(False)
-        self.work_area.larynx_input.blockSignals(False)
-        self.work_area.other_input.blockSignals(False)
-        
-        self.work_area.ad_ear_chk.blockSignals(False)
-        self.work_area.as_ear_chk.blockSignals(False)
-        self.work_area.ad_as_combined_chk.blockSignals(False)
-        self.work_area.chk_merge_ears.blockSignals(False)
-        
-        self.work_area.nasi_chk.blockSignals(False)
-        self.work_area.pharynx_chk.blockSignals(False)
-        self.work_area.nasi_pharynx_combined_chk.blockSignals(False)
-        self.work_area.chk_merge_nose_throat.blockSignals(False)
-        
-        self.work_area.larynx_chk.blockSignals(False)
-        self.work_area.other_chk.blockSignals(False)
+        self._apply_from_editor(
+            # Текст
+            (self.work_area.ad_ear_input, data.get("ad_ear", "")),
+            (self.work_area.as_ear_input, data.get("as_ear", "")),
+            (self.work_area.ad_as_combined_input, data.get("ad_as_comb", "")),
+            (self.work_area.nasi_input, data.get("nasi", "")),
+            (self.work_area.pharynx_input, data.get("pharynx", "")),
+            (self.work_area.nasi_pharynx_combined_input, data.get("nasi_pharynx_comb", "")),
+            (self.work_area.larynx_input, data.get("larynx", "")),
+            (self.work_area.other_input, data.get("other", "")),
+            # Чекбоксы
+            (self.work_area.ad_ear_chk, data.get("ad_vis", False)),
+            (self.work_area.as_ear_chk, data.get("as_vis", False)),
+            (self.work_area.ad_as_combined_chk, data.get("ad_as_vis", False)),
+            (self.work_area.chk_merge_ears, data.get("merge_ears", False)),
+            (self.work_area.nasi_chk, data.get("nasi_vis", False)),
+            (self.work_area.pharynx_chk, data.get("pharynx_vis", False)),
+            (self.work_area.nasi_pharynx_combined_chk, data.get("nasi_pharynx_vis", False)),
+            (self.work_area.chk_merge_nose_throat, data.get("merge_nose_throat", False)),
+            (self.work_area.larynx_chk, data.get("larynx_vis", False)),
+            (self.work_area.other_chk, data.get("other_vis", False)),
+        )
 
     def update_diagnosis_ui(self, diagnosis):
-        self.work_area.diagnosis_input.blockSignals(True)
-        # Используем setHtml для поддержки форматирования, если оно есть
-        # Но для диагноза мы пока не добавляли кнопки, так что можно оставить setText или setHtml
-        # Если diagnosis содержит HTML теги, лучше setHtml
-        if "<html>" in diagnosis or "<p>" in diagnosis:
-             self.work_area.diagnosis_input.setHtml(diagnosis)
-        else:
-             self.work_area.diagnosis_input.setText(diagnosis)
-        self.work_area.diagnosis_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.diagnosis_input, diagnosis))
         
     def update_recommendations_ui(self, recommendations):
-        self.work_area.rec_input.blockSignals(True)
-        # Используем setHtml для поддержки форматирования (списков)
-        self.work_area.rec_input.setHtml(recommendations)
-        self.work_area.rec_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.rec_input, recommendations))
         
     def update_repeat_ui(self, enabled, date, time):
-        self.work_area.repeat_chk.blockSignals(True)
-        self.work_area.repeat_date_input.blockSignals(True)
-        self.work_area.repeat_time_input.blockSignals(True)
-        
-        self.work_area.repeat_chk.setChecked(enabled)
-        self.work_area.repeat_date_input.setText(date)
-        self.work_area.repeat_time_input.setText(time)
-        
-        self.work_area.repeat_chk.blockSignals(False)
-        self.work_area.repeat_date_input.blockSignals(False)
-        self.work_area.repeat_time_input.blockSignals(False)
+        self._apply_from_editor((self.work_area.repeat_chk, enabled),
+                                (self.work_area.repeat_date_input, date),
+                                (self.work_area.repeat_time_input, time))
 
     def update_sick_leave_ui(self, data):
-        # Блокируем сигналы виджета больничного листа
-        self.work_area.sick_leave_block.blockSignals(True)
-        self.work_area.sick_leave_block.set_data(data)
-        self.work_area.sick_leave_block.blockSignals(False)
+        self.work_area.sick_leave_block.apply_data(data)
 
     def create_menu_bar(self):
         menubar = self.menuBar()
@@ -422,6 +312,12 @@ class MainWindow(QMainWindow):
         # 1. Меню "Файл"
         file_menu = menubar.addMenu("Файл")
         
+        export_action = QAction("Экспорт комплекта...", self)
+        export_action.setToolTip("Сохранить протокол сразу во всех форматах комплекта (секция [Export] в prefabs.ini)")
+        export_action.triggered.connect(self.export_bundle)
+        file_menu.addAction(export_action)
+        file_menu.addSeparator()
+        
         exit_action = QAction("Выход", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -442,6 +338,13 @@ class MainWindow(QMainWindow):
         about_action.triggered.connect(self.show_about_dialog)
         menubar.addAction(about_action)
 
+    def export_bundle(self):
+        folder = QFileDialog.getExistingDirectory(self, "Папка для комплекта", self.export_folder)
+        if not folder:
+            return
+        self.export_folder = folder
+        self.editor_panel.export_bundle(folder, self.export_formats, self.export_name_pattern)
+
     def show_about_dialog(self):
         dialog = AboutDialog(self)
         dialog.exec()
@@ -469,6 +372,11 @@ class MainWindow(QMainWindow):
         # Используем get_user_path для загрузки настроек
         ini_path = get_user_path(os.path.join("Templates", "prefabs.ini"))
         
+        # Комплект экспорта: форматы, шаблон имени файлов, последняя папка
+        self.export_formats = list(DEFAULT_BUNDLE_FORMATS)
+        self.export_name_pattern = DEFAULT_NAME_PATTERN
+        self.export_folder = ""
+        
         if os.path.exists(ini_path):
             config.read(ini_path, encoding='utf-8')
             
@@ -487,10 +395,22 @@ class MainWindow(QMainWindow):
                 
                 zoom = config.getint('Window', 'zoom', fallback=100)
                 self.editor_panel.set_zoom(zoom)
+
+                sectioned = config.getboolean('Window', 'sectioned_layout', fallback=False)
+                self.editor_panel.set_sectioned_layout(sectioned)
             
             if 'Doctor' in config:
                 doctor_name = config.get('Doctor', 'name', fallback="")
                 self.work_area.doctor_name_input.setText(doctor_name)
+            
+            if 'Export' in config:
+                formats = config.get('Export', 'formats', fallback="")
+                formats = [fmt.strip().lower() for fmt in formats.split(',')]
+                formats = [fmt for fmt in formats if fmt in FORMAT_EXTENSIONS]
+                if formats:
+                    self.export_formats = formats
+                self.export_name_pattern = config.get('Export', 'name_pattern', fallback=DEFAULT_NAME_PATTERN)
+                self.export_folder = config.get('Export', 'folder', fallback="")
 
     def save_settings(self):
         config = configparser.ConfigParser()
@@ -504,13 +424,21 @@ class MainWindow(QMainWindow):
             'width': str(self.width()),
             'height': str(self.height()),
             'splitter_sizes': ",".join(map(str, self.splitter.sizes())),
-            'zoom': str(self.editor_panel.get_zoom())
+            'zoom': str(self.editor_panel.get_zoom()),
+            'sectioned_layout': str(self.editor_panel.is_sectioned_layout())
         }
         
         config['Doctor'] = {
             'name': self.work_area.doctor_name_input.text()
         }
         
+        # '%' в значениях configparser понимает как подстановку — экранируем
+        config['Export'] = {
+            'formats': ",".join(self.export_formats),
+            'name_pattern': self.export_name_pattern.replace('%', '%%'),
+            'folder': self.export_folder.replace('%', '%%')
+        }
+        
         with open(ini_path, 'w', encoding='utf-8') as configfile:
             config.write(configfile)
 
@@ -0,0 +1,763 @@
+from PyQt6.QtGui import (QTextCursor, QTextCharFormat, QFont, QTextBlockFormat, QColor,
+                         QTextDocument, QTextTableFormat, QTextLength, QTextFrameFormat)
+from PyQt6.QtCore import Qt, QSizeF
+from collections import Counter
+from contextlib import contextmanager
+
+from paperexam import ExamMixin
+from paperoper import OperMixin
+from paperfragments import FragmentCache, RichText, freeze, frozen_value, thawed_value
+from paperfields import field_start, insert_field, insert_segments
+from paperpages import place_blocks
+from papersync import ChangeLedger, EDITOR, FORM, REVERSE
+
+class DocumentMixin:
+    """
+    Миксин построения документа протокола: структура таблиц, данные секций и их отрисовка.
+    Работает только с self.document(), поэтому используется и редактором (A4Editor),
+    и DocumentBuilder, который заполняет обычный QTextDocument в любом потоке.
+    От класса требуются document(), textCursor(), clear(), blockSignals() и request_pagination().
+    """
+
+    # Флаги режимов, от которых зависит структура документа (см. document_state)
+    _state_flags = ('_split_mode', '_sectioned_layout', '_borders_visible', '_operation_mode',
+                    '_surdology_visible', '_repeat_visible', '_sick_leave_visible', '_signature_visible')
+
+    def _init_document(self):
+        # Устанавливаем шрифт по умолчанию
+        default_font = QFont("Times New Roman", 10)
+        self.document().setDefaultFont(default_font)
+        
+        self.base_width = 794 # ~210mm at 96 DPI
+        self.page_ratio = 1.414
+        self.mm_to_px = 3.7795
+        
+        self.page_height_px = int(self.base_width * self.page_ratio)
+        
+        self.margin_left = int(25 * self.mm_to_px)
+        self.margin_top = int(12.7 * self.mm_to_px)
+        self.margin_right = int(12.7 * self.mm_to_px)
+        self.margin_bottom = int(12.7 * self.mm_to_px)
+        
+        self.content_height = self.page_height_px - self.margin_top - self.margin_bottom
+        
+        self.document().setPageSize(QSizeF(self.base_width, self.page_height_px))
+        self.document().setDefaultStyleSheet("ul { margin-top: 0px; margin-bottom: 0px; margin-left: 10px; -qt-list-indent: 0; } ol { margin-top: 0px; margin-bottom: 0px; margin-left: 10px; -qt-list-indent: 0; }")
+
+        # Журнал обмена данными секций с формой (источник и ревизия изменений, счетчики эхо)
+        # и множество применяемых сейчас секций — защита от повторного входа и рекурсии
+        self.sync = ChangeLedger()
+
+        # Visibility flags
+        self._surdology_visible = False
+        self._repeat_visible = False
+        self._sick_leave_visible = False
+        self._signature_visible = True
+        
+        # Настройки отображения
+        self._split_mode = False
+        # Секционная разметка: каждая секция — своя таблица (правка не перекладывает весь документ)
+        self._sectioned_layout = False
+        self._borders_visible = True
+        self._operation_mode = False
+
+        # Cache for data to restore after rebuild
+        self._cached_data = {
+            'date': ("", "", False),
+            'specialty': ("Врач-оториноларинголог", False),
+            'indicators': ("", "", "", False),
+            'complaints': ("", "", False, True, False),
+            'consent': (True,),
+            'objective': ({},),
+            'surdology': ({'enabled': False},),
+            'diagnosis': ("",),
+            'recommendations': ("", True),
+            'repeat': (False, "", ""),
+            'sick_leave': ({'issued': False},),
+            'signature': ("Врач-оториноларинголог", ""),
+            'operation': ({
+                "complaints_anamnesis": "",
+                "informed_consent": True,
+                "general_condition": "Удовлетворительное",
+                "ad": "", "pulse": "", "temp": "",
+                "objective_examination": "",
+                "intervention": "",
+                "intervention_consent": True,
+                "op_number": "",
+                "op_name": "",
+                "op_description": ""
+            },),
+            'op_staff': ("", "")
+        }
+
+        # Хеши входных данных, с которыми секции были отрисованы последний раз.
+        # Если данные не изменились — перерисовку (и пагинацию) пропускаем
+        self._render_hashes = {}
+        self.render_stats = {'rendered': Counter(), 'skipped': Counter()}
+        # Готовые фрагменты тяжёлых секций (объективный осмотр, рекомендации и т.п.)
+        self._fragment_cache = FragmentCache(self.document())
+
+        self.tables = {}
+        self.main_table = None
+        self.row_map = {}
+        # Имя таблицы для каждой секции (режимы "таблица на секцию")
+        self._section_tables = {}
+        # (имя таблицы, строка) -> секция; для поиска секции по позиции в документе
+        self._row_sections = {}
+        # Структура, по которой построен документ (см. _structure_layout)
+        self._structure = None
+        # Документ правили прямо в редакторе (не через данные секций) с последней перестройки
+        self._edited_directly = False
+
+    def document_state(self):
+        """Снимок флагов режимов и данных секций: по нему DocumentBuilder строит такой же документ."""
+        return DocumentState({name: getattr(self, name) for name in self._state_flags},
+                             frozen_value(self._cached_data))
+
+    def load_document_state(self, state):
+        """Применяет снимок document_state (документ нужно перестроить отдельно)."""
+        for name, value in state.flags.items():
+            setattr(self, name, value)
+        self._cached_data = thawed_value(state.data)
+
+    def set_document_margins(self):
+        document = self.document()
+        frame = document.rootFrame()
+        fmt = frame.frameFormat()
+        fmt.setLeftMargin(self.margin_left)
+        fmt.setRightMargin(self.margin_right)
+        fmt.setTopMargin(self.margin_top) 
+        fmt.setBottomMargin(0)
+        frame.setFrameFormat(fmt)
+
+    def set_split_mode(self, enabled):
+        if self._split_mode != enabled:
+            self._split_mode = enabled
+            self.rebuild_document()
+
+    def set_sectioned_layout(self, enabled):
+        if self._sectioned_layout != enabled:
+            self._sectioned_layout = enabled
+            # В раздельном режиме и режиме операции разметка не меняется
+            if not self._split_mode and not self._operation_mode:
+                self.rebuild_document()
+
+    def set_borders_visible(self, visible):
+        # Если состояние не меняется, ничего не делаем, чтобы не вызывать лишних перестроений
+        if self._borders_visible == visible:
+            return
+            
+        self._borders_visible = visible
+        
+        # Рамки — это только формат таблиц, содержимое не перестраиваем
+        with self._updating('structure'):
+            available_width, constraints = self._get_table_constraints()
+            for table in [self.main_table] + list(self.tables.values()):
+                if table is not None:
+                    table.setFormat(self._get_table_format(available_width, constraints))
+            
+    def set_operation_mode(self, enabled):
+        if self._operation_mode != enabled:
+            self._operation_mode = enabled
+            if not enabled:
+                self._signature_visible = True
+            self.rebuild_document()
+
+    def set_signature_visible(self, visible):
+        if self._signature_visible != visible:
+            self._signature_visible = visible
+            if self.update_structure():
+                self.update_signature_from_ui(*self._cached_data['signature'])
+
+    def rebuild_document(self):
+        if self.sync.is_applying('rebuild'): return
+        with self._updating('rebuild'):
+            # Вся перестройка — одна правка документа: раскладка (прежде всего таблицы, в которой
+            # лежат секции) пересчитывается один раз в конце, а не после каждой вставки.
+            # Готовые фрагменты секций (FragmentCache) экономят только их отрисовку
+            cursor = self.textCursor()
+            cursor.beginEditBlock()
+            try:
+                self._build_document()
+            finally:
+                cursor.endEditBlock()
+
+    def _build_document(self):
+        """Строит документ заново: структура активного режима и данные всех секций."""
+        self.clear()
+        self._edited_directly = False
+        self.set_document_margins()
+        self.invalidate_render()
+        
+        self.tables = {}
+        self.main_table = None
+        self.row_map = {}
+        self._section_tables = {}
+        
+        if self._operation_mode:
+            self._build_operation_structure()
+        elif self._split_mode or self._sectioned_layout:
+            self._build_split_structure()
+        else:
+            self._build_single_structure()
+        self._structure = self._structure_layout()
+        self._index_sections()
+
+        # Restore data
+        self.update_date_from_ui(*self._cached_data['date'])
+        self.update_specialty_from_ui(*self._cached_data['specialty'])
+        
+        if self._operation_mode:
+            self.update_operation_from_ui(*self._cached_data['operation'])
+            self.update_diagnosis_from_ui(*self._cached_data['diagnosis'])
+            self.update_operation_staff_from_ui(*self._cached_data['op_staff'])
+            self.update_recommendations_from_ui(*self._cached_data['recommendations'])
+            self._update_op_extra_content()
+        else:
+            self.update_indicators_from_ui(*self._cached_data['indicators'])
+            self.update_complaints_anamnesis_from_ui(*self._cached_data['complaints'])
+            self.update_consent_from_ui(*self._cached_data['consent'])
+            self.update_objective_from_ui(*self._cached_data['objective'])
+            self.update_surdology_from_ui(*self._cached_data['surdology'])
+            self.update_diagnosis_from_ui(*self._cached_data['diagnosis'])
+            self.update_recommendations_from_ui(*self._cached_data['recommendations'])
+            self.update_repeat_from_ui(*self._cached_data['repeat'])
+            self.update_sick_leave_from_ui(*self._cached_data['sick_leave'])
+            
+        self.update_signature_from_ui(*self._cached_data['signature'])
+
+    # --- Структура таблиц ---
+
+    def _structure_layout(self):
+        """Структура активного режима: (режим, [(имя таблицы, строки)])."""
+        if self._operation_mode:
+            return 'operation', [('main', self._operation_row_layout())]
+        if self._split_mode:
+            return 'split', self._exam_table_layout()
+        if self._sectioned_layout:
+            return 'sectioned', self._exam_table_layout()
+        rows = [row for _, table_rows in self._exam_table_layout() for row in table_rows]
+        return 'single', [('main', rows)]
+
+    def _index_sections(self):
+        """Заполняет row_map (строка секции в ее таблице), таблицу каждой секции и обратный индекс."""
+        self.row_map = {}
+        self._section_tables = {}
+        self._row_sections = {}
+        for table_name, rows in self._structure[1]:
+            for name, r in self._row_map_for(rows).items():
+                self.row_map[name] = r
+                self._section_tables[name] = table_name
+                if r != -1:
+                    self._row_sections[(table_name, r)] = name
+
+    def section_at(self, position):
+        """(секция, колонка) ячейки, в которой находится позиция документа, или None."""
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        table = cursor.currentTable()
+        if table is None:
+            return None
+        if table == self.main_table:
+            table_name = 'main'
+        else:
+            table_name = next((name for name, t in self.tables.items() if t == table), None)
+        cell = table.cellAt(cursor)
+        section = self._row_sections.get((table_name, cell.row()))
+        if section is None:
+            return None
+        return section, cell.column()
+
+    def _row_map_for(self, rows):
+        row_map = {}
+        r = 0
+        for name, visible, _ in rows:
+            if visible:
+                row_map[name] = r; r+=1
+            else:
+                row_map[name] = -1
+        return row_map
+
+    def _apply_row_merges(self, table, visible_rows, only=None):
+        for r, (name, _, merges) in enumerate(visible_rows):
+            if only is not None and name not in only:
+                continue
+            for row_offset, col, num_rows, num_cols in merges:
+                table.mergeCells(r + row_offset, col, num_rows, num_cols)
+
+    def _build_main_table(self, rows):
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        
+        visible_rows = [row for row in rows if row[1]]
+
+        available_width, constraints = self._get_table_constraints()
+        table_fmt = self._get_table_format(available_width, constraints)
+        
+        self.main_table = cursor.insertTable(len(visible_rows), 2, table_fmt)
+        self._apply_row_merges(self.main_table, visible_rows)
+
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertBlock()
+
+    def _sync_table_rows(self, table, old_rows, new_rows):
+        """
+        Вставляет/удаляет строки таблицы, чтобы она соответствовала new_rows.
+        Оба списка описывают одни и те же секции в одном порядке, отличаются видимость и объединения.
+        Содержимое остальных строк не трогается.
+        """
+        old_index = self._row_map_for(old_rows)
+        new_index = self._row_map_for(new_rows)
+        changed = [new[0] for old, new in zip(old_rows, new_rows) if old != new]
+        if not changed:
+            return
+
+        # 1. Снимаем старые объединения у измененных строк
+        for name, visible, merges in old_rows:
+            if visible and name in changed:
+                for row_offset, col, _, _ in merges:
+                    table.splitCell(old_index[name] + row_offset, col, 1, 1)
+
+        # 2. Удаляем скрытые строки (снизу вверх, чтобы индексы не сдвигались)
+        for name, visible, _ in reversed(old_rows):
+            if visible and new_index[name] == -1:
+                table.removeRows(old_index[name], 1)
+
+        # 3. Вставляем новые строки сверху вниз — индекс сразу итоговый
+        for name, visible, _ in new_rows:
+            if visible and old_index[name] == -1:
+                table.insertRows(new_index[name], 1)
+
+        # 4. Объединения для вставленных и измененных строк
+        visible_rows = [row for row in new_rows if row[1]]
+        self._apply_row_merges(table, visible_rows, only=changed)
+
+    def update_structure(self):
+        """
+        Приводит таблицы документа к текущим флагам видимости, вставляя или удаляя
+        только затронутые строки (в раздельном режиме — таблицы).
+        Возвращает False, если понадобилась полная перестройка документа.
+        """
+        mode, layout = self._structure_layout()
+        if self._structure is None or self._structure[0] != mode:
+            self.rebuild_document()
+            return False
+
+        # Вставленные/измененные строки пусты или перестроены — их секции нужно отрисовать заново
+        for (_, old_rows), (_, new_rows) in zip(self._structure[1], layout):
+            for old, new in zip(old_rows, new_rows):
+                if old != new:
+                    self.invalidate_render(*self._row_inputs.get(new[0], (new[0],)))
+
+        with self._updating('structure'):
+            old_layout = self._structure[1]
+            if mode in ('split', 'sectioned'):
+                self._sync_split_tables(old_layout, layout)
+            else:
+                self._sync_table_rows(self.main_table, old_layout[0][1], layout[0][1])
+            self._structure = (mode, layout)
+            self._index_sections()
+        return True
+
+    def _get_table_constraints(self):
+        # Используем процентное соотношение для ширины колонок, чтобы при печати
+        # на высоком разрешении таблица не сжималась
+        # col1_width = 150, available_width ~ 700 -> ~21%
+        
+        constraints = [
+            QTextLength(QTextLength.Type.PercentageLength, 21),
+            QTextLength(QTextLength.Type.PercentageLength, 79)
+        ]
+        return self.base_width, constraints
+
+    def _get_table_format(self, width, constraints):
+        fmt = QTextTableFormat()
+        # Используем 100% ширины, чтобы таблица растягивалась
+        fmt.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
+        
+        if self._borders_visible:
+            fmt.setBorder(1)
+            fmt.setBorderStyle(QTextFrameFormat.BorderStyle.BorderStyle_Dashed)
+            fmt.setBorderBrush(QColor(0, 0, 0, 50))
+        else:
+            fmt.setBorder(0)
+            
+        fmt.setColumnWidthConstraints(constraints)
+        fmt.setMargin(0)
+        return fmt
+
+    def get_cell(self, section, row, col):
+        start_row = self.row_map.get(section, -1)
+        if start_row == -1: return None
+        
+        if self._section_tables.get(section, 'main') == 'main':
+            table = self.main_table
+        else:
+            # Таблица на секцию: row_map хранит строку внутри таблицы секции
+            table = self.tables.get(self._section_tables[section])
+        if not table: return None
+        
+        return table.cellAt(start_row + row, col)
+
+    # --- Кэш отрисовки секций ---
+
+    # Ключи _cached_data, отображаемые в строке таблицы (если отличаются от имени строки)
+    _row_inputs = {
+        'header': ('date', 'specialty'),
+        'indicators': ('indicators', 'complaints'),
+        'op_description': ('operation',),
+        'op_recommendations': ('recommendations',),
+        'op_extra': ('repeat', 'sick_leave'),
+    }
+
+    def _render_is_current(self, section):
+        """True, если секция уже отрисована с теми же данными (тогда рендер пропускается)."""
+        key = hash(freeze(self._cached_data[section]))
+        if self._render_hashes.get(section) == key:
+            self.render_stats['skipped'][section] += 1
+            return True
+        self._render_hashes[section] = key
+        self.render_stats['rendered'][section] += 1
+        return False
+
+    def invalidate_render(self, *sections):
+        """Сбрасывает хеши указанных секций (без аргументов — всех)."""
+        if not sections:
+            self._render_hashes.clear()
+            return
+        for section in sections:
+            self._render_hashes.pop(section, None)
+
+    # --- Обмен данными с формой ---
+
+    @contextmanager
+    def _updating(self, *sections):
+        """Программная правка документа: секции помечены применяемыми, сигналы редактора заблокированы."""
+        blocked = self.blockSignals(True)
+        try:
+            with self.sync.applying(*sections):
+                yield
+        finally:
+            self.blockSignals(blocked)
+            self.request_pagination()
+
+    def _render_needed(self, section):
+        """
+        Данные секции из формы уже в _cached_data: нужно ли их отрисовать.
+        Не нужно, если секция сейчас применяется, идет обратный парсинг документа
+        или документ уже показывает эти данные (в т.ч. эхо правки, сделанной в редакторе).
+        """
+        if self.sync.is_applying(section, REVERSE):
+            return False
+        if not self.sync.is_applying('rebuild'):
+            self.sync.record(section, self._cached_data[section], FORM)
+        return not self._render_is_current(section)
+
+    def _emit_from_editor(self, section, value, signal, *args):
+        """
+        Передает в форму данные секции, прочитанные из документа (value — в виде _cached_data).
+        Если форма уже знает это значение, сигнал не отправляется.
+        """
+        # Документ уже показывает эти данные: их эхо из формы перерисовки не вызовет
+        self._render_hashes[section] = hash(freeze(value))
+        if self.sync.record(section, value, EDITOR) is None:
+            return
+        self._cached_data[section] = value
+        signal.emit(*args)
+
+    def _insert_fragment(self, cursor, section, inputs, render):
+        """Вставляет в позицию курсора готовый фрагмент секции (строится один раз на набор данных)."""
+        self._fragment_cache.insert(cursor, section, inputs, render)
+
+    def _insert_rich_text(self, cursor, rich_text):
+        """Текст из поля ввода в шрифте протокола (Times New Roman, кегль поля ввода), если шрифт не задан явно."""
+        base_fmt = QTextCharFormat()
+        base_fmt.setFontFamilies(["Times New Roman"])
+        if rich_text.font is not None and rich_text.font.pointSizeF() > 0:
+            base_fmt.setFontPointSize(rich_text.font.pointSizeF())
+        rich_text.insert(cursor, base_fmt)
+
+    def _rich_text_field(self, cell, key=None):
+        """
+        Форматированный текст ячейки для обратной синхронизации: от начала поля key
+        (без метки и ведущих пробелов) до конца ячейки; key=None — вся ячейка.
+        """
+        document = self.document()
+        end = cell.lastCursorPosition().position()
+        if key is None:
+            start = cell.firstCursorPosition().position()
+        else:
+            start = field_start(cell, key)
+            if start is None:
+                start = end
+            while start < end and document.characterAt(start).isspace():
+                start += 1
+        return RichText.from_range(document, start, end)
+
+    # --- Update Methods ---
+    # Данные секции сначала попадают в _cached_data, затем _render_needed решает, нужна ли
+    # отрисовка; сама отрисовка идет внутри _updating (сигналы редактора заблокированы)
+
+    def update_date_from_ui(self, date_str, time_str, time_enabled):
+        self._cached_data['date'] = (date_str, time_str, time_enabled)
+        if not self._render_needed('date'): return
+        with self._updating('date'):
+            cell = self.get_cell('header', 0, 0)
+            if cell:
+                first_cursor = cell.firstCursorPosition()
+                last_cursor = cell.lastCursorPosition()
+                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
+                first_cursor.removeSelectedText()
+                
+                segments = [(date_str, 'date')]
+                if time_enabled:
+                    segments.append((f"    {time_str}", None))
+                insert_segments(first_cursor, segments)
+
+    def update_specialty_from_ui(self, text, cito):
+        self._cached_data['specialty'] = (text, cito)
+        if not self._render_needed('specialty'): return
+        with self._updating('specialty'):
+            cell = self.get_cell('header', 0, 1)
+            if cell:
+                first_cursor = cell.firstCursorPosition()
+                last_cursor = cell.lastCursorPosition()
+                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
+                first_cursor.removeSelectedText()
+                
+                char_fmt = QTextCharFormat()
+                char_fmt.setFontWeight(QFont.Weight.Bold)
+                block_fmt = QTextBlockFormat()
+                block_fmt.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                
+                first_cursor.setBlockFormat(block_fmt)
+                first_cursor.setCharFormat(char_fmt)
+                
+                if text == "Врач-оториноларинголог":
+                    full_text = "Осмотр ОТОРИНОЛАРИНГОЛОГА"
+                else:
+                    full_text = text.upper()
+                
+                if self._operation_mode:
+                    full_text += " / Предоперационный осмотр"
+                
+                if cito:
+                    full_text += " (Осмотр по Cito!)"
+                
+                first_cursor.insertText(full_text)
+
+    def update_diagnosis_from_ui(self, diagnosis):
+        self._cached_data['diagnosis'] = (diagnosis,)
+        if not self._render_needed('diagnosis'): return
+        with self._updating('diagnosis'):
+            if self._operation_mode:
+                self._update_op_diagnosis(diagnosis)
+            else:
+                self._update_exam_diagnosis(diagnosis)
+
+    def update_recommendations_from_ui(self, recommendations, show_label):
+        self._cached_data['recommendations'] = (recommendations, show_label)
+        if not self._render_needed('recommendations'): return
+        with self._updating('recommendations'):
+            if self._operation_mode:
+                self._update_op_recommendations(recommendations, show_label)
+            else:
+                self._update_exam_recommendations(recommendations, show_label)
+
+    def update_repeat_from_ui(self, enabled, date, time):
+        self._cached_data['repeat'] = (enabled, date, time)
+
+        if enabled != self._repeat_visible:
+            self._repeat_visible = enabled
+            if not self.update_structure():
+                return
+
+        if not self._render_needed('repeat'): return
+        with self._updating('repeat'):
+            if self._operation_mode:
+                self._update_op_extra_content()
+            else:
+                cell = self.get_cell('repeat', 0, 0)
+                if cell and enabled:
+                    first_cursor = cell.firstCursorPosition()
+                    last_cursor = cell.lastCursorPosition()
+                    first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
+                    first_cursor.removeSelectedText()
+                    
+                    char_fmt_bold = QTextCharFormat()
+                    char_fmt_bold.setFontWeight(QFont.Weight.Bold)
+                    
+                    char_fmt_normal = QTextCharFormat()
+                    char_fmt_normal.setFontWeight(QFont.Weight.Normal)
+                    
+                    first_cursor.setCharFormat(char_fmt_bold)
+                    first_cursor.insertText("Повторный прием\n")
+                    
+                    text = date
+                    if time:
+                        text += f" {time}"
+                    insert_field(first_cursor, 'repeat', text, char_fmt_normal, lead="")
+
+    def update_sick_leave_from_ui(self, data):
+        self._cached_data['sick_leave'] = (data,)
+
+        enabled = data.get("issued", False)
+        if enabled != self._sick_leave_visible:
+            self._sick_leave_visible = enabled
+            if not self.update_structure():
+                return
+
+        if not self._render_needed('sick_leave'): return
+        with self._updating('sick_leave'):
+            if self._operation_mode:
+                self._update_op_extra_content()
+            else:
+                cell = self.get_cell('sick_leave', 0, 0)
+                if cell:
+                    first_cursor = cell.firstCursorPosition()
+                    last_cursor = cell.lastCursorPosition()
+                    first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
+                    first_cursor.removeSelectedText()
+                    
+                    if data.get("issued"):
+                        char_fmt = QTextCharFormat()
+                        char_fmt.setFontWeight(QFont.Weight.Normal)
+                        first_cursor.setCharFormat(char_fmt)
+                        insert_segments(first_cursor, self._sick_leave_segments(data), char_fmt)
+
+    def _sick_leave_segments(self, data):
+        """Текст о листке нетрудоспособности кусками (текст, ключ поля): номер и даты помечены."""
+        period = [("Л/Н №" if data.get("continued") else "листок нетрудоспособности №", None),
+                  (f" {data.get('number')}", 'number'), (" с", None),
+                  (f" {data.get('date_from')}", 'date_from'), (" по", None),
+                  (f" {data.get('date_to')}", 'date_to'), (".", None)]
+        person = f"\n{data.get('parent_fio')}, {data.get('parent_dob')} г.р.; Проживает: {data.get('address')}; Место работы, должность: {data.get('job')}"
+
+        if data.get("parent") and data.get("continued"):
+            return [(f"Родителю/опекуну ребенка выдано продолжение листка нетрудоспособности {data.get('prev_number')}: ", None)] + period + [(person, None)]
+        elif data.get("parent"):
+            return [("Родителю/опекуну ребенка выдан ", None)] + period + [(person, None)]
+        elif data.get("continued"):
+            return [(f"Пациенту выдано продолжение листка нетрудоспособности {data.get('prev_number')}: ", None)] + period
+        else:
+            return [("Пациенту выдан ", None)] + period
+
+    def _emit_repeat_field(self, fields):
+        """Обратная синхронизация повторного приема по помеченному полю (дата и время через пробел)."""
+        if 'repeat' in fields:
+            parts = fields['repeat'].split()
+            date = parts[0] if len(parts) > 0 else ""
+            time = parts[1] if len(parts) > 1 else ""
+            self._emit_from_editor('repeat', (True, date, time), self.repeatChangedFromEditor, True, date, time)
+
+    def _emit_sick_leave_fields(self, fields):
+        """Обратная синхронизация больничного по помеченным полям номера и дат."""
+        if not fields.keys() & {'number', 'date_from', 'date_to'}:
+            return
+        data = self._cached_data['sick_leave'][0].copy()
+        if 'number' in fields:
+            data["number"] = fields['number']
+        # Завершающую точку (набранную вручную) у дат отбрасываем
+        for key in ('date_from', 'date_to'):
+            if key in fields:
+                data[key] = fields[key].rstrip('.')
+        self._emit_from_editor('sick_leave', (data,), self.sickLeaveChangedFromEditor, data)
+
+    def _emit_diagnosis(self, diagnosis):
+        """Обратная синхронизация текста диагноза (флаги метки и \"нет патологии\" остаются прежними)."""
+        cached = self._cached_data['diagnosis'][0]
+        value = dict(cached, text=diagnosis) if isinstance(cached, dict) else diagnosis
+        self._emit_from_editor('diagnosis', (value,), self.diagnosisChangedFromEditor, diagnosis)
+
+    def _emit_recommendations(self, recommendations):
+        value = (recommendations,) + self._cached_data['recommendations'][1:]
+        self._emit_from_editor('recommendations', value, self.recommendationsChangedFromEditor, recommendations)
+
+    def update_signature_from_ui(self, specialty, doctor_name):
+        self._cached_data['signature'] = (specialty, doctor_name)
+        if not self._render_needed('signature'): return
+        with self._updating('signature'):
+            cell = self.get_cell('signature', 0, 0)
+            if cell:
+                first_cursor = cell.firstCursorPosition()
+                last_cursor = cell.lastCursorPosition()
+                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
+                first_cursor.removeSelectedText()
+                
+                block_fmt = QTextBlockFormat()
+                block_fmt.setAlignment(Qt.AlignmentFlag.AlignRight)
+                first_cursor.setBlockFormat(block_fmt)
+                
+                char_fmt = QTextCharFormat()
+                char_fmt.setFontWeight(QFont.Weight.Normal)
+                first_cursor.setCharFormat(char_fmt)
+                
+                insert_segments(first_cursor, [(f"{specialty} _________________", None),
+                                               (f" {doctor_name}", 'doctor_name')], char_fmt)
+
+
+
+class DocumentState:
+    """
+    Неизменяемый снимок document_state(): флаги режимов и данные секций. Форматированный текст
+    в нем — собственные копии (FrozenRichText), поэтому один снимок могут читать несколько рабочих
+    потоков сразу. Правки, сделанные прямо в редакторе (форматирование текста), в снимок не входят.
+    """
+    __slots__ = ('flags', 'data')
+
+    def __init__(self, flags, data):
+        self.flags = flags
+        self.data = data
+
+    def document(self):
+        """Новый документ по снимку (в вызывающем потоке) — как DocumentSnapshot.document()."""
+        return DocumentBuilder(self).document()
+
+
+class DocumentBuilder(DocumentMixin, ExamMixin, OperMixin):
+    """
+    Построитель документа протокола без виджета: заполняет собственный QTextDocument
+    тем же кодом, что и редактор. Не привязан к GUI, поэтому может работать в пуле потоков
+    (все, что он читает из снимка, копируется в его поток при load_document_state).
+    """
+
+    def __init__(self, state=None):
+        self._document = QTextDocument()
+        self._document.setUndoRedoEnabled(False)
+        self._init_document()
+        # Как у документа редактора: QTextEdit раскладывает его сплошной лентой шириной виджета
+        # (высота страницы -1), страницы размечает paginate
+        self._document.setPageSize(QSizeF(self.base_width, -1))
+        if state is not None:
+            self.load_document_state(state)
+        self.rebuild_document()
+        self.paginate()
+
+    def document(self):
+        return self._document
+
+    def textCursor(self):
+        return QTextCursor(self._document)
+
+    def clear(self):
+        self._document.clear()
+
+    def blockSignals(self, block):
+        # Сигналов виджета нет: обратная синхронизация с формой не нужна
+        return False
+
+    def request_pagination(self, typing=False):
+        pass
+
+    def paginate(self):
+        """Разметка страниц, как у редактора (см. A4Editor.paginate), — один проход по готовому документу."""
+        document = self._document
+        # Раскладка документа без виджета строится по требованию
+        document.documentLayout().documentSize()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        try:
+            place_blocks(document.begin(), self.margin_top, 0, self.page_height_px,
+                         self.margin_top, self.margin_bottom, [])
+        finally:
+            cursor.endEditBlock()
@@ -0,0 +1,322 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QTextCharFormat, QTextCursor, QTextFormat, QTextLength, QTextListFormat, QTextTable
+from docx import Document
+from docx.shared import Mm, Pt
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import io
+import os
+import zipfile
+
+# Лист A4 протокола (мм): размер и поля слева, справа, сверху, снизу
+PAGE_SIZE = (210, 297)
+PAGE_MARGINS = (25, 12.7, 12.7, 12.7)
+TEXT_WIDTH = PAGE_SIZE[0] - PAGE_MARGINS[0] - PAGE_MARGINS[1]
+
+_NUMBERED_LISTS = {
+    QTextListFormat.Style.ListDecimal,
+    QTextListFormat.Style.ListLowerAlpha, QTextListFormat.Style.ListUpperAlpha,
+    QTextListFormat.Style.ListLowerRoman, QTextListFormat.Style.ListUpperRoman,
+}
+
+# Символы документа, которых нет в тексте DOCX: разрыв строки внутри абзаца
+# (Shift+Enter, <br>) становится переносом run, объекты (картинки) пропускаются,
+# управляющие символы (кроме табуляции) в XML недопустимы
+_RUN_TEXT = str.maketrans({'\u2028': '\n', '\ufffc': None,
+                           **{chr(code): None for code in range(32) if code not in (9, 10)}})
+
+# Служебные символы границ фрейма (таблицы) в тексте документа
+_FRAME_START, _FRAME_END = '\ufdd0', '\ufdd1'
+
+_DOCUMENT_PART = 'word/document.xml'
+
+
+def write_docx(document, file):
+    """
+    Сохраняет QTextDocument в DOCX, обходя его структуру напрямую, без HTML:
+    таблицы -> таблицы, блоки -> абзацы, фрагменты текста -> runs со свойствами их формата.
+    file — имя файла или двоичный файловый объект с произвольным доступом (например, BytesIO).
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'w+b') as stream:
+            DocxWriter().write(document, stream)
+    else:
+        DocxWriter().write(document, file)
+
+
+class DocxWriter:
+    """
+    Обход документа: фреймы и таблицы -> таблицы DOCX, блоки -> абзацы, фрагменты -> runs.
+    Пишется только word/document.xml — потоком прямо в архив; остальные части пакета
+    (стили, нумерация списков, настройки) берутся из заготовки, сжатой один раз на процесс.
+    """
+
+    def __init__(self):
+        self._write = None
+        self._list_styles = None
+
+    def write(self, document, file):
+        skeleton = _package_skeleton()
+        self._list_styles = skeleton.list_styles
+        file.write(skeleton.package)
+        # Дописываем в готовый архив одну часть: сжатые части заготовки не пересжимаются
+        with zipfile.ZipFile(file, 'a', zipfile.ZIP_DEFLATED) as package:
+            with io.TextIOWrapper(package.open(_DOCUMENT_PART, 'w'), encoding='utf-8', newline='') as stream:
+                self._write = stream.write
+                self._write(skeleton.document_head)
+                self._write_frame(document.rootFrame())
+                self._write(skeleton.document_tail)
+        self._write = None
+
+    def _write_frame(self, frame):
+        it = frame.begin()
+        while not it.atEnd():
+            child = it.currentFrame()
+            if isinstance(child, QTextTable):
+                self._write_table(child)
+            elif child is not None:
+                self._write_frame(child)
+            else:
+                self._write_block(it.currentBlock())
+            it += 1
+
+    def _write_table(self, table):
+        rows, columns = table.rows(), table.columns()
+        widths = _column_widths(table.format(), columns)
+        self._write(_table_start_xml(widths))
+
+        for row in range(rows):
+            self._write('<w:tr>')
+            column = 0
+            while column < columns:
+                cell = table.cellAt(row, column)
+                first_column, span = cell.column(), cell.columnSpan()
+                # Объединение по строкам: содержимое в первой строке, в остальных — пустое продолжение
+                first_row = cell.row() == row
+                merge = None if cell.rowSpan() == 1 else ('restart' if first_row else 'continue')
+                self._write(_cell_start_xml(sum(widths[first_column:first_column + span]), span, merge))
+                if not first_row or not self._write_cell(table, cell):
+                    # Ячейка DOCX должна заканчиваться абзацем
+                    self._write('<w:p/>')
+                self._write('</w:tc>')
+                column = first_column + span
+            self._write('</w:tr>')
+        self._write('</w:tbl>')
+
+    def _write_cell(self, table, cell):
+        """Пишет содержимое ячейки; True, если оно заканчивается абзацем."""
+        ends_with_paragraph = False
+        end = cell.lastCursorPosition().position()
+        block = cell.firstCursorPosition().block()
+        while block.isValid() and block.position() <= end:
+            nested = _child_table(QTextCursor(block).currentTable(), table)
+            if nested is None:
+                ends_with_paragraph = self._write_block(block) or ends_with_paragraph
+                block = block.next()
+                continue
+            self._write_table(nested)
+            ends_with_paragraph = False
+            block = table.document().findBlock(nested.lastPosition() + 1)
+        return ends_with_paragraph
+
+    def _write_block(self, block):
+        """Пишет блок абзацем; False, если блок в DOCX не попадает."""
+        if not block.isVisible() or _is_frame_separator(block):
+            return False
+        text_list = block.textList()
+        style = None if text_list is None else self._list_styles[text_list.format().style() in _NUMBERED_LISTS]
+        self._write('<w:p>')
+        self._write(_paragraph_properties_xml(style, _alignment(block.blockFormat().alignment())))
+
+        # Соседние фрагменты, которые различаются только тем, чего нет в DOCX
+        # (например, пометками полей формы), пишутся одним run
+        text, properties = '', None
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            fragment_text = fragment.text().translate(_RUN_TEXT)
+            if fragment_text:
+                fragment_properties = _run_properties(fragment.charFormat())
+                if fragment_properties != properties and text:
+                    self._write(_run_xml(text, properties))
+                    text = ''
+                text += fragment_text
+                properties = fragment_properties
+            it += 1
+        if text:
+            self._write(_run_xml(text, properties))
+        self._write('</w:p>')
+        return True
+
+
+class _Skeleton:
+    __slots__ = ('package', 'document_head', 'document_tail', 'list_styles')
+
+
+_skeleton = None
+
+
+def _package_skeleton():
+    """
+    Заготовка DOCX, общая для всех сохранений: сжатый архив со всеми частями, кроме
+    word/document.xml, начало document.xml (пространства имен) и его конец (свойства раздела:
+    A4 и поля протокола). Строится один раз из шаблона python-docx.
+    """
+    global _skeleton
+    if _skeleton is not None:
+        return _skeleton
+
+    docx = Document()
+    section = docx.sections[0]
+    section.page_width, section.page_height = Mm(PAGE_SIZE[0]), Mm(PAGE_SIZE[1])
+    left, right, top, bottom = (Mm(margin) for margin in PAGE_MARGINS)
+    section.left_margin, section.right_margin = left, right
+    section.top_margin, section.bottom_margin = top, bottom
+
+    font = docx.styles['Normal'].font
+    font.name = 'Times New Roman'
+    font.size = Pt(10)
+
+    template = io.BytesIO()
+    docx.save(template)
+    package = io.BytesIO()
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(package, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            if info.filename == _DOCUMENT_PART:
+                document_xml = source.read(info).decode('utf-8')
+            else:
+                target.writestr(info.filename, source.read(info))
+
+    skeleton = _Skeleton()
+    skeleton.package = package.getvalue()
+    # Тело шаблона — только свойства раздела; содержимое протокола пишется перед ними
+    body = document_xml.index('<w:body>') + len('<w:body>')
+    skeleton.document_head = document_xml[:body]
+    skeleton.document_tail = document_xml[body:]
+    skeleton.list_styles = {
+        False: docx.styles['List Bullet'].style_id,
+        True: docx.styles['List Number'].style_id,
+    }
+    _skeleton = skeleton
+    return skeleton
+
+
+def _is_frame_separator(block):
+    """
+    Пустой блок, который Qt держит перед таблицей и после нее. В протоколе это не строка
+    текста, а граница таблицы; как и при экспорте в HTML, абзацем он не становится
+    (кроме последнего блока документа — документ DOCX заканчивается абзацем).
+    """
+    if block.length() != 1 or not block.next().isValid():
+        return False
+    document = block.document()
+    position = block.position()
+    # Разделитель такого блока — сам символ начала таблицы, или перед блоком — конец таблицы
+    return document.characterAt(position) == _FRAME_START or \
+        (position > 0 and document.characterAt(position - 1) == _FRAME_END)
+
+
+def _child_table(inner, table):
+    """Таблица внутри ячейки table, в которую вложен блок (inner — самая внутренняя), или None."""
+    while inner is not None and inner is not table:
+        parent = inner.parentFrame()
+        if parent is table:
+            return inner
+        while parent is not None and not isinstance(parent, QTextTable):
+            parent = parent.parentFrame()
+        inner = parent
+    return None
+
+
+def _twips(mm):
+    return round(mm * 1440 / 25.4)
+
+
+def _column_widths(table_format, columns):
+    """Ширины колонок в twips; без ограничений ширины (или с переменными) — поровну."""
+    constraints = table_format.columnWidthConstraints()
+    widths = []
+    for length in constraints if len(constraints) == columns else ():
+        if length.type() == QTextLength.Type.PercentageLength:
+            widths.append(_twips(TEXT_WIDTH * length.rawValue() / 100))
+        elif length.type() == QTextLength.Type.FixedLength:
+            widths.append(_twips(length.rawValue() * 25.4 / 96))
+        else:
+            break
+    if len(widths) != columns:
+        widths = [_twips(TEXT_WIDTH / columns)] * columns
+    return tuple(widths)
+
+
+@lru_cache(maxsize=None)
+def _table_start_xml(widths):
+    grid = ''.join(f'<w:gridCol w:w="{width}"/>' for width in widths)
+    return ('<w:tbl><w:tblPr><w:tblW w:type="auto" w:w="0"/><w:tblLayout w:type="fixed"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+            f'</w:tblPr><w:tblGrid>{grid}</w:tblGrid>')
+
+
+@lru_cache(maxsize=None)
+def _cell_start_xml(width, span, merge):
+    span_xml = f'<w:gridSpan w:val="{span}"/>' if span > 1 else ''
+    merge_xml = {None: '', 'restart': '<w:vMerge w:val="restart"/>', 'continue': '<w:vMerge/>'}[merge]
+    return f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{span_xml}{merge_xml}</w:tcPr>'
+
+
+def _alignment(flags):
+    if flags & Qt.AlignmentFlag.AlignHCenter:
+        return 'center'
+    if flags & Qt.AlignmentFlag.AlignRight:
+        return 'right'
+    if flags & Qt.AlignmentFlag.AlignJustify:
+        return 'both'
+    return 'left'
+
+
+@lru_cache(maxsize=None)
+def _paragraph_properties_xml(style, alignment):
+    # Отступ после абзаца 3 pt, одинарный интервал
+    style_xml = f'<w:pStyle w:val="{style}"/>' if style else ''
+    return f'<w:pPr>{style_xml}<w:spacing w:after="60" w:line="240" w:lineRule="auto"/><w:jc w:val="{alignment}"/></w:pPr>'
+
+
+def _run_properties(fmt):
+    """Свойства символьного формата, которые переносятся в run: (жирный, курсив, подчеркнутый, зачеркнутый, размер, индекс)."""
+    size = fmt.fontPointSize() if fmt.hasProperty(QTextFormat.Property.FontPointSize) else None
+    vertical = fmt.verticalAlignment()
+    if vertical == QTextCharFormat.VerticalAlignment.AlignSuperScript:
+        script = 'superscript'
+    elif vertical == QTextCharFormat.VerticalAlignment.AlignSubScript:
+        script = 'subscript'
+    else:
+        script = None
+    return (fmt.fontWeight() >= QFont.Weight.DemiBold.value, fmt.fontItalic(), fmt.fontUnderline(),
+            fmt.fontStrikeOut(), size, script)
+
+
+@lru_cache(maxsize=None)
+def _run_properties_xml(properties):
+    bold, italic, underline, strike, size, script = properties
+    # Порядок элементов задан схемой w:rPr; выставляются только заданные свойства
+    xml = ''.join((
+        '<w:b/>' if bold else '',
+        '<w:i/>' if italic else '',
+        '<w:strike/>' if strike else '',
+        f'<w:sz w:val="{round(size * 2)}"/>' if size else '',
+        '<w:u w:val="single"/>' if underline else '',
+        f'<w:vertAlign w:val="{script}"/>' if script else '',
+    ))
+    return f'<w:rPr>{xml}</w:rPr>' if xml else ''
+
+
+def _run_xml(text, properties):
+    content = []
+    for line_number, line in enumerate(text.split('\n')):
+        if line_number:
+            content.append('<w:br/>')
+        for chunk_number, chunk in enumerate(line.split('\t')):
+            if chunk_number:
+                content.append('<w:tab/>')
+            if chunk:
+                content.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return f'<w:r>{_run_properties_xml(properties)}{"".join(content)}</w:r>'
@@ -0,0 +1,337 @@
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QProgressBar, QToolButton
+from PyQt6.QtCore import QObject, QRunnable, QBuffer, QIODevice, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextDocument, QTextDocumentFragment, QTextDocumentWriter
+from PyQt6.QtPrintSupport import QPrinter
+import io
+import os
+import tempfile
+import threading
+
+# Размер порции записи файла: между порциями обновляется прогресс и проверяется отмена
+WRITE_CHUNK = 256 * 1024
+
+# Форматы сохранения и расширения их файлов
+FORMAT_EXTENSIONS = {'docx': '.docx', 'pdf': '.pdf', 'odt': '.odt', 'html': '.html', 'txt': '.txt'}
+
+# Комплект экспорта по умолчанию (секция [Export] в prefabs.ini): форматы и шаблон имени файлов.
+# В шаблоне доступны поля {date}, {time}, {specialty}, {doctor}, {op_number}
+DEFAULT_BUNDLE_FORMATS = ('docx', 'pdf')
+DEFAULT_NAME_PATTERN = "{date} {time} {specialty}"
+
+# Символы, недопустимые в именах файлов Windows
+_UNSAFE_NAME = str.maketrans({**{char: '_' for char in '<>"/\\|?*'}, ':': '-',
+                              **{chr(code): None for code in range(32)}})
+
+
+def file_format(filename):
+    """Формат сохранения по расширению файла: 'pdf', 'docx', 'odt', 'txt' или 'html' (.doc и прочие)."""
+    extension = os.path.splitext(filename)[1].lower()
+    return {'.pdf': 'pdf', '.docx': 'docx', '.odt': 'odt', '.txt': 'txt'}.get(extension, 'html')
+
+
+class _Fields(dict):
+    def __missing__(self, key):
+        return ''
+
+
+def bundle_base_name(pattern, fields):
+    """
+    Имя файлов комплекта (без расширения) по шаблону str.format из полей протокола;
+    неизвестные поля пустые, некорректный шаблон заменяется DEFAULT_NAME_PATTERN.
+    """
+    try:
+        name = pattern.format_map(_Fields(fields))
+    except (ValueError, IndexError, AttributeError):
+        name = DEFAULT_NAME_PATTERN.format_map(_Fields(fields))
+    name = ' '.join(name.translate(_UNSAFE_NAME).split()).strip(' .')
+    return name or "Протокол"
+
+
+def bundle_file_names(folder, base_name, formats):
+    """
+    Имена файлов комплекта {формат: путь}. Если хотя бы один файл уже есть, ко всем
+    добавляется одинаковый номер " (2)", " (3)"…: прежний комплект не перезаписывается.
+    """
+    number = 1
+    while True:
+        suffix = '' if number == 1 else f' ({number})'
+        names = {fmt: os.path.join(folder, base_name + suffix + FORMAT_EXTENSIONS[fmt]) for fmt in formats}
+        if not any(os.path.exists(name) for name in names.values()):
+            return names
+        number += 1
+
+
+class DocumentSnapshot:
+    """
+    Неизменяемый снимок документа для сохранения в рабочих потоках: фрагмент со всем
+    содержимым и настройки документа, которые переносит QTextDocument.clone().
+    В GUI-потоке делается только фрагмент (примерно половина стоимости clone()); документ
+    по снимку собирает каждый рабочий поток себе сам, так что один снимок служит всем
+    файлам комплекта. Фрагмент читается потоками по очереди — одновременное чтение
+    одного документа Qt не гарантирует.
+    """
+
+    def __init__(self, document):
+        cursor = QTextCursor(document)
+        cursor.select(QTextCursor.SelectionType.Document)
+        self._fragment = QTextDocumentFragment(cursor)
+        self._frame_format = document.rootFrame().frameFormat()
+        self._page_size = document.pageSize()
+        self._text_option = document.defaultTextOption()
+        self._font = document.defaultFont()
+        self._style_sheet = document.defaultStyleSheet()
+        self._lock = threading.Lock()
+
+    def document(self):
+        """Новый документ с содержимым снимка (в вызывающем потоке), в том же порядке, что и clone()."""
+        document = QTextDocument()
+        document.setUndoRedoEnabled(False)
+        with self._lock:
+            QTextCursor(document).insertFragment(self._fragment)
+        document.rootFrame().setFrameFormat(self._frame_format)
+        document.setPageSize(self._page_size)
+        document.setDefaultTextOption(self._text_option)
+        document.setDefaultFont(self._font)
+        document.setDefaultStyleSheet(self._style_sheet)
+        return document
+
+
+class SaveSignals(QObject):
+    progress = pyqtSignal(int, int) # записано байт, всего (0 — файл еще готовится)
+    finished = pyqtSignal(str)      # имя файла
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class SaveTask(QRunnable):
+    """
+    Задача для QThreadPool: сериализует снимок документа (DocumentSnapshot или
+    paperbuilder.DocumentState — документ по нему собирается в рабочем потоке) в нужный формат
+    и пишет его во временный файл рядом с целевым порциями WRITE_CHUNK; целевой файл
+    заменяется готовым только после успешной записи (os.replace), при ошибке или отмене
+    остается прежним. Отмена проверяется после сериализации и между порциями записи.
+    """
+
+    def __init__(self, snapshot, filename, fmt=None, data=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.snapshot = snapshot
+        self.filename = filename
+        self.format = fmt or file_format(filename)
+        # Уже готовое содержимое файла (см. ExportCache) — тогда снимок не нужен
+        self.data = data
+        self.signals = SaveSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def release_snapshot(self):
+        """Отпускает снимок; вызывается в GUI-потоке после завершения задачи."""
+        self.snapshot = None
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            if self.data is None:
+                self.signals.progress.emit(0, 0)
+                # Снимок не отпускаем: его фрагмент создан в GUI-потоке и удаляться должен там же
+                # (задачу освобождает получатель сигнала завершения, см. release_snapshot)
+                document = self.snapshot.document()
+                self.data = serialize(document, self.format)
+                del document
+            if self.is_cancelled() or not self._write(self.data):
+                self.signals.cancelled.emit()
+                return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.filename)
+
+    def _write(self, data):
+        """Пишет данные во временный файл и подменяет им целевой; False при отмене."""
+        folder, name = os.path.split(os.path.abspath(self.filename))
+        fd, temp_name = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                total = len(data)
+                view = memoryview(data)
+                for offset in range(0, total, WRITE_CHUNK):
+                    if self.is_cancelled():
+                        break
+                    file.write(view[offset:offset + WRITE_CHUNK])
+                    self.signals.progress.emit(min(offset + WRITE_CHUNK, total), total)
+                else:
+                    file.flush()
+                    os.fsync(file.fileno())
+            if self.is_cancelled():
+                os.remove(temp_name)
+                return False
+            os.replace(temp_name, self.filename)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+        return True
+
+
+def serialize(document, fmt):
+    """Содержимое файла формата fmt (см. file_format) для документа."""
+    if fmt == 'docx':
+        from paperdocx import write_docx
+        buffer = io.BytesIO()
+        write_docx(document, buffer)
+        return buffer.getvalue()
+    if fmt == 'odt':
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        writer = QTextDocumentWriter(buffer, b'odf')
+        if not writer.write(document):
+            raise OSError("Не удалось сформировать документ ODT")
+        return buffer.data().data()
+    if fmt == 'pdf':
+        return _print_to_pdf(document)
+    if fmt == 'txt':
+        return document.toPlainText().encode('utf-8')
+    return document.toHtml().encode('utf-8')
+
+
+def _print_to_pdf(document):
+    # QPrinter пишет только в файл — печатаем в локальный временный и читаем его
+    fd, temp_name = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
+        printer.setOutputFileName(temp_name)
+        document.print(printer)
+        # Файл дописывается при уничтожении QPainter внутри print(); закрываем и принтер
+        del printer
+        with open(temp_name, 'rb') as file:
+            return file.read()
+    finally:
+        os.remove(temp_name)
+
+
+class ExportCache:
+    """
+    Представления документа для копирования, печати и сохранения (форматы буфера
+    обмена, документ для печати, содержимое файлов): считаются один раз и служат всем действиям
+    до следующей правки. Ключ — ревизия документа и счетчик его изменений
+    (правки без стека отмены ревизию не меняют).
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._changes = 0
+        self._key = None
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        document.contentsChanged.connect(self._on_contents_changed)
+
+    def _on_contents_changed(self):
+        self._changes += 1
+
+    def key(self):
+        return (self.document.revision(), self._changes)
+
+    def get(self, name, build):
+        """Значение name для текущего состояния документа; build() вызывается, только если его еще нет."""
+        entries = self._current()
+        if name in entries:
+            self.hits += 1
+            return entries[name]
+        self.misses += 1
+        value = entries[name] = build()
+        return value
+
+    def peek(self, name):
+        """Значение name, если оно уже посчитано для текущего состояния документа, иначе None."""
+        return self._current().get(name)
+
+    def put(self, key, name, value):
+        """Запоминает значение, посчитанное для состояния key (например, в рабочем потоке), если документ с тех пор не менялся."""
+        if key == self.key():
+            self._current()[name] = value
+
+    def clear(self):
+        self._entries = {}
+
+    def _current(self):
+        key = self.key()
+        if key != self._key:
+            self._key = key
+            self._entries = {}
+        return self._entries
+
+
+class SaveProgressIndicator(QWidget):
+    """
+    Индикатор сохранения для строки состояния: что сохраняется, общий прогресс записи
+    всех идущих сохранений (например, файлов комплекта) и кнопка их отмены.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+
+        self.label = QLabel()
+        layout.addWidget(self.label)
+
+        self.progress = QProgressBar()
+        self.progress.setFixedWidth(160)
+        self.progress.setTextVisible(False)
+        layout.addWidget(self.progress)
+
+        self.btn_cancel = QToolButton()
+        self.btn_cancel.setText("✕")
+        self.btn_cancel.setToolTip("Отменить сохранение")
+        self.btn_cancel.clicked.connect(self.cancel)
+        layout.addWidget(self.btn_cancel)
+
+        self._tasks = {}    # SaveTask -> (записано байт, всего)
+        self.hide()
+
+    def track(self, task):
+        """Добавляет задачу SaveTask к показываемым до ее завершения."""
+        self._tasks[task] = (0, 0)
+        task.signals.progress.connect(lambda done, total: self._on_progress(task, done, total))
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *args: self._on_done(task))
+        self._update()
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def _on_progress(self, task, done, total):
+        if task in self._tasks:
+            self._tasks[task] = (done, total)
+            self._update()
+
+    def _on_done(self, task):
+        self._tasks.pop(task, None)
+        self._update()
+
+    def _update(self):
+        if not self._tasks:
+            self.hide()
+            return
+        if len(self._tasks) == 1:
+            self.label.setText(f"Сохранение: {os.path.basename(next(iter(self._tasks)).filename)}")
+        else:
+            self.label.setText(f"Сохранение файлов: {len(self._tasks)}")
+
+        # Пока хоть один файл готовится, общий размер неизвестен — бегущий индикатор
+        progress = self._tasks.values()
+        if any(total == 0 for done, total in progress):
+            self.progress.setRange(0, 0)
+        else:
+            self.progress.setRange(0, sum(total for done, total in progress))
+            self.progress.setValue(sum(done for done, total in progress))
+        self.show()
@@ -0,0 +1,134 @@
+from PyQt6.QtGui import QTextCharFormat, QTextCursor, QTextFormat
+
+# Свойство символьного формата: ключ поля формы, которому принадлежит текст.
+# Значения полей в документе помечаются этим свойством при отрисовке, а обратный
+# парсинг читает их напрямую по пометкам, без регулярных выражений по тексту.
+FIELD_PROPERTY = QTextFormat.Property.UserProperty.value + 1
+
+
+def current_format(cursor):
+    """Формат, с которым insertText(text) вставил бы текст в позиции курсора."""
+    fmt = cursor.charFormat()
+    fmt.clearProperty(QTextFormat.Property.ObjectType)
+    return fmt
+
+
+def field_format(key, char_format=None):
+    fmt = QTextCharFormat(char_format) if char_format is not None else QTextCharFormat()
+    fmt.setProperty(FIELD_PROPERTY, key)
+    return fmt
+
+
+def insert_field(cursor, key, text, char_format=None, lead=" "):
+    """
+    Вставляет значение поля, помеченное ключом key.
+    Разделитель lead перед значением входит в поле: набранный после него текст
+    наследует пометку, поэтому в пустое поле тоже можно печатать.
+    """
+    restore = current_format(cursor) if char_format is None else char_format
+    fmt = field_format(key, restore)
+    if not lead and cursor.atBlockStart():
+        # Поле в начале абзаца помечаем и в формате самого абзаца: если значение
+        # сотрут целиком, набранный заново текст все равно попадет в поле
+        cursor.setBlockCharFormat(fmt)
+    if lead or text:
+        cursor.insertText(lead + text, fmt)
+    cursor.setCharFormat(restore)
+
+
+def insert_segments(cursor, segments, char_format=None):
+    """Вставляет текст из кусков (текст, ключ поля или None); поля — с пометкой, разделитель — в тексте куска."""
+    if char_format is None:
+        char_format = current_format(cursor)
+    for text, key in segments:
+        if key:
+            insert_field(cursor, key, text, char_format, lead="")
+        else:
+            cursor.insertText(text, char_format)
+    cursor.setCharFormat(char_format)
+
+
+def mark_field(cursor, start, key):
+    """Помечает ключом key текст от start до позиции курсора (например, вставленный через insertHtml)."""
+    end = cursor.position()
+    if end <= start:
+        return
+    restore = current_format(cursor)
+    selection = QTextCursor(cursor.document())
+    selection.setPosition(start)
+    selection.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    selection.mergeCharFormat(field_format(key))
+    cursor.setCharFormat(restore)
+
+
+def read_fields(cell):
+    """
+    Значения помеченных полей ячейки таблицы: {ключ: текст без крайних пробелов}.
+    Поле может занимать несколько абзацев — они соединяются переводом строки.
+    """
+    values = {}
+    last_block = {}
+    end = cell.lastCursorPosition().position()
+    block = cell.firstCursorPosition().block()
+    while block.isValid() and block.position() <= end:
+        number = block.blockNumber()
+        if block.length() == 1:
+            # Пустой абзац: поле могло быть помечено только форматом абзаца
+            key = block.charFormat().property(FIELD_PROPERTY)
+            if key:
+                values.setdefault(key, "")
+                last_block.setdefault(key, number)
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            key = fragment.charFormat().property(FIELD_PROPERTY)
+            if key:
+                if key in values and last_block[key] != number:
+                    values[key] += "\n"
+                values[key] = values.get(key, "") + fragment.text()
+                last_block[key] = number
+            it += 1
+        block = block.next()
+    return {key: text.strip() for key, text in values.items()}
+
+
+def field_start(cell, key):
+    """Позиция начала поля key в ячейке таблицы (None, если поля в ячейке нет)."""
+    end = cell.lastCursorPosition().position()
+    block = cell.firstCursorPosition().block()
+    while block.isValid() and block.position() <= end:
+        if block.length() == 1 and block.charFormat().property(FIELD_PROPERTY) == key:
+            return block.position()
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            if fragment.charFormat().property(FIELD_PROPERTY) == key:
+                return fragment.position()
+            it += 1
+        block = block.next()
+    return None
+
+
+def field_range(cell, key):
+    """
+    Диапазон (начало, конец) поля key в ячейке таблицы, включая разделитель перед значением;
+    None, если поля в ячейке нет. Пустое поле в пустом абзаце дает (начало, начало).
+    """
+    start = end = None
+    last = cell.lastCursorPosition().position()
+    block = cell.firstCursorPosition().block()
+    while block.isValid() and block.position() <= last:
+        if block.length() == 1 and block.charFormat().property(FIELD_PROPERTY) == key:
+            if start is None:
+                start = block.position()
+            end = block.position()
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            if fragment.charFormat().property(FIELD_PROPERTY) == key:
+                if start is None:
+                    start = fragment.position()
+                end = fragment.position() + fragment.length()
+            it += 1
+        block = block.next()
+    return None if start is None else (start, end)
@@ -0,0 +1,334 @@
+from PyQt6.QtGui import QFont, QTextBlockFormat, QTextCharFormat, QTextCursor, QTextDocument, QTextDocumentFragment, QTextFormat
+from collections import OrderedDict
+import itertools
+import threading
+
+
+def freeze(value):
+    """Приводит входные данные секции (словари, списки) к хешируемому виду."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class FragmentCache:
+    """
+    LRU-кэш готовых фрагментов секций, ключ — (секция, нормализованные входные данные).
+    Фрагмент строится один раз во вспомогательном документе тем же кодом отрисовки,
+    что и в редакторе, и затем вставляется в ячейку одной операцией insertFragment.
+    """
+
+    def __init__(self, template_document, max_size=64):
+        self.template_document = template_document
+        self.max_size = max_size
+        self._fragments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self._fragments.clear()
+
+    def fragment(self, section, inputs, render):
+        """
+        Фрагмент для секции; render(cursor, start, *inputs) рисует содержимое в пустой документ.
+        Возвращает (фрагмент, формат первого блока).
+        """
+        key = (section, freeze(inputs))
+        entry = self._fragments.get(key)
+        if entry is not None:
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self._build(inputs, render)
+        self._fragments[key] = entry
+        if len(self._fragments) > self.max_size:
+            self._fragments.popitem(last=False)
+        return entry
+
+    def insert(self, cursor, section, inputs, render):
+        """Вставляет фрагмент секции в позицию курсора (обычно в только что очищенную ячейку)."""
+        fragment, block_fmt = self.fragment(section, inputs, render)
+
+        # insertFragment сливает первый блок фрагмента с текущим и сохраняет формат текущего,
+        # поэтому формат первого блока переносим вручную (и выводим блок из списка, если он там был)
+        current_list = cursor.currentList()
+        if current_list is not None:
+            current_list.remove(cursor.block())
+        cursor.setBlockFormat(block_fmt)
+        cursor.insertFragment(fragment)
+
+    def _build(self, inputs, render):
+        # Черновой документ с теми же шрифтом и стилями, что и документ редактора
+        scratch = QTextDocument()
+        scratch.setDefaultFont(self.template_document.defaultFont())
+        scratch.setDefaultStyleSheet(self.template_document.defaultStyleSheet())
+
+        # Рисуем со второго блока: в начале пустого документа insertHtml берет формат первого абзаца
+        # из HTML, а в ячейке редактора — сохраняет формат ячейки. Первый блок в фрагмент не входит
+        cursor = QTextCursor(scratch)
+        cursor.insertBlock()
+        start = cursor.position()
+        render(cursor, start, *inputs)
+
+        first = scratch.findBlock(start)
+        block_fmt = QTextBlockFormat(first.blockFormat())
+        block_fmt.clearProperty(QTextFormat.Property.ObjectIndex)
+
+        cursor.setPosition(start)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        return QTextDocumentFragment(cursor), block_fmt
+
+
+class RichText:
+    """
+    Форматированный текст поля ввода (диагноз, рекомендации) для переноса между документами
+    формы и редактора: фрагмент документа и базовый шрифт источника. Переносится вставкой
+    фрагмента, без сериализации в HTML; toHtml() — только для тех, кому нужна строка.
+    Значение неизменяемо; равенство (и хеш рендера) — по номеру снимка или по ревизии источника.
+    """
+    __slots__ = ('_fragment', '_document', 'font', 'key', '_styled')
+    _serials = itertools.count(1)
+
+    def __init__(self, fragment, font=None):
+        self._fragment = fragment
+        self._document = None
+        self.font = font
+        self.key = next(self._serials)
+        self._styled = None
+
+    @classmethod
+    def from_document(cls, document):
+        """Снимок всего содержимого документа."""
+        cursor = QTextCursor(document)
+        cursor.select(QTextCursor.SelectionType.Document)
+        return cls(QTextDocumentFragment(cursor), document.defaultFont())
+
+    @classmethod
+    def from_range(cls, document, start, end):
+        """Снимок диапазона документа (например, содержимого ячейки без метки)."""
+        cursor = QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(max(start, end), QTextCursor.MoveMode.KeepAnchor)
+        return cls(QTextDocumentFragment(cursor), document.defaultFont())
+
+    @classmethod
+    def lazy(cls, document):
+        """
+        Уведомление об изменении документа поля ввода: источник и номер его ревизии, без копирования.
+        Снимок делается при первом обращении к fragment — обычно один раз за проход обновления
+        редактора и только для последнего из уведомлений, пришедших за это время.
+        """
+        if not document.isUndoRedoEnabled():
+            # Без стека отмены ревизия документа не меняется — различать правки нечем
+            return cls.from_document(document)
+        value = cls(None, document.defaultFont())
+        value._document = document
+        value.key = (id(document), document.revision())
+        return value
+
+    @property
+    def fragment(self):
+        if self._fragment is None:
+            cursor = QTextCursor(self._document)
+            cursor.select(QTextCursor.SelectionType.Document)
+            self._fragment = QTextDocumentFragment(cursor)
+            self._document = None
+        return self._fragment
+
+    def __bool__(self):
+        if self._fragment is None:
+            return not self._document.isEmpty()
+        return not self._fragment.isEmpty()
+
+    def __eq__(self, other):
+        return isinstance(other, RichText) and other.key == self.key
+
+    def __hash__(self):
+        return hash((RichText, self.key))
+
+    def __deepcopy__(self, memo):
+        # Неизменяемое значение — снимок состояния документа может делить его
+        return self
+
+    def frozen(self):
+        """Копия текста для передачи в другой поток (см. FrozenRichText); делается в потоке владельца."""
+        return FrozenRichText(_copied(self.fragment), self.font)
+
+    def toHtml(self):
+        return self.fragment.toHtml()
+
+    def toPlainText(self):
+        return self.fragment.toPlainText()
+
+    def styled(self, base_format):
+        """
+        Фрагмент, в котором текст без явно заданных свойств получает свойства base_format.
+        Форматы правятся во вспомогательном документе (правки в документе редактора дороги:
+        каждая вызывает его обработчики изменений) и запоминаются для повторных вставок.
+        """
+        if self._styled is not None and self._styled[0] == base_format:
+            return self._styled[1]
+
+        def inherit(fmt):
+            merged = QTextCharFormat(base_format)
+            merged.merge(fmt)
+            return merged
+
+        fragment = _restyled(self.fragment, inherit)
+        self._styled = (QTextCharFormat(base_format), fragment)
+        return fragment
+
+    def insert(self, cursor, base_format=None):
+        """Вставляет текст в позицию курсора одной правкой (base_format — см. styled)."""
+        cursor.insertFragment(self.fragment if base_format is None else self.styled(base_format))
+
+    def replace_contents(self, document, drop_family=None):
+        """
+        Заменяет содержимое документа этим текстом одной правкой (одним шагом отмены).
+        drop_family — семейство шрифта, которое снимается с текста (он получит шрифт документа).
+        """
+        fragment = self.fragment
+        if drop_family:
+            fragment = _restyled(fragment, lambda fmt: _without_family(fmt, drop_family))
+
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.removeSelectedText()
+        cursor.setBlockFormat(QTextBlockFormat())
+        cursor.insertFragment(fragment)
+        cursor.endEditBlock()
+
+    def matches(self, document, drop_family=None):
+        """
+        True, если документ уже содержит этот текст с теми же форматами (и replace_contents
+        с тем же drop_family ничего бы не изменил). Сначала сравнивается простой текст —
+        он дешев и обычно уже отличается; блоки и форматы сравниваются, только если он совпал.
+        """
+        if self.toPlainText() != document.toPlainText():
+            return False
+        # Результат замены получаем тем же кодом, но во вспомогательном документе
+        scratch = QTextDocument()
+        scratch.setUndoRedoEnabled(False)
+        self.replace_contents(scratch, drop_family)
+        return _runs(scratch) == _runs(document)
+
+
+class FrozenRichText:
+    """
+    Форматированный текст в снимке состояния документа (см. DocumentState): собственная копия
+    фрагмента, не связанная с RichText редактора. Рабочие потоки получают из него свой RichText
+    (thawed) — так кэш styled() и фрагмент источника потокам не достаются. Одновременное чтение
+    одного фрагмента Qt не гарантирует, поэтому копии снимаются по очереди.
+    """
+    __slots__ = ('_fragment', 'font', '_lock')
+
+    def __init__(self, fragment, font=None):
+        self._fragment = fragment
+        self.font = QFont(font) if font is not None else None
+        self._lock = threading.Lock()
+        # Первая вставка фрагмента создает в его документе объекты (списки) — делаем ее здесь,
+        # в потоке владельца: рабочему потоку Qt не дает создавать дочерние объекты чужого документа
+        _copied(fragment)
+
+    def thawed(self):
+        """Новый RichText с копией текста в вызывающем потоке."""
+        with self._lock:
+            fragment = _copied(self._fragment)
+        return RichText(fragment, QFont(self.font) if self.font is not None else None)
+
+
+def frozen_value(value):
+    """Копия входных данных секции, в которой RichText заменен на FrozenRichText."""
+    if isinstance(value, RichText):
+        return value.frozen()
+    if isinstance(value, dict):
+        return {k: frozen_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(frozen_value(v) for v in value)
+    return value
+
+
+def thawed_value(value):
+    """Обратное к frozen_value: новая копия данных с RichText вызывающего потока."""
+    if isinstance(value, FrozenRichText):
+        return value.thawed()
+    if isinstance(value, dict):
+        return {k: thawed_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(thawed_value(v) for v in value)
+    return value
+
+
+def _copied(fragment):
+    """Независимая копия фрагмента (со своим документом), созданная в вызывающем потоке."""
+    document = QTextDocument()
+    document.setUndoRedoEnabled(False)
+    cursor = QTextCursor(document)
+    cursor.insertFragment(fragment)
+    cursor.select(QTextCursor.SelectionType.Document)
+    return QTextDocumentFragment(cursor)
+
+
+def _restyled(fragment, transform):
+    """
+    Копия фрагмента с измененными символьными форматами:
+    transform(формат) возвращает новый формат или None, если текст не меняется.
+    """
+    document = QTextDocument()
+    cursor = QTextCursor(document)
+    cursor.insertFragment(fragment)
+
+    # Сначала собираем диапазоны: правка формата сливает соседние фрагменты
+    ranges = []
+    block = document.begin()
+    while block.isValid():
+        it = block.begin()
+        while not it.atEnd():
+            text_fragment = it.fragment()
+            fmt = transform(text_fragment.charFormat())
+            if fmt is not None:
+                ranges.append((text_fragment.position(), text_fragment.length(), fmt))
+            it += 1
+        block = block.next()
+
+    if not ranges:
+        return fragment
+    for position, length, fmt in ranges:
+        cursor.setPosition(position)
+        cursor.setPosition(position + length, QTextCursor.MoveMode.KeepAnchor)
+        cursor.setCharFormat(fmt)
+    cursor.select(QTextCursor.SelectionType.Document)
+    return QTextDocumentFragment(cursor)
+
+
+def _without_family(fmt, family):
+    """Формат без семейства шрифта family (None, если его там нет)."""
+    if family not in (fmt.fontFamilies() or ()):
+        return None
+    fmt.clearProperty(QTextFormat.Property.FontFamilies)
+    return fmt
+
+
+def _runs(document):
+    """Содержимое документа для сравнения: блоки (текст, формат, список) и их фрагменты (текст, формат)."""
+    runs = []
+    block = document.begin()
+    while block.isValid():
+        # Номер объекта списка у разных документов свой — сравниваем формат самого списка
+        block_fmt = block.blockFormat()
+        block_fmt.clearProperty(QTextFormat.Property.ObjectIndex)
+        text_list = block.textList()
+        runs.append((block.text(), block_fmt, text_list.format() if text_list else None))
+
+        it = block.begin()
+        while not it.atEnd():
+            text_fragment = it.fragment()
+            runs.append((text_fragment.text(), text_fragment.charFormat()))
+            it += 1
+        block = block.next()
+    return runs
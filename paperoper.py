@@ -3,78 +3,45 @@ from PyQt6.QtGui import (QTextCursor, QTextCharFormat, QFont, QTextBlockFormat,
 from PyQt6.QtCore import Qt
 import re
 
+from paperfields import insert_field, insert_segments, mark_field, read_fields
+from paperfragments import RichText
+
 class OperMixin:
     """
     Миксин, отвечающий за логику Режима Операции (Operation Mode).
     """
 
-    def _build_operation_structure(self):
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.Start)
-        
-        # Calculate indices
-        r = 0
-        self.row_map['header'] = r; r+=1
-        self.row_map['operation'] = r; r+=1
-        self.row_map['op_description'] = r; r+=1 
-        self.row_map['diagnosis'] = r; r+=1 
-        self.row_map['op_staff'] = r; r+=1 
-        self.row_map['op_recommendations'] = r; r+=1 
-        
-        # Добавляем строку для доп. информации (повторный прием / больничный), если нужно
-        if self._repeat_visible or self._sick_leave_visible:
-            self.row_map['op_extra'] = r; r+=1
-        else:
-            self.row_map['op_extra'] = -1
-            
-        # Добавляем строку подписи, если она видима
-        if self._signature_visible:
-            self.row_map['signature'] = r; r+=1
-        else:
-            self.row_map['signature'] = -1
-            
-        total_rows = r
-
-        available_width, constraints = self._get_table_constraints()
-        table_fmt = self._get_table_format(available_width, constraints)
-        
-        self.main_table = cursor.insertTable(total_rows, 2, table_fmt)
-        
-        # Merge cells
-        self.main_table.mergeCells(self.row_map['operation'], 0, 1, 2)
-        self.main_table.mergeCells(self.row_map['op_description'], 0, 1, 2) 
-        self.main_table.mergeCells(self.row_map['diagnosis'], 0, 1, 2)
-        self.main_table.mergeCells(self.row_map['op_staff'], 0, 1, 2)
-        self.main_table.mergeCells(self.row_map['op_recommendations'], 0, 1, 2)
-        
-        if self.row_map['op_extra'] != -1:
-            self.main_table.mergeCells(self.row_map['op_extra'], 0, 1, 2)
-            
-        if self.row_map['signature'] != -1:
-            self.main_table.mergeCells(self.row_map['signature'], 0, 1, 2)
+    def _operation_row_layout(self):
+        """Строки таблицы режима операции: (секция, видима ли, объединения ячеек)."""
+        full = ((0, 0, 1, 2),)
+        return [
+            ('header', True, ()),
+            ('operation', True, full),
+            ('op_description', True, full),
+            ('diagnosis', True, full),
+            ('op_staff', True, full),
+            ('op_recommendations', True, full),
+            # Строка для доп. информации (повторный прием / больничный), если нужно
+            ('op_extra', self._repeat_visible or self._sick_leave_visible, full),
+            # Строка подписи, если она видима
+            ('signature', self._signature_visible, full),
+        ]
 
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        cursor.insertBlock()
+    def _build_operation_structure(self):
+        self._build_main_table(self._operation_row_layout())
 
     # --- Update Methods (Operation) ---
 
     def update_operation_from_ui(self, data):
         self._cached_data['operation'] = (data,)
-        if self._updating_operation or self._checking_content: return
-        self._updating_operation = True
-        self.blockSignals(True)
-        try:
+        if not self._render_needed('operation'): return
+        with self._updating('operation'):
             # 1. Предоперационный осмотр
             self._update_preop_exam(data)
 
             # 2. Оперативное вмешательство (описание)
             self._update_op_description(data)
 
-        finally:
-            self.blockSignals(False)
-            self._updating_operation = False
-            self.paginate()
-
     def _update_preop_exam(self, data):
         cell = self.get_cell('operation', 0, 0)
         if not cell: return
@@ -114,7 +81,9 @@ class OperMixin:
         complaints_html = data.get("complaints_anamnesis", "")
         if complaints_html:
             complaints_html = f'<span style="font-family: \'Times New Roman\';">{complaints_html}</span>'
+            field_start = first_cursor.position()
             first_cursor.insertHtml(complaints_html)
+            mark_field(first_cursor, field_start, 'complaints_anamnesis')
             first_cursor.insertText("\n")
 
         # Согласие
@@ -155,25 +124,25 @@ class OperMixin:
         
         if ad:
             first_cursor.setCharFormat(char_fmt_bold)
-            first_cursor.insertText("АД: ")
-            first_cursor.setCharFormat(char_fmt_normal)
-            first_cursor.insertText(f"{ad} мм.рт.ст")
+            first_cursor.insertText("АД:")
+            insert_field(first_cursor, 'ad', ad, char_fmt_normal)
+            first_cursor.insertText(" мм.рт.ст")
             line_parts.append("")
             
         if pulse:
             if line_parts or (general_condition and ad): first_cursor.insertText("; ")
             first_cursor.setCharFormat(char_fmt_bold)
-            first_cursor.insertText("Пульс: ")
-            first_cursor.setCharFormat(char_fmt_normal)
-            first_cursor.insertText(f"{pulse} в минуту")
+            first_cursor.insertText("Пульс:")
+            insert_field(first_cursor, 'pulse', pulse, char_fmt_normal)
+            first_cursor.insertText(" в минуту")
             line_parts.append("")
 
         if temp:
             if line_parts or (general_condition and (ad or pulse)): first_cursor.insertText("; ")
             first_cursor.setCharFormat(char_fmt_bold)
-            first_cursor.insertText("Т. тела: ")
-            first_cursor.setCharFormat(char_fmt_normal)
-            first_cursor.insertText(f"{temp} С°")
+            first_cursor.insertText("Т. тела:")
+            insert_field(first_cursor, 'temp', temp, char_fmt_normal)
+            first_cursor.insertText(" С°")
             line_parts.append("")
         
         if general_condition or line_parts:
@@ -185,7 +154,9 @@ class OperMixin:
         first_cursor.setCharFormat(char_fmt_bold)
         first_cursor.insertText("St. localis:")
         
+        # Пробел после метки входит в поле, чтобы в пустое поле можно было печатать
         first_cursor.setCharFormat(char_fmt_normal)
+        field_start = first_cursor.position()
         first_cursor.insertText(" ")
         
         if objective_examination:
@@ -193,6 +164,7 @@ class OperMixin:
             if clean_obj_text:
                 obj_html = f'<span style="font-family: \'Times New Roman\'; font-weight: normal;">{clean_obj_text}</span>'
                 first_cursor.insertHtml(obj_html)
+        mark_field(first_cursor, field_start, 'objective_examination')
         
         first_cursor.insertText("\n")
 
@@ -204,6 +176,7 @@ class OperMixin:
         first_cursor.insertText("С лечебно-диагностической целью показано:")
         
         first_cursor.setCharFormat(char_fmt_normal)
+        field_start = first_cursor.position()
         first_cursor.insertText(" ")
         
         if intervention:
@@ -211,6 +184,7 @@ class OperMixin:
             if clean_intervention:
                 int_html = f'<span style="font-family: \'Times New Roman\'; font-weight: normal;">{clean_intervention}</span>'
                 first_cursor.insertHtml(int_html)
+        mark_field(first_cursor, field_start, 'intervention')
         
         first_cursor.insertText("\n")
 
@@ -229,6 +203,9 @@ class OperMixin:
         first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
         first_cursor.removeSelectedText()
         
+        self._insert_fragment(first_cursor, 'op_description', (data,), self._render_op_description)
+
+    def _render_op_description(self, first_cursor, start, data):
         font = QFont("Times New Roman", 10)
         char_fmt_base = QTextCharFormat()
         char_fmt_base.setFont(font)
@@ -245,15 +222,14 @@ class OperMixin:
         # Номер
         first_cursor.setBlockFormat(block_fmt_center)
         first_cursor.setCharFormat(char_fmt_bold)
-        first_cursor.insertText("Оперативное вмешательство № ")
-        first_cursor.insertText(data.get("op_number", ""))
+        first_cursor.insertText("Оперативное вмешательство №")
+        insert_field(first_cursor, 'op_number', data.get("op_number", ""), char_fmt_bold)
         first_cursor.insertText("\n")
         
         # Название
         op_name = data.get("op_name", "")
         if op_name:
-            first_cursor.setCharFormat(char_fmt_bold)
-            first_cursor.insertText(op_name)
+            insert_field(first_cursor, 'op_name', op_name, char_fmt_bold, lead="")
             first_cursor.insertText("\n")
         
         # Описание
@@ -263,7 +239,12 @@ class OperMixin:
             first_cursor.setCharFormat(char_fmt_normal)
             clean_desc = re.sub(r'</?p[^>]*>', '', op_desc).strip()
             desc_html = f'<span style="font-family: \'Times New Roman\';">{clean_desc}</span>'
+            field_start = first_cursor.position()
             first_cursor.insertHtml(desc_html)
+            mark_field(first_cursor, field_start, 'op_description')
+        else:
+            # Пустая последняя строка — место для описания, набранного прямо в документе
+            insert_field(first_cursor, 'op_description', "", char_fmt_normal, lead="")
 
     def _update_op_diagnosis(self, diagnosis):
         """Логика обновления диагноза для режима операции"""
@@ -289,24 +270,27 @@ class OperMixin:
                 first_cursor.setCharFormat(char_fmt_bold)
                 first_cursor.insertText("ДИАГНОЗ: ")
                 
-                # Сбрасываем форматирование на обычное и добавляем пробел
+                # Сбрасываем форматирование на обычное и добавляем пробел (с него начинается поле диагноза)
                 first_cursor.setCharFormat(char_fmt_normal)
+                field_pos = first_cursor.position()
                 first_cursor.insertText(" ")
                 
-                if text_val:
+                if isinstance(text_val, RichText):
+                    self._insert_rich_text(first_cursor, text_val)
+                elif text_val:
                     styled_html = text_val
                     styled_html = styled_html.replace("font-family:'Segoe UI';", "font-family:'Times New Roman';")
                     styled_html = styled_html.replace('font-family:"Segoe UI";', 'font-family:"Times New Roman";')
                     styled_html = f'<span style="font-family: \'Times New Roman\'; font-weight: normal;">{styled_html}</span>'
                     first_cursor.insertHtml(styled_html)
+                mark_field(first_cursor, field_pos, 'diagnosis')
         except Exception as e:
             print(f"Error updating op diagnosis: {e}")
 
     def update_operation_staff_from_ui(self, operator, nurse):
         self._cached_data['op_staff'] = (operator, nurse)
-        if self._checking_content: return
-        self.blockSignals(True)
-        try:
+        if not self._render_needed('op_staff'): return
+        with self._updating('op_staff'):
             cell = self.get_cell('op_staff', 0, 0)
             if cell:
                 first_cursor = cell.firstCursorPosition()
@@ -322,11 +306,8 @@ class OperMixin:
                 char_fmt.setFontWeight(QFont.Weight.Normal)
                 first_cursor.setCharFormat(char_fmt)
                 
-                text = f"Оператор: {operator}\nОпер. м/с.: {nurse}"
-                first_cursor.insertText(text)
-        finally:
-            self.blockSignals(False)
-            self.paginate()
+                insert_segments(first_cursor, [("Оператор:", None), (f" {operator}", 'operator'),
+                                               ("\nОпер. м/с.:", None), (f" {nurse}", 'nurse')], char_fmt)
 
     def _update_op_recommendations(self, recommendations, show_label):
         """Логика обновления рекомендаций для режима операции"""
@@ -358,9 +339,12 @@ class OperMixin:
                 char_fmt_normal = QTextCharFormat()
                 char_fmt_normal.setFontWeight(QFont.Weight.Normal)
                 first_cursor.setCharFormat(char_fmt_normal)
+                field_pos = first_cursor.position()
                 first_cursor.insertText(" ") # Insert space with normal format
 
-                if recommendations:
+                if isinstance(recommendations, RichText):
+                    self._insert_rich_text(first_cursor, recommendations)
+                elif recommendations:
                     html_rec = recommendations
                     styled_html = html_rec
                     
@@ -379,6 +363,7 @@ class OperMixin:
                              pass 
                          
                          first_cursor.insertHtml(styled_html)
+                mark_field(first_cursor, field_pos, 'recommendations')
 
         except Exception as e:
             print(f"Error updating op recommendations: {e}")
@@ -388,8 +373,8 @@ class OperMixin:
         cell = self.get_cell('op_extra', 0, 0)
         if not cell: return
         
-        self.blockSignals(True)
-        try:
+        # Ячейка общая для повторного приема и больничного — обе секции применяются вместе
+        with self._updating('repeat', 'sick_leave'):
             first_cursor = cell.firstCursorPosition()
             last_cursor = cell.lastCursorPosition()
             first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
@@ -414,11 +399,10 @@ class OperMixin:
                     first_cursor.setCharFormat(char_fmt_bold)
                     first_cursor.insertText("Повторный прием ")
                     
-                    first_cursor.setCharFormat(char_fmt_normal)
                     text = date
                     if time:
                         text += f" {time}"
-                    first_cursor.insertText(text)
+                    insert_field(first_cursor, 'repeat', text, char_fmt_normal, lead="")
                     has_content = True
             
             # 2. Больничный лист
@@ -428,199 +412,82 @@ class OperMixin:
                     if has_content:
                         first_cursor.insertText("\n")
                         
-                    text = ""
-                    if data.get("parent") and data.get("continued"):
-                        text = f"Родителю/опекуну ребенка выдано продолжение листка нетрудоспособности {data.get('prev_number')}: Л/Н № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                        text += f"\n{data.get('parent_fio')}, {data.get('parent_dob')} г.р.; Проживает: {data.get('address')}; Место работы, должность: {data.get('job')}"
-                    elif data.get("parent"):
-                        text = f"Родителю/опекуну ребенка выдан листок нетрудоспособности № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                        text += f"\n{data.get('parent_fio')}, {data.get('parent_dob')} г.р.; Проживает: {data.get('address')}; Место работы, должность: {data.get('job')}"
-                    elif data.get("continued"):
-                        text = f"Пациенту выдано продолжение листка нетрудоспособности {data.get('prev_number')}: Л/Н № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                    else:
-                        text = f"Пациенту выдан листок нетрудоспособности № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                    
-                    first_cursor.setCharFormat(char_fmt_normal)
-                    first_cursor.insertText(text)
-                    
-        finally:
-            self.blockSignals(False)
-            self.paginate()
-
-    def check_op_content(self):
-        """Проверка содержимого для режима операции"""
+                    insert_segments(first_cursor, self._sick_leave_segments(data), char_fmt_normal)
+
+    def _op_content_checks(self):
+        """Обратный парсинг режима операции: (секция, колонка ячейки, метод) в порядке документа."""
+        return [
+            ('operation', 0, self._check_op_data),
+            ('op_description', 0, self._check_op_data),
+            ('diagnosis', 0, self._check_op_diagnosis),
+            ('op_recommendations', 0, self._check_op_recommendations),
+            ('op_staff', 0, self._check_op_staff),
+            ('op_extra', 0, self._check_op_extra),
+        ]
+
+    def check_op_content(self, edited=None):
+        """Проверка содержимого для режима операции (edited — измененные ячейки, None — все)"""
         try:
-            # Инициализируем data один раз
-            data = self._cached_data['operation'][0].copy()
-            data_changed = False
-
-            # 1. Предоперационный осмотр
-            cell_preop = self.get_cell('operation', 0, 0)
-            if cell_preop:
-                cursor = cell_preop.firstCursorPosition()
-                cursor.setPosition(cell_preop.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                text_preop = cursor.selection().toPlainText()
-                
-                # Парсинг жалоб (текст до "Общее состояние:" или "Пациент информирован")
-                # Убираем заголовок "Показания к оперативному вмешательству:"
-                text_preop = text_preop.replace("Показания к оперативному вмешательству:", "").strip()
-                
-                # Ищем начало следующего блока
-                end_complaints = len(text_preop)
-                for marker in ["Общее состояние:", "На основании частей первой", "АД:"]:
-                    idx = text_preop.find(marker)
-                    if idx != -1 and idx < end_complaints:
-                        end_complaints = idx
-                
-                data["complaints_anamnesis"] = text_preop[:end_complaints].strip()
-                
-                # Парсинг показателей
-                match_ad = re.search(r"АД:\s*(.*?)\s*мм\.рт\.ст", text_preop)
-                if match_ad: data["ad"] = match_ad.group(1).strip()
-                
-                match_pulse = re.search(r"Пульс:\s*(.*?)\s*в минуту", text_preop)
-                if match_pulse: data["pulse"] = match_pulse.group(1).strip()
-                
-                match_temp = re.search(r"Т\. тела:\s*(.*?)\s*С°", text_preop)
-                if match_temp: data["temp"] = match_temp.group(1).strip()
-                
-                # Парсинг St. localis
-                if "St. localis:" in text_preop:
-                    start = text_preop.find("St. localis:") + len("St. localis:")
-                    end = len(text_preop)
-                    
-                    # Ищем следующую метку
-                    for marker in ["С лечебно-диагностической", "Суть вмешательства"]:
-                        idx = text_preop.find(marker, start)
-                        if idx != -1 and idx < end:
-                            end = idx
-                    
-                    data["objective_examination"] = text_preop[start:end].strip()
-                
-                # Парсинг вмешательства
-                if "С лечебно-диагностической целью показано:" in text_preop:
-                    start = text_preop.find("С лечебно-диагностической целью показано:") + len("С лечебно-диагностической целью показано:")
-                    end = len(text_preop)
-                    
-                    if "Суть вмешательства" in text_preop:
-                        idx = text_preop.find("Суть вмешательства", start)
-                        if idx != -1: end = idx
-                        
-                    data["intervention"] = text_preop[start:end].strip()
-                
-                data_changed = True
-
-            # 2. Ход операции
-            cell_desc = self.get_cell('op_description', 0, 0)
-            if cell_desc:
-                cursor = cell_desc.firstCursorPosition()
-                cursor.setPosition(cell_desc.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                text_desc = cursor.selection().toPlainText()
-                
-                match_num = re.search(r"Оперативное вмешательство №\s*(.*)", text_desc)
-                if match_num:
-                    data["op_number"] = match_num.group(1).strip()
-                    
-                    # Название операции обычно на следующей строке
-                    lines = text_desc.split('\n')
-                    for i, line in enumerate(lines):
-                        if "Оперативное вмешательство №" in line:
-                            if i + 1 < len(lines):
-                                data["op_name"] = lines[i+1].strip()
-                                # Описание - все остальное
-                                data["op_description"] = "\n".join(lines[i+2:]).strip()
-                            break
-                
-                data_changed = True
-            
-            # Emit ONCE
-            if data_changed:
-                self.operationDataChangedFromEditor.emit(data)
-            
-            # 3. Диагноз
-            cell_diag = self.get_cell('diagnosis', 0, 0)
-            if cell_diag:
-                cursor = cell_diag.firstCursorPosition()
-                cursor.setPosition(cell_diag.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                html_diag = cursor.selection().toHtml()
-                html_diag = re.sub(r'(>)\s*ДИАГНОЗ:\s*', r'\1', html_diag)
-                self.diagnosisChangedFromEditor.emit(html_diag)
-            
-            # 4. Рекомендации
-            cell_rec = self.get_cell('op_recommendations', 0, 0)
-            if cell_rec:
-                cursor = cell_rec.firstCursorPosition()
-                cursor.setPosition(cell_rec.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                html_rec = cursor.selection().toHtml()
-                
-                html_rec = re.sub(r'<p[^>]*>\s*<br\s*/?>\s*</p>\s*(?=<ul|<ol)', '', html_rec, flags=re.IGNORECASE)
-                style = "margin-top: 0px; margin-bottom: 0px; margin-left: 10px; -qt-list-indent: 0;"
-                html_rec = re.sub(r'<ul\b[^>]*>', f'<ul style="{style}">', html_rec)
-                html_rec = re.sub(r'<ol\b[^>]*>', f'<ol style="{style}">', html_rec)
-                html_rec = re.sub(r'(>)\s*РЕКОМЕНДОВАНО:\s*', r'\1', html_rec)
-                
-                self.recommendationsChangedFromEditor.emit(html_rec)
-
-            # 5. Персонал
-            cell_staff = self.get_cell('op_staff', 0, 0)
-            if cell_staff:
-                cursor = cell_staff.firstCursorPosition()
-                cursor.setPosition(cell_staff.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                text_staff = cursor.selection().toPlainText()
-                
-                operator = ""
-                nurse = ""
-                
-                match_op = re.search(r"Оператор:\s*(.*)", text_staff)
-                if match_op: operator = match_op.group(1).strip()
-                
-                match_nurse = re.search(r"Опер\. м/с\.:\s*(.*)", text_staff)
-                if match_nurse: nurse = match_nurse.group(1).strip()
-                
-                self.operationStaffChangedFromEditor.emit(operator, nurse)
-
-            # 6. Дополнительно (больничный, повторный прием)
-            cell_extra = self.get_cell('op_extra', 0, 0)
-            if cell_extra:
-                cursor = cell_extra.firstCursorPosition()
-                cursor.setPosition(cell_extra.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
-                text_extra = cursor.selection().toPlainText()
-                
-                # Повторный прием
-                if "Повторный прием" in text_extra:
-                    lines = text_extra.split('\n')
-                    for line in lines:
-                        if "Повторный прием" in line:
-                            # Remove the label
-                            content = line.replace("Повторный прием", "").strip()
-                            # Remove optional colon
-                            if content.startswith(":"):
-                                content = content[1:].strip()
-                            
-                            parts = content.split()
-                            date = parts[0] if len(parts) > 0 else ""
-                            time = parts[1] if len(parts) > 1 else ""
-                            
-                            self.repeatChangedFromEditor.emit(True, date, time)
-                            break
-                
-                # Больничный
-                data_sl = self._cached_data.get('sick_leave', ({},))[0].copy()
-                
-                match_num = re.search(r"№\s*(\S+)", text_extra)
-                if match_num:
-                    data_sl["number"] = match_num.group(1)
-                
-                match_date_from = re.search(r"с\s+([\d\.]+)", text_extra, re.IGNORECASE)
-                if match_date_from:
-                    data_sl["date_from"] = match_date_from.group(1).rstrip('.')
-                    
-                match_date_to = re.search(r"по\s+([\d\.]+)", text_extra, re.IGNORECASE)
-                if match_date_to:
-                    data_sl["date_to"] = match_date_to.group(1).rstrip('.')
-                
-                if match_num or match_date_from or match_date_to:
-                    self.sickLeaveChangedFromEditor.emit(data_sl)
-
+            self._run_content_checks(self._op_content_checks(), edited)
         except Exception as e:
             print(f"Error checking op content: {e}")
+
+    def _check_op_data(self):
+        """Предоперационный осмотр и ход операции (один сигнал на обе ячейки)"""
+        data = self._cached_data['operation'][0].copy()
+        data_changed = False
+
+        # 1. Предоперационный осмотр
+        cell_preop = self.get_cell('operation', 0, 0)
+        if cell_preop:
+            fields = read_fields(cell_preop)
+            # Жалобы, St. localis и показания есть в документе всегда (возможно, пустыми),
+            # показатели — только заполненные
+            for key in ('complaints_anamnesis', 'objective_examination', 'intervention'):
+                data[key] = fields.get(key, "")
+            for key in ('ad', 'pulse', 'temp'):
+                if key in fields:
+                    data[key] = fields[key]
+            data_changed = True
+
+        # 2. Ход операции
+        cell_desc = self.get_cell('op_description', 0, 0)
+        if cell_desc:
+            fields = read_fields(cell_desc)
+            if 'op_number' in fields:
+                data["op_number"] = fields['op_number']
+                data["op_name"] = fields.get('op_name', "")
+                data["op_description"] = fields.get('op_description', "")
+            data_changed = True
+
+        # Emit ONCE
+        if data_changed:
+            self._emit_from_editor('operation', (data,), self.operationDataChangedFromEditor, data)
+
+    def _check_op_diagnosis(self):
+        """Диагноз"""
+        cell_diag = self.get_cell('diagnosis', 0, 0)
+        if cell_diag:
+            self._emit_diagnosis(self._rich_text_field(cell_diag, 'diagnosis'))
+
+    def _check_op_recommendations(self):
+        """Рекомендации"""
+        cell_rec = self.get_cell('op_recommendations', 0, 0)
+        if cell_rec:
+            self._emit_recommendations(self._rich_text_field(cell_rec, 'recommendations'))
+
+    def _check_op_staff(self):
+        """Персонал"""
+        cell_staff = self.get_cell('op_staff', 0, 0)
+        if cell_staff:
+            fields = read_fields(cell_staff)
+            operator, nurse = fields.get('operator', ""), fields.get('nurse', "")
+            self._emit_from_editor('op_staff', (operator, nurse), self.operationStaffChangedFromEditor, operator, nurse)
+
+    def _check_op_extra(self):
+        """Дополнительно (больничный, повторный прием)"""
+        cell_extra = self.get_cell('op_extra', 0, 0)
+        if cell_extra:
+            fields = read_fields(cell_extra)
+            self._emit_repeat_field(fields)
+            self._emit_sick_leave_fields(fields)
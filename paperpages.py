@@ -0,0 +1,163 @@
+from PyQt6.QtCore import QRectF
+from PyQt6.QtGui import QTextCursor, QTextTable
+from bisect import bisect_right
+import math
+
+
+def pages_for_height(height, page_height, bottom_margin=0):
+    """Число страниц, на которых помещается содержимое высотой height (с нижним полем последней страницы)."""
+    return max(1, math.ceil((height + bottom_margin) / page_height))
+
+
+def place_blocks(block, current_y, page_index, page_height, margin_top, margin_bottom, entries, stop=None):
+    """
+    Разметка страниц начиная с block: блок вне таблицы, не помещающийся на текущей странице,
+    получает верхнее поле до начала следующей (у остальных блоков оно снимается).
+    (current_y, page_index) — положение на входе в block; для каждого размеченного блока оно
+    добавляется в entries. stop(block, положение) — True, если дальше разметка не изменится.
+    Раскладка документа должна быть готова (высоты блоков берутся из нее).
+    """
+    while block.isValid():
+        if stop is not None and stop(block, (current_y, page_index)):
+            break
+
+        entries.append((current_y, page_index))
+
+        frame = QTextCursor(block).currentFrame()
+        is_in_table = isinstance(frame, QTextTable)
+
+        cursor = QTextCursor(block)
+        fmt = block.blockFormat()
+        
+        if fmt.topMargin() > 0:
+            fmt.setTopMargin(0)
+            cursor.setBlockFormat(fmt)
+        
+        txt_layout = block.layout()
+        if txt_layout is None:
+            block_content_height = 0
+        else:
+            block_content_height = txt_layout.boundingRect().height()
+        
+        block_total_height = block_content_height + fmt.bottomMargin()
+        
+        if is_in_table:
+            pass 
+        else:
+            page_content_end = (page_index * page_height) + page_height - margin_bottom
+            
+            new_top_margin = 0.0
+            
+            if current_y + block_total_height > page_content_end + 1:
+                page_index += 1
+                next_page_start_y = (page_index * page_height) + margin_top
+                margin_to_add = next_page_start_y - current_y
+                if margin_to_add < 0: margin_to_add = 0
+                
+                new_top_margin = margin_to_add
+                current_y += margin_to_add + block_total_height
+            else:
+                current_y += block_total_height
+                
+            if abs(fmt.topMargin() - new_top_margin) > 0.1:
+                fmt.setTopMargin(new_top_margin)
+                cursor.setBlockFormat(fmt)
+        
+        block = block.next()
+
+
+class PageIndex:
+    """
+    Индекс разбиения документа на страницы одинаковой высоты.
+    Хранит позиции начала блоков (возрастают) и их Y-координаты; "страница позиции"
+    и "страница курсора" ищутся бинарным поиском. Массивы пересобираются лениво —
+    при первом запросе после изменения документа или прохода пагинации.
+    Число страниц задает пагинация (set_page_count) или, если его нет, считается
+    по высоте раскладки документа той же формулой (pages_for_height).
+    """
+
+    def __init__(self, document, page_height, bottom_margin=0):
+        self.document = document
+        self.page_height = page_height
+        self.bottom_margin = bottom_margin
+
+        self._positions = []   # позиции начала блоков (по номеру блока)
+        self._tops = []        # Y верхней границы блока (по номеру блока)
+        self._blocks_dirty = True
+        self._page_count = None
+
+        # Правка текста сдвигает блоки, но число страниц до следующей пагинации не меняет
+        self.document.contentsChange.connect(self._on_contents_change)
+
+    def _on_contents_change(self, position, removed, added):
+        self._blocks_dirty = True
+
+    def invalidate(self):
+        self._blocks_dirty = True
+        self._page_count = None
+
+    def set_page_height(self, page_height, bottom_margin=None):
+        self.page_height = page_height
+        if bottom_margin is not None:
+            self.bottom_margin = bottom_margin
+        self.invalidate()
+
+    def set_page_count(self, count):
+        """Число страниц, посчитанное проходом пагинации (он же сдвинул блоки при заблокированных сигналах)."""
+        self._page_count = max(1, int(count))
+        self._blocks_dirty = True
+
+    def _rebuild(self):
+        layout = self.document.documentLayout()
+        positions = []
+        tops = []
+        block = self.document.begin()
+        while block.isValid():
+            positions.append(block.position())
+            # blockBoundingRect возвращает координаты документа и для блоков внутри ячеек таблиц
+            tops.append(layout.blockBoundingRect(block).y())
+            block = block.next()
+        self._positions = positions
+        self._tops = tops
+        self._blocks_dirty = False
+
+    # --- Запросы ---
+
+    def page_count(self):
+        if self._page_count is None:
+            doc_height = self.document.documentLayout().documentSize().height()
+            self._page_count = pages_for_height(doc_height, self.page_height, self.bottom_margin)
+        return self._page_count
+
+    def page_of_y(self, y):
+        if y <= 0:
+            return 0
+        return min(int(y // self.page_height), self.page_count() - 1)
+
+    def page_top(self, page):
+        return page * self.page_height
+
+    def page_rect(self, page, width):
+        return QRectF(0, self.page_top(page), width, self.page_height)
+
+    def block_number_at(self, position):
+        if self._blocks_dirty:
+            self._rebuild()
+        return max(0, bisect_right(self._positions, position) - 1)
+
+    def page_of_position(self, position):
+        number = self.block_number_at(position)
+        if not self._positions:
+            return 0
+        y = self._tops[number]
+        block = self.document.findBlockByNumber(number)
+        text_layout = block.layout()
+        if text_layout is not None and text_layout.lineCount() > 0:
+            # Уточняем по строке внутри блока: длинный абзац может пересекать границу страницы
+            line = text_layout.lineForTextPosition(position - block.position())
+            if line.isValid():
+                y += line.y()
+        return self.page_of_y(y)
+
+    def page_of_cursor(self, cursor):
+        return self.page_of_position(cursor.position())
@@ -5,20 +5,26 @@ from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout,
                              QGraphicsView, QGraphicsScene, QApplication,
                              QStylePainter, QStyleOptionComboBox, QStyle, QDoubleSpinBox, QSpinBox,
                              QFileDialog, QDialog, QGroupBox, QMessageBox, QScrollArea, QSlider, QGraphicsDropShadowEffect)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QEvent, QSizeF, QPoint, QSize, QRectF, QPointF
-from PyQt6.QtGui import (QPainter, QPen, QColor, QTextListFormat, QFont, 
+from PyQt6.QtCore import Qt, QTimer, QThreadPool, pyqtSignal, QEvent, QSizeF, QPoint, QSize, QRectF, QPointF
+from PyQt6.QtGui import (QPainter, QPen, QColor, QPixmap, QTextListFormat, QFont, 
                          QTextCursor, QTextCharFormat, QIcon, QTextFormat,
                          QTextTableFormat, QTextLength, QTextFrameFormat, QTextTable, QTextBlockFormat, QKeySequence,
-                         QTextDocumentWriter, QPageSize, QPageLayout, QTextDocument, QAction, QAbstractTextDocumentLayout, QDesktopServices)
+                         QTextDocumentWriter, QPageSize, QPageLayout, QAction, QAbstractTextDocumentLayout, QDesktopServices)
 from PyQt6.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewWidget, QPrinterInfo
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import QUrl, QMimeData
 import os
-import re
 import configparser
+import time
 
 # Импортируем миксины
 from paperexam import ExamMixin
 from paperoper import OperMixin
+from paperpages import PageIndex, pages_for_height, place_blocks
+from paperbuilder import DocumentMixin
+from paperfields import read_fields
+from papersync import REVERSE
+from paperexport import (DocumentSnapshot, ExportCache, SaveTask, bundle_base_name, bundle_file_names,
+                         file_format)
 
 class PrintPreviewDialog(QDialog):
     def __init__(self, printer, editor, parent=None):
@@ -119,6 +125,11 @@ class PrintPreviewDialog(QDialog):
         self.chk_split_line.setStyleSheet("QCheckBox { color: #e0e0e0; }")
         self.chk_split_line.stateChanged.connect(self.update_preview)
         options_layout.addWidget(self.chk_split_line)
+
+        # Число страниц берется из индекса страниц при отрисовке превью
+        self.lbl_pages = QLabel("Страниц: -")
+        self.lbl_pages.setStyleSheet("border: none;")
+        options_layout.addWidget(self.lbl_pages)
         
         settings_layout.addWidget(group_options)
         
@@ -248,14 +259,18 @@ class PrintPreviewDialog(QDialog):
 
     def open_system_print_dialog(self):
         dialog = QPrintDialog(self.printer, self)
+        # Диапазоны "текущая страница" и "выделение" печатает print_to_printer (по индексу страниц)
+        dialog.setOption(QPrintDialog.PrintDialogOption.PrintCurrentPage, True)
+        dialog.setOption(QPrintDialog.PrintDialogOption.PrintSelection, self.editor.textCursor().hasSelection())
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.preview_widget.updatePreview()
 
     def handle_paint_request(self, printer):
-        self.editor.print_to_printer(printer, self.chk_split_line.isChecked())
+        page_count = self.editor.print_to_printer(printer, self.chk_split_line.isChecked())
+        self.lbl_pages.setText(f"Страниц: {page_count}")
 
 
-class A4Editor(QTextEdit, ExamMixin, OperMixin):
+class A4Editor(QTextEdit, DocumentMixin, ExamMixin, OperMixin):
     heightChanged = pyqtSignal()
     dateChangedFromEditor = pyqtSignal(str) 
     indicatorsChangedFromEditor = pyqtSignal(str, str, str) # ad, temp, weight
@@ -263,8 +278,8 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
     
     objectiveChangedFromEditor = pyqtSignal(dict)
     
-    diagnosisChangedFromEditor = pyqtSignal(str)
-    recommendationsChangedFromEditor = pyqtSignal(str)
+    diagnosisChangedFromEditor = pyqtSignal(object) # RichText
+    recommendationsChangedFromEditor = pyqtSignal(object) # RichText
     repeatChangedFromEditor = pyqtSignal(bool, str, str) # enabled, date, time
     
     sickLeaveChangedFromEditor = pyqtSignal(dict)
@@ -274,6 +289,8 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
     operationDataChangedFromEditor = pyqtSignal(dict)
     operationStaffChangedFromEditor = pyqtSignal(str, str) # operator, nurse
 
+    saveStarted = pyqtSignal(object) # SaveTask
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFrameShape(QFrame.Shape.NoFrame)
@@ -282,101 +299,67 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setUndoRedoEnabled(True)
         
-        # Устанавливаем шрифт по умолчанию
-        default_font = QFont("Times New Roman", 10)
-        self.setFont(default_font)
-        self.document().setDefaultFont(default_font)
-        
-        self.base_width = 794 # ~210mm at 96 DPI
-        self.page_ratio = 1.414
-        self.mm_to_px = 3.7795
-        
-        self.page_height_px = int(self.base_width * self.page_ratio)
-        
-        self.margin_left = int(25 * self.mm_to_px)
-        self.margin_top = int(12.7 * self.mm_to_px)
-        self.margin_right = int(12.7 * self.mm_to_px)
-        self.margin_bottom = int(12.7 * self.mm_to_px)
-        
-        self.content_height = self.page_height_px - self.margin_top - self.margin_bottom
-        
+        # Шрифт, геометрия страницы, флаги режимов и данные секций (см. DocumentMixin)
+        self._init_document()
+        self.setFont(self.document().defaultFont())
         self.setFixedWidth(self.base_width)
-        self.document().setPageSize(QSizeF(self.base_width, self.page_height_px))
+
+        # Кэш фона страниц и перья для него (создаются один раз)
+        self._render_scale = 1.0
+        self._page_chrome = None
+        self._page_chrome_key = None
+        self._page_gap_color = QColor("#505050")
+        self._pen_page_dash = QPen(QColor(0, 0, 0, 50))
+        self._pen_page_dash.setStyle(Qt.PenStyle.DashLine)
+        self._pen_page_dash.setWidth(1)
+        self._pen_page_margin = QPen(QColor("#f0f0f0"))
+        self._pen_page_border = QPen(QColor("#d0d0d0"))
+
+        # Индекс страниц: позиции/высоты блоков для быстрых запросов "какая страница"
+        self.pages = PageIndex(self.document(), self.page_height_px, self.margin_bottom)
         self.set_document_margins()
         
-        self.document().setDefaultStyleSheet("ul { margin-top: 0px; margin-bottom: 0px; margin-left: 10px; -qt-list-indent: 0; } ol { margin-top: 0px; margin-bottom: 0px; margin-left: 10px; -qt-list-indent: 0; }")
-        
+        # Планировщик пагинации: программные правки — на ближайшей итерации цикла событий,
+        # набор текста — после паузы, зависящей от измеренной стоимости прохода
         self._pagination_timer = QTimer()
         self._pagination_timer.setSingleShot(True)
-        self._pagination_timer.setInterval(20)
         self._pagination_timer.timeout.connect(self.paginate)
+        self._pagination_cost_ms = 0.0      # скользящее среднее длительности прохода
+        self._pagination_requested_at = None
+        self.typing_delay_min_ms = 20
+        self.typing_delay_max_ms = 300
+        self.pagination_max_latency_ms = 600
+
+        # heightChanged (и пересчет сцены в EditorPanel) — не чаще одного раза за кадр
+        self._height_timer = QTimer()
+        self._height_timer.setSingleShot(True)
+        self._height_timer.setInterval(16)
+        self._height_timer.timeout.connect(self.heightChanged.emit)
+
+        # Фоновые сохранения: ссылки на задачи держим до их завершения
+        self._save_tasks = set()
+        # HTML, текст, документ для печати и содержимое файлов текущей ревизии — для копирования, печати и сохранения
+        self.export_cache = ExportCache(self.document())
         
         self.textChanged.connect(self.on_text_changed)
         self._is_paginating = False
-        self._rebuilding = False
-        
-        # Флаг программного обновления для предотвращения рекурсии и вылетов
-        self._programmatic_update = False
-
-        # Флаги блокировки обновлений (для специфических полей)
-        self._updating_date = False
-        self._updating_specialty = False
-        self._updating_indicators = False
-        self._updating_complaints = False
-        self._updating_consent = False
-        self._updating_objective = False
-        self._updating_surdology = False
-        self._updating_diagnosis = False
-        self._updating_recommendations = False
-        self._updating_repeat = False
-        self._updating_sick_leave = False
-        self._updating_signature = False
-        self._updating_operation = False
-        self._checking_content = False
-
-        # Visibility flags
-        self._surdology_visible = False
-        self._repeat_visible = False
-        self._sick_leave_visible = False
-        self._signature_visible = True
-        
-        # Настройки отображения
-        self._split_mode = False
-        self._borders_visible = True
-        self._operation_mode = False
-
-        # Cache for data to restore after rebuild
-        self._cached_data = {
-            'date': ("", "", False),
-            'specialty': ("Врач-оториноларинголог", False),
-            'indicators': ("", "", "", False),
-            'complaints': ("", "", False, True, False),
-            'consent': (True,),
-            'objective': ({},),
-            'surdology': ({'enabled': False},),
-            'diagnosis': ("",),
-            'recommendations': ("", True),
-            'repeat': (False, "", ""),
-            'sick_leave': ({'issued': False},),
-            'signature': ("Врач-оториноларинголог", ""),
-            'operation': ({
-                "complaints_anamnesis": "",
-                "informed_consent": True,
-                "general_condition": "Удовлетворительное",
-                "ad": "", "pulse": "", "temp": "",
-                "objective_examination": "",
-                "intervention": "",
-                "intervention_consent": True,
-                "op_number": "",
-                "op_name": "",
-                "op_description": ""
-            },),
-            'op_staff': ("", "")
-        }
-
-        self.tables = {}
-        self.main_table = None
-        self.row_map = {}
+        # Ячейки (секция, колонка), измененные пользователем с последнего textChanged
+        self._edited_cells = set()
+
+        # Обратная синхронизация документа с формой: после паузы в наборе,
+        # но не позже reverse_sync_max_latency_ms от первой несинхронизированной правки
+        self._reverse_sync_timer = QTimer()
+        self._reverse_sync_timer.setSingleShot(True)
+        self._reverse_sync_timer.timeout.connect(self.flush_reverse_sync)
+        self._reverse_sync_cells = set()
+        self._reverse_sync_requested_at = None
+        self.reverse_sync_delay_ms = 250
+        self.reverse_sync_max_latency_ms = 1000
+
+        # Кэш пагинации: для каждого блока храним состояние на входе (current_y, page_index),
+        # чтобы при правке продолжать расчет с первого измененного блока
+        self.invalidate_pagination()
+        self.document().contentsChange.connect(self.on_contents_change)
         
         self.rebuild_document()
 
@@ -394,775 +377,413 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
         cursor = self.textCursor()
         cursor.createList(style)
 
-    def set_split_mode(self, enabled):
-        if self._split_mode != enabled:
-            self._split_mode = enabled
-            self.rebuild_document()
-
-    def set_borders_visible(self, visible):
-        # Если состояние не меняется, ничего не делаем, чтобы не вызывать лишних перестроений
-        if self._borders_visible == visible:
-            return
-            
-        self._borders_visible = visible
-        self.rebuild_document()
-            
-    def set_operation_mode(self, enabled):
-        if self._operation_mode != enabled:
-            self._operation_mode = enabled
-            if not enabled:
-                self._signature_visible = True
-            self.rebuild_document()
+    def check_header_content(self, edited=None):
+        """
+        Обратный парсинг документа в данные формы.
+        edited — множество измененных ячеек (секция, колонка): разбираются и сигналятся только они;
+        None — разобрать весь документ.
+        """
+        # Идет программная правка документа или уже идет разбор — эхо не разбираем
+        if self.sync.is_applying(): return
 
-    def set_signature_visible(self, visible):
-        if self._signature_visible != visible:
-            self._signature_visible = visible
-            self.rebuild_document()
-
-    def rebuild_document(self):
-        if self._rebuilding: return
-        self._rebuilding = True
-        self._programmatic_update = True # Блокируем сигналы изменения текста
-        self.blockSignals(True)
-        try:
-            self.clear()
-            self.set_document_margins()
-            
-            self.tables = {}
-            self.main_table = None
-            self.row_map = {}
-            
-            if self._operation_mode:
-                self._build_operation_structure()
-            elif self._split_mode:
-                self._build_split_structure()
-            else:
-                self._build_single_structure()
+        with self.sync.applying(REVERSE):
+            # 1. Дата
+            self._run_content_checks([('header', 0, self._check_date)], edited)
 
-            # Restore data
-            self.update_date_from_ui(*self._cached_data['date'])
-            self.update_specialty_from_ui(*self._cached_data['specialty'])
-            
             if self._operation_mode:
-                self.update_operation_from_ui(*self._cached_data['operation'])
-                self.update_diagnosis_from_ui(*self._cached_data['diagnosis'])
-                self.update_operation_staff_from_ui(*self._cached_data['op_staff'])
-                self.update_recommendations_from_ui(*self._cached_data['recommendations'])
-                self._update_op_extra_content()
+                self.check_op_content(edited)
             else:
-                self.update_indicators_from_ui(*self._cached_data['indicators'])
-                self.update_complaints_anamnesis_from_ui(*self._cached_data['complaints'])
-                self.update_consent_from_ui(*self._cached_data['consent'])
-                self.update_objective_from_ui(*self._cached_data['objective'])
-                self.update_surdology_from_ui(*self._cached_data['surdology'])
-                self.update_diagnosis_from_ui(*self._cached_data['diagnosis'])
-                self.update_recommendations_from_ui(*self._cached_data['recommendations'])
-                self.update_repeat_from_ui(*self._cached_data['repeat'])
-                self.update_sick_leave_from_ui(*self._cached_data['sick_leave'])
-                
-            self.update_signature_from_ui(*self._cached_data['signature'])
-
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._rebuilding = False
-            self.paginate()
-
-    def _get_table_constraints(self):
-        # Используем процентное соотношение для ширины колонок, чтобы при печати
-        # на высоком разрешении таблица не сжималась
-        # col1_width = 150, available_width ~ 700 -> ~21%
-        
-        constraints = [
-            QTextLength(QTextLength.Type.PercentageLength, 21),
-            QTextLength(QTextLength.Type.PercentageLength, 79)
-        ]
-        return self.base_width, constraints
-
-    def _get_table_format(self, width, constraints):
-        fmt = QTextTableFormat()
-        # Используем 100% ширины, чтобы таблица растягивалась
-        fmt.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
-        
-        if self._borders_visible:
-            fmt.setBorder(1)
-            fmt.setBorderStyle(QTextFrameFormat.BorderStyle.BorderStyle_Dashed)
-            fmt.setBorderBrush(QColor(0, 0, 0, 50))
-        else:
-            fmt.setBorder(0)
-            
-        fmt.setColumnWidthConstraints(constraints)
-        fmt.setMargin(0)
-        return fmt
-
-    def get_cell(self, section, row, col):
-        if self._operation_mode:
-            start_row = self.row_map.get(section, -1)
-            if start_row == -1: return None
-            return self.main_table.cellAt(start_row + row, col)
-            
-        if self._split_mode:
-            table_name = section
-            if section in ['recommendations', 'repeat']:
-                table_name = 'recs_repeat'
+                self.check_exam_content(edited)
             
-            table = self.tables.get(table_name)
-            if not table: return None
-            
-            if section == 'repeat':
-                row += 1
-                
-            return table.cellAt(row, col)
-        else:
-            start_row = self.row_map.get(section, -1)
-            if section == 'recommendations': start_row = self.row_map.get('recommendations', -1)
-            if section == 'repeat': start_row = self.row_map.get('repeat', -1)
-            
-            if start_row == -1: return None
-            
-            return self.main_table.cellAt(start_row + row, col)
-
-    # --- Update Methods ---
-    # Все методы обновления теперь устанавливают _programmatic_update = True
-
-    def update_date_from_ui(self, date_str, time_str, time_enabled):
-        self._cached_data['date'] = (date_str, time_str, time_enabled)
-        if self._updating_date or self._checking_content: return
-        self._updating_date = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            cell = self.get_cell('header', 0, 0)
-            if cell:
-                first_cursor = cell.firstCursorPosition()
-                last_cursor = cell.lastCursorPosition()
-                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
-                first_cursor.removeSelectedText()
-                
-                full_text = date_str
-                if time_enabled:
-                    full_text += f"    {time_str}"
-                first_cursor.insertText(full_text)
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_date = False
-            self.paginate()
-
-    def update_specialty_from_ui(self, text, cito):
-        self._cached_data['specialty'] = (text, cito)
-        if self._updating_specialty or self._checking_content: return
-        self._updating_specialty = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            cell = self.get_cell('header', 0, 1)
-            if cell:
-                first_cursor = cell.firstCursorPosition()
-                last_cursor = cell.lastCursorPosition()
-                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
-                first_cursor.removeSelectedText()
-                
-                char_fmt = QTextCharFormat()
-                char_fmt.setFontWeight(QFont.Weight.Bold)
-                block_fmt = QTextBlockFormat()
-                block_fmt.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                first_cursor.setBlockFormat(block_fmt)
-                first_cursor.setCharFormat(char_fmt)
-                
-                if text == "Врач-оториноларинголог":
-                    full_text = "Осмотр ОТОРИНОЛАРИНГОЛОГА"
-                else:
-                    full_text = text.upper()
-                
-                if self._operation_mode:
-                    full_text += " / Предоперационный осмотр"
-                
-                if cito:
-                    full_text += " (Осмотр по Cito!)"
-                
-                first_cursor.insertText(full_text)
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_specialty = False
-            self.paginate()
-
-    def update_diagnosis_from_ui(self, diagnosis):
-        self._cached_data['diagnosis'] = (diagnosis,)
-        if self._updating_diagnosis or self._checking_content: return
-        self._updating_diagnosis = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            if self._operation_mode:
-                self._update_op_diagnosis(diagnosis)
-            else:
-                self._update_exam_diagnosis(diagnosis)
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_diagnosis = False
-            self.paginate()
-
-    def update_recommendations_from_ui(self, recommendations, show_label):
-        self._cached_data['recommendations'] = (recommendations, show_label)
-        if self._updating_recommendations or self._checking_content: return
-        self._updating_recommendations = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            if self._operation_mode:
-                self._update_op_recommendations(recommendations, show_label)
-            else:
-                self._update_exam_recommendations(recommendations, show_label)
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_recommendations = False
-            self.paginate()
-
-    def update_repeat_from_ui(self, enabled, date, time):
-        self._cached_data['repeat'] = (enabled, date, time)
+            # 9. Подпись
+            self._run_content_checks([('signature', 0, self._check_signature)], edited)
+
+    def _run_content_checks(self, checks, edited):
+        """Запускает проверки (секция, колонка, метод) для измененных ячеек; каждый метод — один раз."""
+        done = []
+        for section, col, check in checks:
+            if check in done:
+                continue
+            if edited is None or (section, col) in edited:
+                check()
+                done.append(check)
+
+    def _check_date(self):
+        cell_date = self.get_cell('header', 0, 0)
+        if cell_date:
+            date = read_fields(cell_date).get('date', "")
+            self._emit_from_editor('date', (date,) + self._cached_data['date'][1:], self.dateChangedFromEditor, date)
+
+    def _check_signature(self):
+        cell_sig = self.get_cell('signature', 0, 0)
+        if cell_sig:
+            fields = read_fields(cell_sig)
+            if 'doctor_name' in fields:
+                name = fields['doctor_name']
+                value = (self._cached_data['signature'][0], name)
+                self._emit_from_editor('signature', value, self.signatureChangedFromEditor, name)
 
-        if enabled != self._repeat_visible:
-            self._repeat_visible = enabled
-            self.rebuild_document()
+    def set_document_margins(self):
+        super().set_document_margins()
+        self.invalidate_pagination()
+        self.invalidate_page_chrome()
+
+    def invalidate_pagination(self):
+        """Сбрасывает кэш пагинации: следующий проход пересчитает весь документ."""
+        self._page_entries = []
+        self.pages.invalidate()
+        self._pagination_dirty_from = 0
+        self._pagination_dirty_to = self.document().characterCount()
+
+    def on_contents_change(self, position, removed, added):
+        # Ячейки, которые правит пользователь: обратный парсинг затронет только их
+        if not self.signalsBlocked() and not self.sync.is_applying():
+            self._mark_edited_cells(position, position + added)
+
+        # Запоминаем диапазон измененного текста (в координатах текущего документа)
+        delta = added - removed
+        if self._pagination_dirty_from is None:
+            self._pagination_dirty_from = position
+            self._pagination_dirty_to = position + added
             return
 
-        if self._updating_repeat or self._checking_content: return
-        self._updating_repeat = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            if self._operation_mode:
-                self._update_op_extra_content()
-            else:
-                cell = self.get_cell('repeat', 0, 0)
-                if cell and enabled:
-                    first_cursor = cell.firstCursorPosition()
-                    last_cursor = cell.lastCursorPosition()
-                    first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
-                    first_cursor.removeSelectedText()
-                    
-                    char_fmt_bold = QTextCharFormat()
-                    char_fmt_bold.setFontWeight(QFont.Weight.Bold)
-                    
-                    char_fmt_normal = QTextCharFormat()
-                    char_fmt_normal.setFontWeight(QFont.Weight.Normal)
-                    
-                    first_cursor.setCharFormat(char_fmt_bold)
-                    first_cursor.insertText("Повторный прием\n")
-                    
-                    first_cursor.setCharFormat(char_fmt_normal)
-                    text = date
-                    if time:
-                        text += f" {time}"
-                    first_cursor.insertText(text)
-                    
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_repeat = False
-            self.paginate()
-
-    def update_sick_leave_from_ui(self, data):
-        self._cached_data['sick_leave'] = (data,)
-
-        enabled = data.get("issued", False)
-        if enabled != self._sick_leave_visible:
-            self._sick_leave_visible = enabled
-            self.rebuild_document()
+        if position <= self._pagination_dirty_to:
+            self._pagination_dirty_to = max(position, self._pagination_dirty_to + delta)
+        self._pagination_dirty_from = min(self._pagination_dirty_from, position)
+        self._pagination_dirty_to = max(self._pagination_dirty_to, position + added)
+
+    def _mark_edited_cells(self, start, end):
+        block = self.document().findBlock(start)
+        while block.isValid() and block.position() <= end:
+            cell = self.section_at(max(start, block.position()))
+            if cell is not None:
+                self._edited_cells.add(cell)
+            block = block.next()
+
+    def request_pagination(self, typing=False):
+        """Планирует проход пагинации вместо немедленного выполнения."""
+        if self._is_paginating:
             return
-
-        if self._updating_sick_leave or self._checking_content: return
-        self._updating_sick_leave = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            if self._operation_mode:
-                self._update_op_extra_content()
-            else:
-                cell = self.get_cell('sick_leave', 0, 0)
-                if cell:
-                    first_cursor = cell.firstCursorPosition()
-                    last_cursor = cell.lastCursorPosition()
-                    first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
-                    first_cursor.removeSelectedText()
-                    
-                    if data.get("issued"):
-                        text = ""
-                        if data.get("parent") and data.get("continued"):
-                            text = f"Родителю/опекуну ребенка выдано продолжение листка нетрудоспособности {data.get('prev_number')}: Л/Н № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                            text += f"\n{data.get('parent_fio')}, {data.get('parent_dob')} г.р.; Проживает: {data.get('address')}; Место работы, должность: {data.get('job')}"
-                        elif data.get("parent"):
-                            text = f"Родителю/опекуну ребенка выдан листок нетрудоспособности № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                            text += f"\n{data.get('parent_fio')}, {data.get('parent_dob')} г.р.; Проживает: {data.get('address')}; Место работы, должность: {data.get('job')}"
-                        elif data.get("continued"):
-                            text = f"Пациенту выдано продолжение листка нетрудоспособности {data.get('prev_number')}: Л/Н № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                        else:
-                            text = f"Пациенту выдан листок нетрудоспособности № {data.get('number')} с {data.get('date_from')} по {data.get('date_to')}."
-                        
-                        char_fmt = QTextCharFormat()
-                        char_fmt.setFontWeight(QFont.Weight.Normal)
-                        first_cursor.setCharFormat(char_fmt)
-                        first_cursor.insertText(text)
-                    
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_sick_leave = False
-            self.paginate()
-
-    def update_signature_from_ui(self, specialty, doctor_name):
-        self._cached_data['signature'] = (specialty, doctor_name)
-        if self._updating_signature or self._checking_content: return
-        self._updating_signature = True
-        self._programmatic_update = True
-        self.blockSignals(True)
-        try:
-            cell = self.get_cell('signature', 0, 0)
-            if cell:
-                first_cursor = cell.firstCursorPosition()
-                last_cursor = cell.lastCursorPosition()
-                first_cursor.setPosition(last_cursor.position(), QTextCursor.MoveMode.KeepAnchor)
-                first_cursor.removeSelectedText()
-                
-                block_fmt = QTextBlockFormat()
-                block_fmt.setAlignment(Qt.AlignmentFlag.AlignRight)
-                first_cursor.setBlockFormat(block_fmt)
-                
-                char_fmt = QTextCharFormat()
-                char_fmt.setFontWeight(QFont.Weight.Normal)
-                first_cursor.setCharFormat(char_fmt)
-                
-                text = f"{specialty} _________________ {doctor_name}"
-                first_cursor.insertText(text)
-        finally:
-            self.blockSignals(False)
-            self._programmatic_update = False
-            self._updating_signature = False
-            self.paginate()
-
-    def check_header_content(self):
-        if self._checking_content or self._rebuilding or self._programmatic_update: return
-        
-        if (self._updating_date or self._updating_indicators or self._updating_complaints or 
-            self._updating_consent or self._updating_objective or self._updating_surdology or
-            self._updating_diagnosis or self._updating_recommendations or self._updating_repeat or 
-            self._updating_sick_leave or self._updating_signature or self._updating_operation):
+        now = time.monotonic()
+        if self._pagination_requested_at is None:
+            self._pagination_requested_at = now
+
+        if not typing:
+            # Серия программных обновлений — один проход на ближайшей итерации цикла
+            if not self._pagination_timer.isActive() or self._pagination_timer.interval() > 0:
+                self._pagination_timer.start(0)
             return
 
-        self._checking_content = True
-        try:
-            # 1. Дата
-            cell_date = self.get_cell('header', 0, 0)
-            if cell_date:
-                text_date = cell_date.firstCursorPosition().block().text()
-                parts = text_date.split("    ")
-                date_part = parts[0]
-                self.dateChangedFromEditor.emit(date_part)
-
-            if self._operation_mode:
-                self.check_op_content()
-            else:
-                self.check_exam_content()
-            
-            # 9. Подпись
-            cell_sig = self.get_cell('signature', 0, 0)
-            if cell_sig:
-                text_sig = cell_sig.firstCursorPosition().block().text()
-
-                match_sig = re.search(r"_________________ (.*)$", text_sig)
-                if match_sig:
-                    doctor_name = match_sig.group(1).strip()
-                    self.signatureChangedFromEditor.emit(doctor_name)
-
-        finally:
-            self._checking_content = False
+        # Во время набора ждем паузы: чем дороже проход, тем дольше пауза
+        delay = int(min(self.typing_delay_max_ms, max(self.typing_delay_min_ms, self._pagination_cost_ms * 4)))
+        waited_ms = (now - self._pagination_requested_at) * 1000
+        if self._pagination_timer.isActive() and waited_ms + delay > self.pagination_max_latency_ms:
+            # Длинная серия нажатий: больше не откладываем, уже запланированный проход выполнится
+            return
+        self._pagination_timer.start(delay)
 
-    def set_document_margins(self):
-        document = self.document()
-        frame = document.rootFrame()
-        fmt = frame.frameFormat()
-        fmt.setLeftMargin(self.margin_left)
-        fmt.setRightMargin(self.margin_right)
-        fmt.setTopMargin(self.margin_top) 
-        fmt.setBottomMargin(0)
-        frame.setFrameFormat(fmt)
+    def flush_pagination(self):
+        """Синхронно выполняет отложенную пагинацию и сообщает о новой высоте (печать, сохранение)."""
+        self._pagination_timer.stop()
+        self.paginate()
+        if self._height_timer.isActive():
+            self._height_timer.stop()
+            self.heightChanged.emit()
 
     def on_text_changed(self):
+        edited, self._edited_cells = self._edited_cells, set()
+
         # Если изменение вызвано программно, не запускаем проверку контента
-        if self._programmatic_update:
-            if not self._is_paginating:
-                self._pagination_timer.start()
+        if self.sync.is_applying():
+            self.request_pagination()
             return
 
-        if not self._is_paginating:
-            self._pagination_timer.start()
+        self.request_pagination(typing=True)
+        self._edited_directly = True
+
+        # Пользователь правил текст напрямую — содержимое ячеек больше не совпадает с отрисованным
+        self.invalidate_render()
             
-        # Включаем обратный парсинг
-        self.check_header_content()
+        # Обратный парсинг измененных ячеек — отложенно, чтобы набор не ждал обновления формы
+        self.request_reverse_sync(edited)
+
+    def request_reverse_sync(self, cells):
+        """Планирует обратный парсинг ячеек: перезапускается с каждой правкой, но не дольше max_latency."""
+        if not cells:
+            return
+        self._reverse_sync_cells |= cells
+        now = time.perf_counter()
+        if self._reverse_sync_requested_at is None:
+            self._reverse_sync_requested_at = now
+        waited_ms = (now - self._reverse_sync_requested_at) * 1000
+        delay = min(self.reverse_sync_delay_ms, max(0, self.reverse_sync_max_latency_ms - waited_ms))
+        self._reverse_sync_timer.start(int(delay))
+
+    def flush_reverse_sync(self):
+        """Синхронно передает в форму отложенные правки документа (перед сохранением, печатью и т.п.)."""
+        self._reverse_sync_timer.stop()
+        self._reverse_sync_requested_at = None
+        if not self._reverse_sync_cells:
+            return
+        cells, self._reverse_sync_cells = self._reverse_sync_cells, set()
+        self.check_header_content(cells)
 
     def paginate(self):
         if self._is_paginating:
             return
-            
+        self._pagination_requested_at = None
+        # Документ не менялся с прошлого прохода — разметка страниц актуальна
+        if self._pagination_dirty_from is None:
+            return
+
+        started = time.perf_counter()
         self._is_paginating = True
         doc = self.document()
         doc.blockSignals(True)
-        
-        cursor = QTextCursor(doc)
-        cursor.beginEditBlock()
-        
+
+        edit_cursor = QTextCursor(doc)
+        edit_cursor.beginEditBlock()
+
         try:
-            block = doc.begin()
-            current_y = self.margin_top
-            page_index = 0
-            
-            while block.isValid():
-                frame = QTextCursor(block).currentFrame()
-                is_in_table = isinstance(frame, QTextTable)
+            old_entries = self._page_entries
+            # Сдвиг нумерации блоков после вставки/удаления абзацев
+            block_shift = doc.blockCount() - len(old_entries)
+            dirty_to = self._pagination_dirty_to
+
+            # Продолжаем с первого измененного блока, используя сохраненные Y и номер страницы
+            block = doc.findBlock(self._pagination_dirty_from)
+            if not block.isValid():
+                block = doc.begin()
+            start_number = block.blockNumber()
+            if start_number < len(old_entries) and old_entries:
+                current_y, page_index = old_entries[start_number]
+                entries = old_entries[:start_number]
+            else:
+                block = doc.begin()
+                current_y = self.margin_top
+                page_index = 0
+                entries = []
+
+            def unchanged(block, position):
+                # Ниже измененного диапазона: если состояние на входе в блок совпало с прошлым
+                # проходом, то и вся последующая разметка совпадает — дальше не идем
+                if block.position() <= dirty_to:
+                    return False
+                old_number = block.blockNumber() - block_shift
+                if 0 <= old_number < len(old_entries) and old_entries[old_number] == position:
+                    entries.extend(old_entries[old_number:])
+                    return True
+                return False
+
+            place_blocks(block, current_y, page_index, self.page_height_px, self.margin_top,
+                         self.margin_bottom, entries, unchanged)
+
+            self._page_entries = entries
+            self._pagination_dirty_from = None
+            self._pagination_dirty_to = None
 
-                cursor = QTextCursor(block)
-                fmt = block.blockFormat()
-                
-                if fmt.topMargin() > 0:
-                    fmt.setTopMargin(0)
-                    cursor.setBlockFormat(fmt)
-                
-                txt_layout = block.layout()
-                if txt_layout is None:
-                    block_content_height = 0
-                else:
-                    block_content_height = txt_layout.boundingRect().height()
-                
-                block_total_height = block_content_height + fmt.bottomMargin()
-                
-                if is_in_table:
-                    pass 
-                else:
-                    page_content_end = (page_index * self.page_height_px) + self.page_height_px - self.margin_bottom
-                    
-                    new_top_margin = 0.0
-                    
-                    if current_y + block_total_height > page_content_end + 1:
-                        page_index += 1
-                        next_page_start_y = (page_index * self.page_height_px) + self.margin_top
-                        margin_to_add = next_page_start_y - current_y
-                        if margin_to_add < 0: margin_to_add = 0
-                        
-                        new_top_margin = margin_to_add
-                        current_y += margin_to_add + block_total_height
-                    else:
-                        current_y += block_total_height
-                        
-                    if abs(fmt.topMargin() - new_top_margin) > 0.1:
-                        fmt.setTopMargin(new_top_margin)
-                        cursor.setBlockFormat(fmt)
-                
-                block = block.next()
-            
             root_frame_height = doc.documentLayout().documentSize().height()
-            needed_height = root_frame_height + self.margin_bottom
-            num_pages = int(needed_height / self.page_height_px) + 1
+            num_pages = pages_for_height(root_frame_height, self.page_height_px, self.margin_bottom)
             total_height = num_pages * self.page_height_px
+
+            self.pages.set_page_count(num_pages)
             
             if self.height() != total_height:
                 self.setFixedHeight(int(total_height))
-                self.heightChanged.emit()
+                if not self._height_timer.isActive():
+                    self._height_timer.start()
                 
         finally:
-            cursor.endEditBlock()
+            edit_cursor.endEditBlock()
             doc.blockSignals(False)
             self._is_paginating = False
             self.viewport().update()
+            cost_ms = (time.perf_counter() - started) * 1000
+            self._pagination_cost_ms = cost_ms if not self._pagination_cost_ms else self._pagination_cost_ms * 0.7 + cost_ms * 0.3
+
+    def set_render_scale(self, scale):
+        """Масштаб, с которым виджет выводится в сцене (зум). Нужен для четкого кэша фона страниц."""
+        if abs(self._render_scale - scale) > 1e-6:
+            self._render_scale = scale
+            self.invalidate_page_chrome()
+
+    def invalidate_page_chrome(self):
+        self._page_chrome = None
+        self._page_chrome_key = None
+        self.viewport().update()
+
+    def _page_chrome_pixmap(self):
+        # Фон одной страницы (лист, пунктир середины, поля, рамка) рисуется один раз
+        # и переиспользуется для всех страниц, пока не изменятся размер, поля или зум
+        page_width = self.width()
+        page_height = self.page_height_px
+        ratio = self._render_scale * self.devicePixelRatioF()
+        key = (page_width, page_height, self.margin_left, self.margin_top,
+               self.margin_right, self.margin_bottom, round(ratio, 4))
+        if self._page_chrome is not None and self._page_chrome_key == key:
+            return self._page_chrome
+
+        pixmap = QPixmap(max(1, int(page_width * ratio)), max(1, int(page_height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(QColor("white"))
+
+        painter = QPainter(pixmap)
+        painter.setPen(self._pen_page_dash)
+        mid_y = page_height / 2
+        painter.drawLine(0, int(mid_y), page_width, int(mid_y))
+
+        painter.setPen(self._pen_page_margin)
+        painter.drawLine(0, self.margin_top, page_width, self.margin_top)
+        painter.drawLine(0, page_height - self.margin_bottom, page_width, page_height - self.margin_bottom)
+        painter.drawLine(self.margin_left, 0, self.margin_left, page_height)
+        painter.drawLine(page_width - self.margin_right, 0, page_width - self.margin_right, page_height)
+
+        painter.setPen(self._pen_page_border)
+        painter.drawRect(0, 0, page_width - 1, page_height - 1)
+        painter.end()
+
+        self._page_chrome = pixmap
+        self._page_chrome_key = key
+        return pixmap
 
     def paintEvent(self, event):
         painter = QPainter(self.viewport())
-        painter.fillRect(self.rect(), QColor("#505050")) 
+        dirty = event.rect()
+        painter.fillRect(dirty, self._page_gap_color)
         
         page_width = self.width()
         page_height = self.page_height_px
-        page_count = self.height() // page_height
-        if page_count < 1: page_count = 1
+        page_count = self.pages.page_count()
+        chrome = self._page_chrome_pixmap()
         
-        for i in range(page_count):
+        # Рисуем только страницы, попадающие в перерисовываемую область
+        first_page = self.pages.page_of_y(dirty.top())
+        last_page = self.pages.page_of_y(dirty.bottom())
+        for i in range(first_page, last_page + 1):
             page_y = i * page_height
-            painter.fillRect(0, page_y, page_width, page_height, QColor("white"))
-            
-            pen_dash = QPen(QColor(0, 0, 0, 50))
-            pen_dash.setStyle(Qt.PenStyle.DashLine)
-            pen_dash.setWidth(1)
-            painter.setPen(pen_dash)
-            mid_y = page_y + (page_height / 2)
-            painter.drawLine(0, int(mid_y), page_width, int(mid_y))
-            
-            pen_margin = QPen(QColor("#f0f0f0"))
-            painter.setPen(pen_margin)
-            painter.drawLine(0, page_y + self.margin_top, page_width, page_y + self.margin_top)
-            painter.drawLine(0, page_y + page_height - self.margin_bottom, page_width, page_y + page_height - self.margin_bottom)
-            painter.drawLine(self.margin_left, page_y, self.margin_left, page_y + page_height)
-            painter.drawLine(page_width - self.margin_right, page_y, page_width - self.margin_right, page_y + page_height)
-            
-            painter.setPen(QPen(QColor("#d0d0d0")))
-            painter.drawRect(0, page_y, page_width - 1, page_height - 1)
+            painter.drawPixmap(0, page_y, chrome)
             
             if i > 0:
-                painter.fillRect(0, page_y - 2, page_width, 4, QColor("#505050"))
+                painter.fillRect(0, page_y - 2, page_width, 4, self._page_gap_color)
+        
+        # Нижние 2px последней перерисованной страницы — верхняя половина разделителя перед следующей
+        if last_page + 1 < page_count and (last_page + 1) * page_height - 2 <= dirty.bottom():
+            painter.fillRect(0, (last_page + 1) * page_height - 2, page_width, 2, self._page_gap_color)
         
         painter.end()
         super().paintEvent(event)
 
-    def save_to_docx(self, filename):
-        try:
-            from bs4 import BeautifulSoup, NavigableString, Tag
-            from docx import Document
-            from docx.shared import Pt, Mm
-            from docx.enum.text import WD_ALIGN_PARAGRAPH
-        except ImportError:
-            QMessageBox.critical(self, "Ошибка", "Необходимо установить библиотеки:\npip install beautifulsoup4 python-docx")
+    def save_to_file(self, open_after_save=False):
+        """
+        Сохраняет документ в выбранный файл. В GUI-потоке делается только снимок документа;
+        сериализация и запись идут в QThreadPool (см. paperexport.SaveTask), ход — сигнал saveStarted.
+        """
+        self.flush_pagination()
+        filename, _ = QFileDialog.getSaveFileName(None, "Сохранить файл", "", "Word Document (*.docx);;OpenDocument Text (*.odt);;Word 97-2003 Document (*.doc);;PDF Files (*.pdf);;HTML Files (*.html);;Text Files (*.txt)")
+        if not filename:
             return
 
-        doc = Document()
-        
-        # Настройка полей страницы (A4)
-        section = doc.sections[0]
-        section.page_width = Mm(210)
-        section.page_height = Mm(297)
-        section.left_margin = Mm(25)
-        section.right_margin = Mm(12.7)
-        section.top_margin = Mm(12.7)
-        section.bottom_margin = Mm(12.7)
-        
-        # Установка шрифта по умолчанию
-        style = doc.styles['Normal']
-        font = style.font
-        font.name = 'Times New Roman'
-        font.size = Pt(10)
-        
-        html_content = self.toHtml()
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        def add_run_recursive(parent_element, doc_paragraph, current_styles):
-            for child in parent_element.children:
-                if child.name == 'br':
-                    doc_paragraph.add_run('\n')
-                    continue
-                    
-                # Clone styles for this child
-                child_styles = current_styles.copy()
-                
-                if isinstance(child, Tag):
-                    # Update styles based on tag/attributes
-                    style_str = child.get('style', '').lower()
-                    css = {}
-                    for item in style_str.split(';'):
-                        if ':' in item:
-                            k, v = item.split(':', 1)
-                            css[k.strip()] = v.strip()
-                    
-                    if child.name in ['b', 'strong'] or \
-                       css.get('font-weight') in ['bold', 'bolder'] or \
-                       (css.get('font-weight', '').isdigit() and int(css['font-weight']) >= 600):
-                        child_styles['bold'] = True
-                        
-                    if child.name in ['i', 'em'] or css.get('font-style') == 'italic':
-                        child_styles['italic'] = True
-                        
-                    if child.name == 'u' or 'underline' in css.get('text-decoration', ''):
-                        child_styles['underline'] = True
-                        
-                    # Обработка размера шрифта
-                    if 'font-size' in css:
-                        size_str = css['font-size']
-                        # Пытаемся извлечь числовое значение
-                        match = re.match(r'([\d\.]+)(pt|px|em)?', size_str)
-                        if match:
-                            val = float(match.group(1))
-                            unit = match.group(2)
-                            
-                            # Конвертация в Pt (примерная)
-                            # В HTML Qt font-size часто в pt
-                            if unit == 'px':
-                                # 96dpi: 1px = 0.75pt
-                                val = val * 0.75
-                            
-                            child_styles['font_size'] = val
-                        
-                    # Recurse
-                    add_run_recursive(child, doc_paragraph, child_styles)
-                    
-                elif isinstance(child, NavigableString):
-                    text = str(child)
-                    if text:
-                        run = doc_paragraph.add_run(text)
-                        if child_styles.get('bold'): run.bold = True
-                        if child_styles.get('italic'): run.italic = True
-                        if child_styles.get('underline'): run.underline = True
-                        
-                        if 'font_size' in child_styles:
-                            run.font.size = Pt(child_styles['font_size'])
-
-        def process_paragraph_content(p_tag, doc_paragraph):
-            doc_paragraph.paragraph_format.space_after = Pt(3) # Добавлен небольшой отступ
-            doc_paragraph.paragraph_format.line_spacing = 1
-            
-            align = p_tag.get('align')
-            style = p_tag.get('style', '')
-            if 'text-align:center' in style or align == 'center':
-                doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            elif 'text-align:right' in style or align == 'right':
-                doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-            elif 'text-align:justify' in style or align == 'justify':
-                doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-            else:
-                doc_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-
-            # Start recursion with empty styles
-            add_run_recursive(p_tag, doc_paragraph, {})
-
-        def process_container(soup_container, docx_container):
-            for element in soup_container.children:
-                if isinstance(element, NavigableString):
-                    text = str(element).strip()
-                    if text:
-                        p = docx_container.add_paragraph()
-                        p.add_run(text)
-                    continue
-                
-                if element.name == 'table':
-                    rows = element.find_all('tr', recursive=False)
-                    if not rows: continue
-                    
-                    max_cols = 0
-                    for row in rows:
-                        cols = row.find_all(['td', 'th'], recursive=False)
-                        current_cols = 0
-                        for col in cols:
-                            current_cols += int(col.get('colspan', 1))
-                        max_cols = max(max_cols, current_cols)
-                    
-                    table = docx_container.add_table(rows=len(rows), cols=max_cols)
-                    # table.style = 'Table Grid' # Removed to hide borders
-                    table.autofit = False
-                    table.allow_autofit = False
-                    
-                    if max_cols == 2:
-                        for col_idx, width in enumerate([Mm(40), Mm(132)]):
-                            if col_idx < len(table.columns):
-                                table.columns[col_idx].width = width
-                                for cell in table.columns[col_idx].cells:
-                                    cell.width = width
-
-                    grid = [[False for _ in range(max_cols)] for _ in range(len(rows))]
-                    
-                    for r_idx, row in enumerate(rows):
-                        cols = row.find_all(['td', 'th'], recursive=False)
-                        c_idx = 0
-                        for col in cols:
-                            while c_idx < max_cols and grid[r_idx][c_idx]:
-                                c_idx += 1
-                            if c_idx >= max_cols: break
-                            
-                            rowspan = int(col.get('rowspan', 1))
-                            colspan = int(col.get('colspan', 1))
-                            
-                            for r in range(rowspan):
-                                for c in range(colspan):
-                                    if r_idx + r < len(rows) and c_idx + c < max_cols:
-                                        grid[r_idx + r][c_idx + c] = True
-                            
-                            cell = table.cell(r_idx, c_idx)
-                            if rowspan > 1 or colspan > 1:
-                                end_r = min(r_idx + rowspan - 1, len(rows) - 1)
-                                end_c = min(c_idx + colspan - 1, max_cols - 1)
-                                cell.merge(table.cell(end_r, end_c))
-                            
-                            # Clear default paragraph
-                            cell._element.clear_content()
-                            
-                            process_container(col, cell)
-                            
-                            # Ensure cell is valid (must end with a paragraph)
-                            if len(cell._element) == 0 or not cell._element[-1].tag.endswith('p'):
-                                cell.add_paragraph()
-                            
-                            c_idx += colspan
-
-                elif element.name in ['p', 'h1', 'h2', 'h3', 'div']:
-                    p = docx_container.add_paragraph()
-                    process_paragraph_content(element, p)
-                
-                elif element.name == 'ul':
-                    for li in element.find_all('li', recursive=False):
-                        p = docx_container.add_paragraph(style='List Bullet')
-                        process_paragraph_content(li, p)
-                
-                elif element.name == 'ol':
-                    for li in element.find_all('li', recursive=False):
-                        p = docx_container.add_paragraph(style='List Number')
-                        process_paragraph_content(li, p)
-
-        body = soup.body
-        if body:
-            # --- ЛОГИКА РАЗВОРАЧИВАНИЯ (UNWRAPPING) ---
-            # Проверяем, является ли body "оберткой" из одной таблицы 1x1
-            children = [c for c in body.children if not (isinstance(c, NavigableString) and not str(c).strip())]
-            
-            if len(children) == 1 and children[0].name == 'table':
-                outer_table = children[0]
-                rows = outer_table.find_all('tr', recursive=False)
-                if len(rows) == 1:
-                    cols = rows[0].find_all(['td', 'th'], recursive=False)
-                    if len(cols) == 1:
-                        # Это таблица-обертка 1x1. Берем содержимое ячейки как новое тело.
-                        body = cols[0]
-
-            process_container(body, doc)
-        
-        doc.save(filename)
+        fmt = file_format(filename)
+        if fmt == 'docx':
+            try:
+                import paperdocx
+            except ImportError:
+                QMessageBox.warning(self, "Внимание", "Библиотека python-docx не найдена. Сохранение будет выполнено в формате HTML с расширением .docx (может открываться с ошибками).")
+                fmt = 'html'
 
-    def save_to_file(self, open_after_save=False):
-        filename, _ = QFileDialog.getSaveFileName(None, "Сохранить файл", "", "Word Document (*.docx);;OpenDocument Text (*.odt);;Word 97-2003 Document (*.doc);;PDF Files (*.pdf);;HTML Files (*.html)")
-        if filename:
-            if filename.endswith(".pdf"):
-                printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-                printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-                printer.setOutputFileName(filename)
-                
-                # FIX: Use clone() to ensure content is preserved and editor is not affected
-                temp_doc = self.document().clone()
-                temp_doc.print(printer)
-            elif filename.endswith(".docx"):
-                try:
-                    import docx
-                    self.save_to_docx(filename)
-                except ImportError:
-                    QMessageBox.warning(self, "Внимание", "Библиотека python-docx не найдена. Сохранение будет выполнено в формате HTML с расширением .docx (может открываться с ошибками).")
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        f.write(self.toHtml())
-            elif filename.endswith(".odt"):
-                writer = QTextDocumentWriter(filename)
-                writer.setFormat(QTextDocumentWriter.Format.ODFFormat)
-                writer.write(self.document())
-            elif filename.endswith(".doc"):
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(self.toHtml())
-            else:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(self.toHtml())
-            
-            if open_after_save:
-                QDesktopServices.openUrl(QUrl.fromLocalFile(filename))
+        self._start_saves([self._save_task(filename, fmt, open_after_save)])
+
+    def export_bundle(self, file_names):
+        """
+        Сохраняет одно состояние документа сразу в несколько файлов {формат: путь} (см. paperexport.bundle_file_names).
+        Снимок документа один на все файлы; сериализуются и пишутся они параллельно в QThreadPool.
+        """
+        self.flush_pagination()
+        if 'docx' in file_names:
+            try:
+                import paperdocx
+            except ImportError:
+                QMessageBox.warning(self, "Внимание", "Библиотека python-docx не найдена. Файл DOCX в комплект не войдет.")
+                file_names = {fmt: name for fmt, name in file_names.items() if fmt != 'docx'}
+        # Один снимок на все файлы, которых нет в кэше ревизии
+        snapshot = None
+        if any(self._cached_file(fmt) is None for fmt in file_names):
+            snapshot = self._export_snapshot()
+        return self._start_saves([self._save_task(filename, fmt, snapshot=snapshot) for fmt, filename in file_names.items()])
+
+    def _save_task(self, filename, fmt, open_after_save=False, snapshot=None):
+        cache = self.export_cache
+        key = cache.key()
+        data = self._cached_file(fmt)
+        if data is None:
+            if snapshot is None:
+                snapshot = self._export_snapshot()
+            task = SaveTask(snapshot, filename, fmt)
+            task.signals.finished.connect(lambda name: cache.put(key, ('file', fmt), task.data))
+        else:
+            task = SaveTask(None, filename, fmt, data)
+        task.signals.finished.connect(lambda name: self._on_save_finished(task, open_after_save))
+        task.signals.failed.connect(lambda message: self._on_save_failed(task, message))
+        task.signals.cancelled.connect(lambda: self._forget_save_task(task))
+        return task
+
+    def _export_snapshot(self):
+        """
+        Снимок документа для сохранения в рабочем потоке. Пока документ не правили прямо
+        в редакторе, он целиком задан данными секций: тогда GUI-поток копирует только их
+        (document_state), а документ строит DocumentBuilder в рабочем потоке. Иначе — снимок
+        всего содержимого (DocumentSnapshot).
+        """
+        if self._edited_directly:
+            return DocumentSnapshot(self.document())
+        return self.document_state()
+
+    def _cached_file(self, fmt):
+        """Содержимое файла формата fmt, если для этой ревизии оно уже посчитано (повторное сохранение)."""
+        return self.export_cache.peek(('file', fmt))
+
+    def _start_saves(self, tasks):
+        for task in tasks:
+            self._save_tasks.add(task)
+            self.saveStarted.emit(task)
+            QThreadPool.globalInstance().start(task)
+        return tasks
+
+    def _on_save_finished(self, task, open_after_save):
+        self._forget_save_task(task)
+        if open_after_save:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(task.filename))
+
+    def _on_save_failed(self, task, message):
+        self._forget_save_task(task)
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл:\n{task.filename}\n\n{message}")
+
+    def _forget_save_task(self, task):
+        self._save_tasks.discard(task)
+        task.release_snapshot()
+        # Соединения сигналов держат задачу — удаляем их вместе с объектом сигналов
+        task.signals.deleteLater()
 
     def copy_content(self):
-        self.selectAll()
-        self.copy()
+        self.flush_pagination()
+        # Содержимое буфера обмена считается один раз на ревизию; QMimeData забирает буфер обмена,
+        # поэтому для каждого копирования собирается новый из запомненных форматов
+        mime = QMimeData()
+        for name, data in self.export_cache.get('clipboard', self._clipboard_formats):
+            mime.setData(name, data)
+        QApplication.clipboard().setMimeData(mime)
+
+    def _clipboard_formats(self):
+        """Форматы, которые copy() кладет в буфер обмена для всего документа (HTML, текст, ODF)."""
         cursor = self.textCursor()
-        cursor.clearSelection()
-        self.setTextCursor(cursor)
+        select_all = QTextCursor(self.document())
+        select_all.select(QTextCursor.SelectionType.Document)
+        self.setTextCursor(select_all)
+        try:
+            mime = self.createMimeDataFromSelection()
+        finally:
+            self.setTextCursor(cursor)
+        return [(name, mime.data(name)) for name in mime.formats()]
 
     def print_preview(self):
         printer = QPrinter(QPrinter.PrinterMode.ScreenResolution) # Changed from HighResolution
@@ -1172,35 +793,9 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
             self.print_to_printer(printer, preview.chk_split_line.isChecked())
 
     def print_to_printer(self, printer, draw_split_line=False):
-        # Create a temporary document to avoid modifying the editor
-        temp_doc = QTextDocument()
-        # Copy content using HTML to ensure complete isolation
-        temp_doc.setHtml(self.toHtml())
-        
-        # Set default font and style
-        temp_doc.setDefaultFont(self.document().defaultFont())
-        temp_doc.setDefaultStyleSheet(self.document().defaultStyleSheet())
-        
-        # Force black text color
-        cursor = QTextCursor(temp_doc)
-        cursor.select(QTextCursor.SelectionType.Document)
-        char_fmt = QTextCharFormat()
-        char_fmt.setForeground(QColor("black"))
-        cursor.mergeCharFormat(char_fmt)
-        cursor.clearSelection()
-        
-        # Remove table borders for printing
-        def process_frame(frame):
-            if isinstance(frame, QTextTable):
-                fmt = frame.format()
-                if fmt.border() > 0:
-                    new_fmt = QTextTableFormat(fmt)
-                    new_fmt.setBorder(0)
-                    frame.setFormat(new_fmt)
-            for child in frame.childFrames():
-                process_frame(child)
-        
-        process_frame(temp_doc.rootFrame())
+        self.flush_pagination()
+        # Документ для печати общий для всех печатей одной ревизии (предпросмотр, печать)
+        temp_doc, pages = self.export_cache.get('print_document', self._build_print_document)
         
         # Configure printer
         printer.setFullPage(True)
@@ -1229,19 +824,22 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
         
         # Draw
         layout = temp_doc.documentLayout()
-        doc_height = layout.documentSize().height()
+        pages.set_page_height(paper_height_logical)
+        if layout.documentSize().height() <= 0:
+            painter.end()
+            return 0
         
-        y = 0
-        while y < doc_height:
-            if y > 0:
+        for number, page in enumerate(self._pages_to_print(printer, pages)):
+            if number > 0:
                 printer.newPage()
             
+            y = pages.page_top(page)
             painter.save()
             painter.scale(dpi_scale, dpi_scale)
             painter.translate(0, -y)
             
             ctx = QAbstractTextDocumentLayout.PaintContext()
-            ctx.clip = QRectF(0, y, paper_width_logical, paper_height_logical)
+            ctx.clip = pages.page_rect(page, paper_width_logical)
             
             layout.draw(painter, ctx)
             
@@ -1254,10 +852,58 @@ class A4Editor(QTextEdit, ExamMixin, OperMixin):
                 painter.drawLine(QPointF(0, mid_y), QPointF(paper_width_logical, mid_y))
             
             painter.restore()
-            
-            y += paper_height_logical
         
         painter.end()
+        return pages.page_count()
+
+    def _pages_to_print(self, printer, pages):
+        """
+        Номера страниц документа для печати по диапазону, выбранному в диалоге печати.
+        Страницы курсора и выделения ищутся по индексу страниц документа для печати:
+        позиции в нем те же, что в документе редактора.
+        """
+        count = pages.page_count()
+        print_range = printer.printRange()
+        cursor = self.textCursor()
+        if print_range == QPrinter.PrintRange.PageRange and printer.fromPage() > 0:
+            first = min(printer.fromPage(), count) - 1
+            last = min(printer.toPage() or count, count) - 1
+            return range(first, last + 1)
+        if print_range == QPrinter.PrintRange.CurrentPage:
+            page = pages.page_of_cursor(cursor)
+            return range(page, page + 1)
+        if print_range == QPrinter.PrintRange.Selection and cursor.hasSelection():
+            return range(pages.page_of_position(cursor.selectionStart()),
+                         pages.page_of_position(cursor.selectionEnd()) + 1)
+        return range(count)
+
+    def _build_print_document(self):
+        """Документ для печати (черный текст, таблицы без рамок) и его индекс страниц."""
+        # Копия документа редактора: без разбора HTML, позиции совпадают с редактором
+        temp_doc = self.document().clone()
+        temp_doc.setUndoRedoEnabled(False)
+        
+        # Force black text color
+        cursor = QTextCursor(temp_doc)
+        cursor.select(QTextCursor.SelectionType.Document)
+        char_fmt = QTextCharFormat()
+        char_fmt.setForeground(QColor("black"))
+        cursor.mergeCharFormat(char_fmt)
+        cursor.clearSelection()
+        
+        # Remove table borders for printing
+        def process_frame(frame):
+            if isinstance(frame, QTextTable):
+                fmt = frame.format()
+                if fmt.border() > 0:
+                    new_fmt = QTextTableFormat(fmt)
+                    new_fmt.setBorder(0)
+                    frame.setFormat(new_fmt)
+            for child in frame.childFrames():
+                process_frame(child)
+        
+        process_frame(temp_doc.rootFrame())
+        return temp_doc, PageIndex(temp_doc, 0)
 
 class PannableGraphicsView(QGraphicsView):
     zoomChanged = pyqtSignal(int)
@@ -1374,13 +1020,14 @@ class EditorPanel(QWidget):
     indicatorsChangedFromEditor = pyqtSignal(str, str, str)
     complaintsAnamnesisChangedFromEditor = pyqtSignal(str, str)
     objectiveChangedFromEditor = pyqtSignal(dict)
-    diagnosisChangedFromEditor = pyqtSignal(str)
-    recommendationsChangedFromEditor = pyqtSignal(str)
+    diagnosisChangedFromEditor = pyqtSignal(object) # RichText
+    recommendationsChangedFromEditor = pyqtSignal(object) # RichText
     repeatChangedFromEditor = pyqtSignal(bool, str, str)
     sickLeaveChangedFromEditor = pyqtSignal(dict)
     signatureChangedFromEditor = pyqtSignal(str)
     operationDataChangedFromEditor = pyqtSignal(dict)
     operationStaffChangedFromEditor = pyqtSignal(str, str) # Добавлен сигнал
+    saveStarted = pyqtSignal(object) # SaveTask
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -1422,6 +1069,9 @@ class EditorPanel(QWidget):
             "other": "", "other_vis": False
         }
 
+        # Поля объективного осмотра, измененные дельтой (см. set_objective_field)
+        self._objective_fields = set()
+
         # Сохраняем состояние для сурдологии
         self._surdology_data = {
             "enabled": False
@@ -1467,6 +1117,66 @@ class EditorPanel(QWidget):
         self._nurse = ""
         self._signature_visible = False
 
+        # Отложенные обновления редактора (см. _schedule / flush_updates)
+        self._dirty_sections = set()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self.flush_updates)
+        self._section_renderers = {
+            'operation_mode': self._apply_operation_mode,
+            'signature_visible': self._apply_signature_visible,
+            'date': self.update_date,
+            'specialty': self.update_specialty,
+            'indicators': self.update_indicators,
+            'complaints': self.update_complaints,
+            'consent': self.update_consent,
+            'objective': self.update_objective,
+            'objective_fields': self.update_objective_fields,
+            'surdology': self.update_surdology,
+            'diagnosis': self.update_diagnosis,
+            'recommendations': self.update_recommendations,
+            'repeat': self.update_repeat,
+            'sick_leave': self.update_sick_leave,
+            'signature': self.update_signature,
+            'operation': self.update_operation_data,
+            'op_staff': self.update_operation_staff,
+        }
+
+        # Канал состояния формы (см. attach_form_state): путь поля -> сеттер
+        self._form_state = None
+        self._form_setters = {
+            'date': self.set_date,
+            'time': self.set_time,
+            'time_enabled': self.set_time_enabled,
+            'specialty': self.set_specialty,
+            'cito': self.set_cito,
+            'no_card': self.set_no_card,
+            'ad': self.set_ad,
+            'temp': self.set_temp,
+            'weight': self.set_weight,
+            'paid_service': self.set_paid_service,
+            'complaints': self.set_complaints,
+            'anamnesis': self.set_anamnesis,
+            'no_complaints': self.set_no_complaints,
+            'show_anamnesis_label': self.set_show_anamnesis_label,
+            'consent': self.set_consent,
+            'objective': self.set_objective,
+            'surdology': self.set_surdology,
+            'diagnosis': self.set_diagnosis,
+            'diagnosis.show_label': self.set_show_diagnosis_label,
+            'diagnosis.no_acute_pathology': self.set_no_acute_pathology,
+            'recommendations': self.set_recommendations,
+            'recommendations.show_label': self.set_show_recommendations_label,
+            'repeat': lambda value: self.set_repeat(*value),
+            'sick_leave': self.set_sick_leave,
+            'signature': self.set_signature,
+            'signature_visible': self.set_signature_visible,
+            'operation_mode': self.set_operation_mode,
+            'operation': self.set_operation_data,
+            'op_staff': lambda value: self.set_operation_staff(*value),
+        }
+
         self.icons_path = os.path.join(os.path.dirname(__file__), "Buttons")
 
         toolbar_style = """
@@ -1616,23 +1326,18 @@ class EditorPanel(QWidget):
         self.proxy = self.scene.addWidget(self.editor)
 
         # Подключаем сигнал от редактора к сигналу панели
-        self.editor.dateChangedFromEditor.connect(self.dateChangedFromEditor.emit)
+        self.editor.dateChangedFromEditor.connect(self.handle_date_changed)
         self.editor.indicatorsChangedFromEditor.connect(self.handle_indicators_changed)
         self.editor.complaintsAnamnesisChangedFromEditor.connect(self.handle_complaints_anamnesis_changed)
         self.editor.objectiveChangedFromEditor.connect(self.handle_objective_changed)
-        self.editor.diagnosisChangedFromEditor.connect(self.diagnosisChangedFromEditor.emit)
-        self.editor.recommendationsChangedFromEditor.connect(self.recommendationsChangedFromEditor.emit)
-        self.editor.repeatChangedFromEditor.connect(self.repeatChangedFromEditor.emit)
-        self.editor.sickLeaveChangedFromEditor.connect(self.sickLeaveChangedFromEditor.emit)
-        self.editor.signatureChangedFromEditor.connect(self.signatureChangedFromEditor.emit)
-        self.editor.operationDataChangedFromEditor.connect(self.operationDataChangedFromEditor.emit)
-        
-        # Подключаем новый сигнал для персонала
-        # Внимание: в A4Editor этот сигнал еще не определен, но мы его добавим в следующем шаге
-        # Пока закомментируем, чтобы не было ошибки, или добавим в A4Editor сразу
-        # Но так как мы перезаписываем paperspace.py целиком, мы можем добавить его в A4Editor выше
-        # (я уже добавил его в определение класса A4Editor выше)
-        self.editor.operationStaffChangedFromEditor.connect(self.operationStaffChangedFromEditor.emit)
+        self.editor.diagnosisChangedFromEditor.connect(self.handle_diagnosis_changed)
+        self.editor.recommendationsChangedFromEditor.connect(self.handle_recommendations_changed)
+        self.editor.repeatChangedFromEditor.connect(self.handle_repeat_changed)
+        self.editor.sickLeaveChangedFromEditor.connect(self.handle_sick_leave_changed)
+        self.editor.signatureChangedFromEditor.connect(self.handle_signature_changed)
+        self.editor.operationDataChangedFromEditor.connect(self.handle_operation_data_changed)
+        self.editor.operationStaffChangedFromEditor.connect(self.handle_operation_staff_changed)
+        self.editor.saveStarted.connect(self.saveStarted)
 
         # Подключаем сигнал изменения курсора для обновления состояния кнопок
         self.editor.cursorPositionChanged.connect(self.update_format_buttons_state)
@@ -1719,81 +1424,171 @@ class EditorPanel(QWidget):
 
         QTimer.singleShot(0, self.editor.paginate)
 
+    # --- Правки из редактора ---
+    # Значения, прочитанные из документа, запоминаются как текущее состояние формы:
+    # иначе следующая правка соседнего поля формы отправила бы в редактор устаревшие данные
+
+    def handle_date_changed(self, date):
+        self._current_date = date
+        self.dateChangedFromEditor.emit(date)
+
     def handle_indicators_changed(self, ad, temp, weight):
+        self._ad, self._temp, self._weight = ad, temp, weight
         self.indicatorsChangedFromEditor.emit(ad, temp, weight)
 
     def handle_complaints_anamnesis_changed(self, complaints, anamnesis):
+        self._complaints, self._anamnesis = complaints, anamnesis
         self.complaintsAnamnesisChangedFromEditor.emit(complaints, anamnesis)
 
     def handle_objective_changed(self, data):
+        self._objective_data = data
         self.objectiveChangedFromEditor.emit(data)
 
+    def handle_diagnosis_changed(self, diagnosis):
+        self._diagnosis = dict(self._diagnosis, text=diagnosis)
+        self.diagnosisChangedFromEditor.emit(diagnosis)
+
+    def handle_recommendations_changed(self, recommendations):
+        self._recommendations = recommendations
+        self.recommendationsChangedFromEditor.emit(recommendations)
+
+    def handle_repeat_changed(self, enabled, date, time):
+        self._repeat_enabled, self._repeat_date, self._repeat_time = enabled, date, time
+        self.repeatChangedFromEditor.emit(enabled, date, time)
+
+    def handle_sick_leave_changed(self, data):
+        self._sick_leave_data = data
+        self.sickLeaveChangedFromEditor.emit(data)
+
+    def handle_signature_changed(self, name):
+        self._doctor_name = name
+        self.signatureChangedFromEditor.emit(name)
+
+    def handle_operation_data_changed(self, data):
+        self._operation_data = data
+        self.operationDataChangedFromEditor.emit(data)
+
+    def handle_operation_staff_changed(self, operator, nurse):
+        self._operator, self._nurse = operator, nurse
+        self.operationStaffChangedFromEditor.emit(operator, nurse)
+
+    # --- Планировщик обновлений ---
+    # Сеттеры только запоминают состояние и помечают секцию "грязной".
+    # Один проход на итерацию цикла событий отрисовывает каждую секцию ровно один раз.
+
+    # Порядок применения: сначала структура документа, затем содержимое секций
+    _FLUSH_ORDER = (
+        'operation_mode', 'signature_visible',
+        'date', 'specialty', 'indicators', 'complaints', 'consent', 'objective', 'objective_fields',
+        'surdology', 'diagnosis', 'recommendations', 'repeat', 'sick_leave',
+        'signature', 'operation', 'op_staff',
+    )
+
+    def _schedule(self, *sections):
+        self._dirty_sections.update(sections)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def attach_form_state(self, channel):
+        """Подписывает панель на канал состояния формы (formstate.FormStateChannel)."""
+        self._form_state = channel
+        channel.subscribe(self.apply_form_state)
+
+    def apply_form_state(self, diff):
+        """Пакет изменений формы {путь поля: значение}: запоминает значения и помечает секции."""
+        for path, value in diff.items():
+            section, _, key = path.partition('.')
+            if section == 'objective' and key:
+                self.set_objective_field(key, value)
+            else:
+                self._form_setters[path](value)
+
+    def flush_updates(self):
+        """Синхронно применяет все отложенные обновления (перед печатью, сохранением, копированием)."""
+        # Изменения формы, еще не доставленные каналом состояния
+        if self._form_state is not None:
+            self._form_state.flush()
+        # Сначала правки, сделанные прямо в документе, — иначе перерисовка из формы их затрет
+        self.editor.flush_reverse_sync()
+        self._flush_timer.stop()
+        while self._dirty_sections:
+            dirty = self._dirty_sections
+            self._dirty_sections = set()
+            for section in self._FLUSH_ORDER:
+                if section in dirty:
+                    self._section_renderers[section]()
+
+    def _apply_operation_mode(self):
+        self.editor.set_operation_mode(self._operation_mode)
+
+    def _apply_signature_visible(self):
+        self.editor.set_signature_visible(self._signature_visible)
+
     # --- Setters ---
     def set_date(self, date):
         self._current_date = date
-        self.update_date()
+        self._schedule('date')
 
     def set_time(self, time):
         self._current_time = time
-        self.update_date()
+        self._schedule('date')
 
     def set_time_enabled(self, enabled):
         self._time_enabled = enabled
-        self.update_date()
+        self._schedule('date')
 
     def update_date(self):
         self.editor.update_date_from_ui(self._current_date, self._current_time, self._time_enabled)
 
     def set_specialty(self, specialty):
         self._specialty = specialty
-        self.update_specialty()
-        self.update_signature()
+        self._schedule('specialty', 'signature')
 
     def set_cito(self, cito):
         self._cito = cito
-        self.update_specialty()
+        self._schedule('specialty')
 
     def update_specialty(self):
         self.editor.update_specialty_from_ui(self._specialty, self._cito)
 
     def set_ad(self, ad):
         self._ad = ad
-        self.update_indicators()
+        self._schedule('indicators')
 
     def set_temp(self, temp):
         self._temp = temp
-        self.update_indicators()
+        self._schedule('indicators')
 
     def set_weight(self, weight):
         self._weight = weight
-        self.update_indicators()
+        self._schedule('indicators')
 
     def set_paid_service(self, paid):
         self._paid_service = paid
-        self.update_indicators()
+        self._schedule('indicators')
 
     def update_indicators(self):
         self.editor.update_indicators_from_ui(self._ad, self._temp, self._weight, self._paid_service)
 
     def set_complaints(self, complaints):
         self._complaints = complaints
-        self.update_complaints()
+        self._schedule('complaints')
 
     def set_anamnesis(self, anamnesis):
         self._anamnesis = anamnesis
-        self.update_complaints()
+        self._schedule('complaints')
 
     def set_no_complaints(self, no_complaints):
         self._no_complaints = no_complaints
-        self.update_complaints()
+        self._schedule('complaints')
 
     def set_show_anamnesis_label(self, show):
         self._show_anamnesis_label = show
-        self.update_complaints()
+        self._schedule('complaints')
 
     def set_no_card(self, no_card):
         self._no_card = no_card
-        self.update_complaints()
+        self._schedule('complaints')
 
     def update_complaints(self):
         self.editor.update_complaints_anamnesis_from_ui(
@@ -1804,15 +1599,35 @@ class EditorPanel(QWidget):
 
     def set_consent(self, consent):
         self._consent_enabled = consent
-        self.editor.update_consent_from_ui(consent)
+        self._schedule('consent')
+
+    def update_consent(self):
+        self.editor.update_consent_from_ui(self._consent_enabled)
 
     def set_objective(self, data):
         self._objective_data = data
-        self.editor.update_objective_from_ui(data)
+        self._schedule('objective')
+
+    def update_objective(self):
+        self.editor.update_objective_from_ui(self._objective_data)
+
+    def set_objective_field(self, key, text):
+        self._objective_data = dict(self._objective_data, **{key: text})
+        self._objective_fields.add(key)
+        self._schedule('objective_fields')
+
+    def update_objective_fields(self):
+        # После перерисовки блока целиком (секция 'objective' в том же проходе) правки полей — эхо
+        fields, self._objective_fields = self._objective_fields, set()
+        for key in sorted(fields):
+            self.editor.update_objective_field_from_ui(key, self._objective_data.get(key, ""))
 
     def set_surdology(self, data):
         self._surdology_data = data
-        self.editor.update_surdology_from_ui(data)
+        self._schedule('surdology')
+
+    def update_surdology(self):
+        self.editor.update_surdology_from_ui(self._surdology_data)
 
     def set_diagnosis(self, diagnosis):
         if isinstance(self._diagnosis, dict):
@@ -1823,7 +1638,7 @@ class EditorPanel(QWidget):
                 "show_label": True,
                 "no_acute_pathology": False
             }
-        self.update_diagnosis()
+        self._schedule('diagnosis')
 
     def set_show_diagnosis_label(self, show):
         if isinstance(self._diagnosis, dict):
@@ -1834,7 +1649,7 @@ class EditorPanel(QWidget):
                 "show_label": show,
                 "no_acute_pathology": False
             }
-        self.update_diagnosis()
+        self._schedule('diagnosis')
 
     def set_no_acute_pathology(self, no_pathology):
         if isinstance(self._diagnosis, dict):
@@ -1845,18 +1660,18 @@ class EditorPanel(QWidget):
                 "show_label": True,
                 "no_acute_pathology": no_pathology
             }
-        self.update_diagnosis()
+        self._schedule('diagnosis')
 
     def update_diagnosis(self):
         self.editor.update_diagnosis_from_ui(self._diagnosis)
 
     def set_recommendations(self, recommendations):
         self._recommendations = recommendations
-        self.update_recommendations()
+        self._schedule('recommendations')
 
     def set_show_recommendations_label(self, show):
         self._show_recommendations_label = show
-        self.update_recommendations()
+        self._schedule('recommendations')
 
     def update_recommendations(self):
         self.editor.update_recommendations_from_ui(self._recommendations, self._show_recommendations_label)
@@ -1865,46 +1680,83 @@ class EditorPanel(QWidget):
         self._repeat_enabled = enabled
         self._repeat_date = date
         self._repeat_time = time
-        self.editor.update_repeat_from_ui(enabled, date, time)
+        self._schedule('repeat')
+
+    def update_repeat(self):
+        self.editor.update_repeat_from_ui(self._repeat_enabled, self._repeat_date, self._repeat_time)
 
     def set_sick_leave(self, data):
         self._sick_leave_data = data
-        self.editor.update_sick_leave_from_ui(data)
+        self._schedule('sick_leave')
+
+    def update_sick_leave(self):
+        self.editor.update_sick_leave_from_ui(self._sick_leave_data)
 
     def set_signature(self, signature):
         self._doctor_name = signature
-        self.update_signature()
+        self._schedule('signature')
 
     def update_signature(self):
         self.editor.update_signature_from_ui(self._specialty, self._doctor_name)
 
     def set_operation_mode(self, enabled):
         self._operation_mode = enabled
-        self.editor.set_operation_mode(enabled)
-        # Принудительно обновляем заголовок специальности
-        self.editor.update_specialty_from_ui(self._specialty, self._cito)
+        # Заголовок специальности зависит от режима — обновляем его вместе с режимом
+        self._schedule('operation_mode', 'specialty')
 
     def set_operation_data(self, data):
         self._operation_data = data
-        self.editor.update_operation_from_ui(data)
+        self._schedule('operation')
+
+    def update_operation_data(self):
+        self.editor.update_operation_from_ui(self._operation_data)
 
     def set_operation_staff(self, operator, nurse):
         self._operator = operator
         self._nurse = nurse
-        self.editor.update_operation_staff_from_ui(operator, nurse)
+        self._schedule('op_staff')
+
+    def update_operation_staff(self):
+        self.editor.update_operation_staff_from_ui(self._operator, self._nurse)
 
     def set_signature_visible(self, visible):
         self._signature_visible = visible
-        self.editor.set_signature_visible(visible)
+        self._schedule('signature_visible')
+
+    def set_sectioned_layout(self, enabled):
+        self.flush_updates()
+        self.editor.set_sectioned_layout(enabled)
+
+    def is_sectioned_layout(self):
+        return self.editor._sectioned_layout
 
     # --- Actions ---
     def save_to_file(self, open_after_save=False):
+        self.flush_updates()
         self.editor.save_to_file(open_after_save)
 
+    def export_fields(self):
+        """Поля протокола для шаблона имени файлов комплекта (см. paperexport.DEFAULT_NAME_PATTERN)."""
+        return {
+            'date': self._current_date,
+            'time': self._current_time if self._time_enabled else "",
+            'specialty': self._specialty,
+            'doctor': self._doctor_name,
+            'op_number': self._operation_data.get('op_number', "") if self._operation_mode else "",
+        }
+
+    def export_bundle(self, folder, formats, pattern):
+        """Сохраняет протокол в папку folder сразу во всех форматах formats; имена — по шаблону pattern."""
+        self.flush_updates()
+        file_names = bundle_file_names(folder, bundle_base_name(pattern, self.export_fields()), formats)
+        return self.editor.export_bundle(file_names)
+
     def copy_content(self):
+        self.flush_updates()
         self.editor.copy_content()
 
     def print_preview(self):
+        self.flush_updates()
         self.editor.print_preview()
 
     def update_scene_rect(self):
@@ -2014,6 +1866,7 @@ class EditorPanel(QWidget):
         scale = value / 100.0
         self.view.resetTransform()
         self.view.scale(scale, scale)
+        self.editor.set_render_scale(scale)
 
     def get_zoom(self):
         return self.current_zoom
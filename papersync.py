@@ -0,0 +1,70 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from paperfragments import freeze
+
+# Источники изменений секций протокола
+FORM = 'form'       # поля ввода формы (через EditorPanel)
+EDITOR = 'editor'   # правки, сделанные прямо в документе редактора
+
+# Имя для множества применяемых секций: идет обратный парсинг документа в форму
+REVERSE = 'reverse_sync'
+
+
+class ChangeLedger:
+    """
+    Журнал значений секций, которыми обмениваются форма и редактор.
+    Каждое принятое изменение получает номер ревизии и учитывается по источнику (FORM / EDITOR).
+    Значение, которое уже есть у принимающей стороны (эхо собственного изменения,
+    вернувшееся с другой стороны, или повтор), отбрасывается до отрисовки и до обновления
+    виджетов; такие случаи считаются в echoes.
+
+    Здесь же — множество секций, которые сейчас применяются: защита от повторного входа
+    вместо отдельного флага на каждую секцию.
+    """
+
+    def __init__(self):
+        self.revision = 0
+        self._values = {}        # секция -> нормализованное значение
+        self._applying = Counter()
+        self.changes = Counter() # (секция, источник) -> принятые изменения
+        self.echoes = Counter()  # (секция, источник) -> отброшенные эхо
+
+    def record(self, section, value, origin):
+        """
+        Принимает значение секции от origin.
+        Возвращает номер новой ревизии или None, если значение уже известно (эхо).
+        """
+        key = freeze(value)
+        if section in self._values and self._values[section] == key:
+            self.echoes[(section, origin)] += 1
+            return None
+        self.revision += 1
+        self._values[section] = key
+        self.changes[(section, origin)] += 1
+        return self.revision
+
+    @contextmanager
+    def applying(self, *names):
+        """Помечает секции (или операции: перестройка, обратный парсинг) как применяемые."""
+        self._applying.update(names)
+        try:
+            yield
+        finally:
+            self._applying.subtract(names)
+            self._applying += Counter()
+
+    def is_applying(self, *names):
+        """True, если применяется любая из секций names (без аргументов — вообще что-нибудь)."""
+        if not names:
+            return bool(self._applying)
+        return any(self._applying[name] for name in names)
+
+    def stats(self):
+        """Счетчики по источникам: {'form': (принято, эхо), 'editor': (принято, эхо)}."""
+        totals = {FORM: [0, 0], EDITOR: [0, 0]}
+        for (_, origin), count in self.changes.items():
+            totals.setdefault(origin, [0, 0])[0] += count
+        for (_, origin), count in self.echoes.items():
+            totals.setdefault(origin, [0, 0])[1] += count
+        return {origin: tuple(counts) for origin, counts in totals.items()}
@@ -12,53 +12,13 @@ import json
 # Импортируем новые блоки
 from examinationextra import SurdologyBlock, SickLeaveBlock, AdditionalBlock, DateInput, TimeInput, SymbolComboBox, EditableButton, NormButton, AutoResizingTextEdit, TemplateManagerDialog
 from examination import ExaminationPanel
+from formstate import FormStateChannel
 
 class WorkingSpacePanel(QFrame):
-    # Сигналы, которые пробрасываются из ExaminationPanel
-    dateChanged = pyqtSignal(str)
-    specialtyChanged = pyqtSignal(str)
-    timeChanged = pyqtSignal(str)
-    timeEnabledChanged = pyqtSignal(bool)
-    citoChanged = pyqtSignal(bool)
-    noCardChanged = pyqtSignal(bool)
-    
-    adChanged = pyqtSignal(str)
-    tempChanged = pyqtSignal(str)
-    weightChanged = pyqtSignal(str)
-    complaintsChanged = pyqtSignal(str)
-    anamnesisChanged = pyqtSignal(str)
-    
-    noComplaintsChanged = pyqtSignal(bool)
-    showAnamnesisLabelChanged = pyqtSignal(bool)
-    
-    paidServiceChanged = pyqtSignal(bool)
-    consentChanged = pyqtSignal(bool)
-    
-    objectiveChanged = pyqtSignal(dict)
-    
-    diagnosisChanged = pyqtSignal(str)
-    showDiagnosisLabelChanged = pyqtSignal(bool)
-    noAcutePathologyChanged = pyqtSignal(bool)
-    
-    recommendationsChanged = pyqtSignal(str)
-    showRecommendationsLabelChanged = pyqtSignal(bool)
-    repeatChanged = pyqtSignal(bool, str, str)
-    
-    sickLeaveChanged = pyqtSignal(dict)
-    
-    signatureChanged = pyqtSignal(str)
-    
-    surdologyChanged = pyqtSignal(dict)
-    
-    operationDataChanged = pyqtSignal(dict)
-    operationModeChanged = pyqtSignal(bool)
-    
-    # Новый сигнал для персонала операции
-    operationStaffChanged = pyqtSignal(str, str)
-    
-    # Сигнал видимости подписи
-    signatureVisibleChanged = pyqtSignal(bool)
-    
+    # Изменения полей формы идут не сигналами, а через канал состояния self.form_state (formstate.py)
+    # Запрос синхронизации документа с формой (перед сохранением шаблона)
+    syncRequested = pyqtSignal()
+
     # Сигналы для нижней панели
     saveRequested = pyqtSignal(bool) # Изменено: передает состояние чекбокса открытия
     copyRequested = pyqtSignal()
@@ -131,36 +91,44 @@ class WorkingSpacePanel(QFrame):
         
         main_layout.addWidget(self.bottom_panel)
         
-        # Пробрасываем все сигналы от examination_panel
-        self.examination_panel.dateChanged.connect(self.dateChanged)
-        self.examination_panel.specialtyChanged.connect(self.specialtyChanged)
-        self.examination_panel.timeChanged.connect(self.timeChanged)
-        self.examination_panel.timeEnabledChanged.connect(self.timeEnabledChanged)
-        self.examination_panel.citoChanged.connect(self.citoChanged)
-        self.examination_panel.noCardChanged.connect(self.noCardChanged)
-        self.examination_panel.adChanged.connect(self.adChanged)
-        self.examination_panel.tempChanged.connect(self.tempChanged)
-        self.examination_panel.weightChanged.connect(self.weightChanged)
-        self.examination_panel.complaintsChanged.connect(self.complaintsChanged)
-        self.examination_panel.anamnesisChanged.connect(self.anamnesisChanged)
-        self.examination_panel.noComplaintsChanged.connect(self.noComplaintsChanged)
-        self.examination_panel.showAnamnesisLabelChanged.connect(self.showAnamnesisLabelChanged)
-        self.examination_panel.paidServiceChanged.connect(self.paidServiceChanged)
-        self.examination_panel.consentChanged.connect(self.consentChanged)
-        self.examination_panel.objectiveChanged.connect(self.objectiveChanged)
-        self.examination_panel.diagnosisChanged.connect(self.diagnosisChanged)
-        self.examination_panel.showDiagnosisLabelChanged.connect(self.showDiagnosisLabelChanged)
-        self.examination_panel.noAcutePathologyChanged.connect(self.noAcutePathologyChanged)
-        self.examination_panel.recommendationsChanged.connect(self.recommendationsChanged)
-        self.examination_panel.showRecommendationsLabelChanged.connect(self.showRecommendationsLabelChanged)
-        self.examination_panel.repeatChanged.connect(self.repeatChanged)
-        self.examination_panel.sickLeaveChanged.connect(self.sickLeaveChanged)
-        self.examination_panel.signatureChanged.connect(self.signatureChanged)
-        self.examination_panel.surdologyChanged.connect(self.surdologyChanged)
-        self.examination_panel.operationDataChanged.connect(self.operationDataChanged)
-        self.examination_panel.operationModeChanged.connect(self.operationModeChanged)
-        self.examination_panel.operationStaffChanged.connect(self.operationStaffChanged)
-        self.examination_panel.signatureVisibleChanged.connect(self.signatureVisibleChanged)
+        # Канал состояния формы: поля examination_panel публикуют значения по путям,
+        # подписчики (редактор) получают пакет изменений раз за итерацию цикла событий
+        self.form_state = FormStateChannel(self)
+        ep = self.examination_panel
+        for signal, path in (
+            (ep.dateChanged, 'date'),
+            (ep.timeChanged, 'time'),
+            (ep.timeEnabledChanged, 'time_enabled'),
+            (ep.specialtyChanged, 'specialty'),
+            (ep.citoChanged, 'cito'),
+            (ep.noCardChanged, 'no_card'),
+            (ep.adChanged, 'ad'),
+            (ep.tempChanged, 'temp'),
+            (ep.weightChanged, 'weight'),
+            (ep.paidServiceChanged, 'paid_service'),
+            (ep.complaintsChanged, 'complaints'),
+            (ep.anamnesisChanged, 'anamnesis'),
+            (ep.noComplaintsChanged, 'no_complaints'),
+            (ep.showAnamnesisLabelChanged, 'show_anamnesis_label'),
+            (ep.consentChanged, 'consent'),
+            (ep.objectiveChanged, 'objective'),
+            (ep.surdologyChanged, 'surdology'),
+            (ep.diagnosisChanged, 'diagnosis'),
+            (ep.showDiagnosisLabelChanged, 'diagnosis.show_label'),
+            (ep.noAcutePathologyChanged, 'diagnosis.no_acute_pathology'),
+            (ep.recommendationsChanged, 'recommendations'),
+            (ep.showRecommendationsLabelChanged, 'recommendations.show_label'),
+            (ep.repeatChanged, 'repeat'),
+            (ep.sickLeaveChanged, 'sick_leave'),
+            (ep.signatureChanged, 'signature'),
+            (ep.signatureVisibleChanged, 'signature_visible'),
+            (ep.operationModeChanged, 'operation_mode'),
+            (ep.operationDataChanged, 'operation'),
+            (ep.operationStaffChanged, 'op_staff'),
+        ):
+            self.form_state.bind(signal, path)
+        ep.objectiveFieldChanged.connect(lambda key, text: self.form_state.publish(f'objective.{key}', text))
+        ep.syncRequested.connect(self.syncRequested)
 
         # Делаем дочерние виджеты доступными для MainWindow
         self.date_input = self.examination_panel.date_input